@@ -1,7 +1,14 @@
 import networkx as nx
 import rustworkx as rx
+import numpy as np
+from array import array
+import bisect
+import heapq
 from datetime import datetime, timedelta
 
+import columnar_schedule
+import compiled_dag
+
 
 
 #DEPRECTAED
@@ -43,6 +50,10 @@ def allocate_jobs_to_machines_nx(graph: nx.DiGraph, num_machines=8):
     This function attempts to optimize job allocation by considering the critical path and
     job dependencies to minimize overall completion time across a specified number of machines.
 
+    Jobs are released level by level : ready jobs wait in a heap keyed by (topological level, position on the
+    critical path, node order), an in-degree counter per job tracks when its successors become ready, and each job
+    goes to the machine at the top of a min-heap of machine free times. The graph itself is never copied or mutated.
+
     Args:
     - graph (nx.DiGraph): A directed graph where nodes represent jobs, and edges represent dependencies.
     - num_machines (int, optional): The number of machines available for job allocation. Defaults to 8.
@@ -50,36 +61,65 @@ def allocate_jobs_to_machines_nx(graph: nx.DiGraph, num_machines=8):
     - machines (list of lists of dicts): A nested list where each sublist represents the allocation of jobs to a machine. Each job is represented as a dictionary containing 'start_time', 'end_time',
       'duration', and 'job_index'.
     """
-    man_graph = graph.copy()
-    machines = [[] for _ in range(num_machines)]
-    queue = [n[0] for n in man_graph.in_degree if n[1] == 0]
-    free_time = [0] * num_machines
-    # Calculate critical path
-    critical_path = nx.dag_longest_path(man_graph, weight='duration')
-
-    while len(queue) > 0:
-        # Sort the jobs in the queue based on the critical path
-        jobs_sorted = sorted(queue, key=lambda x: critical_path.index(x) if x in critical_path else float('inf'))
-
-
-        for job in jobs_sorted:
-            machine = min(range(len(machines)), key=lambda machine: free_time[machine])
-            duration = nx.get_node_attributes(man_graph, "duration")[job]
-            earliest_start_time_for_job = earliest_start_time(job, graph, machines)
-            # do machine choice after (by also taking into account how far back we can go)
-            start_time = max([free_time[machine], earliest_start_time_for_job])
-            end_time = start_time + duration.total_seconds()
-            machines[machine].append({'start_time': start_time, 'end_time': end_time,
-                                                                   'duration': end_time - start_time, 'job_index': job})
-            free_time[machine] = end_time
-            #print(free_time)
-            #print("EST : ", earliest_start_time_for_job)
-
-        man_graph.remove_nodes_from(queue)
-        man_graph.remove_edges_from([edge for edge in man_graph.edges if edge[0] in queue])
-        queue = [n[0] for n in man_graph.in_degree if n[1] == 0]
+    return allocate_jobs_compiled(compiled_dag.compile_dag(graph), num_machines=num_machines)
 
-    return machines
+
+def allocate_jobs_compiled(dag: compiled_dag.CompiledDAG, num_machines=8, columnar: bool = False, writer=None):
+    """
+    Runs the heuristic of :func:`allocate_jobs_to_machines_nx` on a compiled DAG.
+
+    Args:
+    - dag (compiled_dag.CompiledDAG): The compiled DAG of jobs.
+    - num_machines (int, optional): The number of machines available for job allocation. Defaults to 8.
+    - columnar (bool, optional): Whether to return a :class:`columnar_schedule.ColumnarSchedule`. Defaults to False.
+    - writer (columnar_schedule.NDJSONScheduleWriter, optional): Receives every job as soon as it is placed.
+    Returns:
+    - machines (list of lists of dicts): The allocation of jobs to each machine, with 'job_index' holding the original node ids.
+    """
+    levels = compiled_dag.topological_levels(dag)
+    level_of = np.empty(dag.num_nodes, dtype=np.int64)
+    for level, nodes in enumerate(levels):
+        level_of[nodes] = level
+    # Calculate critical path, jobs outside of it come after the ones on it
+    critical_path_rank = np.full(dag.num_nodes, dag.num_nodes, dtype=np.int64)
+    critical_path = compiled_dag.critical_path(dag)
+    critical_path_rank[critical_path] = np.arange(len(critical_path))
+
+    node_ids = dag.node_ids.tolist()
+    durations = dag.durations.tolist()
+    level_of = level_of.tolist()
+    critical_path_rank = critical_path_rank.tolist()
+    succ_offsets = dag.succ_offsets.tolist()
+    succ_indices = dag.succ_indices.tolist()
+    in_degree = np.diff(dag.pred_offsets).tolist()
+    finish_times = FinishTimeIndex(dag)
+
+    placed, machines, start_times, end_times = array('q'), array('q'), array('d'), array('d')
+    free_time = [(0, machine) for machine in range(num_machines)]
+    queue = [(level_of[job], critical_path_rank[job], job) for job in levels[0].tolist()] if levels else []
+    heapq.heapify(queue)
+
+    while queue:
+        _, _, job = heapq.heappop(queue)
+        machine_free_time, machine = free_time[0]
+        earliest_start_time_for_job = finish_times.earliest_start_time(job)
+        start_time = max(machine_free_time, earliest_start_time_for_job)
+        end_time = start_time + durations[job]
+        placed.append(job)
+        machines.append(machine)
+        start_times.append(start_time)
+        end_times.append(end_time)
+        if writer is not None:
+            writer.write(node_ids[job], machine, start_time, end_time)
+        heapq.heapreplace(free_time, (end_time, machine))
+        finish_times.record(job, end_time)
+        for successor in succ_indices[succ_offsets[job]:succ_offsets[job + 1]]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                heapq.heappush(queue, (level_of[successor], critical_path_rank[successor], successor))
+
+    schedule = columnar_schedule.ColumnarSchedule.from_tasks(dag, placed, machines, start_times, end_times, num_machines)
+    return schedule if columnar else schedule.to_legacy()
 
 
 #@profile
@@ -137,53 +177,65 @@ def earliest_start_time_optimized(task, graph, schedule):
         return max_end_time
 
 # @profile
-def allocate_jobs_to_machines_with_heuristic_rx(graph: (rx.PyDiGraph, dict), num_machines=8):
+def allocate_jobs_to_machines_with_heuristic_rx(graph: (rx.PyDiGraph, dict), num_machines=8, columnar: bool = False, writer=None):
     """
     Allocates jobs to machines using a heuristic approach on a directed graph with retworkx.
 
     This function takes a graph representing job dependencies and a dictionary of job durations,
-    then allocates jobs to machines aiming to minimize overall completion time. It uses an
-    optimized approach for determining the earliest start time for each job based on its dependencies.
+    then allocates jobs to machines aiming to minimize overall completion time. Jobs are taken
+    generation by generation from ``rx.topological_generations``, the earliest start time of a job
+    is read from a dense array of finish times indexed by node index, and each job goes to the
+    machine at the top of a min-heap of free times. The graph is neither copied nor mutated.
 
     Args:
-    - graph (tuple): A tuple containing a retworkx PyDiGraph and a dictionary of job durations.
+    - graph (tuple): A tuple containing a retworkx PyDiGraph (as returned by ``data_loader.load_dag_from_json_rx``) and a dictionary of job durations.
     - num_machines (int, optional): The number of machines available for allocation. Defaults to 8.
+    - columnar (bool, optional): Whether to return a :class:`columnar_schedule.ColumnarSchedule` instead of the dictionary
+      of jobs, which then never has to be built. Defaults to False.
+    - writer (columnar_schedule.NDJSONScheduleWriter, optional): Receives every job as soon as it is placed.
     Returns:
     - jobs (dict): A dictionary where each key is a job index and each value is a dictionary containing 'start_time', 'end_time', 'duration', and 'machine_index' for the job.
     """
-    man_graph = graph[0].copy()
-    durations = graph[1]
-    jobs = {}
-    queue = [n for n in man_graph.node_indices() if man_graph.in_degree(n) == 0]
-
-    free_time = [0] * num_machines
-
-    
-    while len(queue) > 0:
-        for job in queue:
-            job_index = man_graph.get_node_data(job)
-            machine = min(range(num_machines), key=lambda machine: free_time[machine])
-            duration = durations[job_index]
-            earliest_start_time_for_job = earliest_start_time_optimized(job, graph[0],jobs) #todo
-            start_time = max([free_time[machine], earliest_start_time_for_job])
-            end_time = start_time + duration.total_seconds()
-            jobs[job_index] = {'start_time': start_time, 'end_time': end_time,
-                                                                'duration': end_time - start_time, 'machine_index': machine}
-            free_time[machine] = end_time
-
-        successors = []
-        out_edges = []
-        for q in queue:
-            for n in man_graph.successor_indices(q):
-                out_edges.append((q,n))
-                successors.append(n)
-        successors = set(successors)
-        
-        man_graph.remove_edges_from(out_edges)
-        man_graph.remove_nodes_from(queue)
-
+    dag, durations = graph
+    job_ids, machines, start_times, end_times = [], array('q'), array('d'), array('d')
+    finish_time = array('d', bytes(8 * (max(dag.node_indices(), default=-1) + 1)))
+    free_time = [(0, machine) for machine in range(num_machines)]
+
+    for generation in rx.topological_generations(dag):
+        for job in generation:
+            job_index = dag[job]
+            machine_free_time, machine = free_time[0]
+            earliest_start_time_for_job = max([finish_time[pred] for pred in dag.predecessor_indices(job)], default=0)
+            start_time = max(machine_free_time, earliest_start_time_for_job)
+            end_time = start_time + durations[job_index]
+            job_ids.append(job_index)
+            machines.append(machine)
+            start_times.append(start_time)
+            end_times.append(end_time)
+            if writer is not None:
+                writer.write(job_index, machine, start_time, end_time)
+            heapq.heapreplace(free_time, (end_time, machine))
+            finish_time[job] = end_time
+
+    if columnar:
+        return columnar_schedule.ColumnarSchedule(job_ids, machines, start_times, end_times, num_machines)
+    return {job_index: {'start_time': start_time, 'end_time': end_time, 'duration': end_time - start_time, 'machine_index': machine}
+            for job_index, machine, start_time, end_time in zip(job_ids, machines, start_times, end_times)}
+
+
+def allocate_jobs_to_machines_with_heuristic(graph, num_machines=8):
+    """
+    Allocates jobs to machines with the level-by-level heuristic, on whichever graph representation is given.
 
-        queue = [n for n in successors if man_graph.in_degree(n) == 0]
+    Args:
+    - graph (nx.DiGraph or tuple): Either a networkx DAG, or the (rx.PyDiGraph, durations) tuple returned by ``data_loader.load_dag_from_json_rx``.
+    - num_machines (int, optional): The number of machines available for allocation. Defaults to 8.
+    Returns:
+    - machines (list of lists of dicts): The allocation of jobs to each machine, in the same format as :func:`allocate_jobs_to_machines_nx`.
+    """
+    if isinstance(graph, nx.DiGraph):
+        return allocate_jobs_to_machines_nx(graph, num_machines=num_machines)
+    return allocate_jobs_to_machines_with_heuristic_rx(graph, num_machines=num_machines, columnar=True).to_legacy()
 
 
 def transform_allocation_format(jobs, num_machines):
@@ -222,39 +274,242 @@ def transform_allocation_format(jobs, num_machines):
 
 ### HEFT Algorithm code 
 
-def heft(graph: nx.DiGraph, num_machines: int):
+def heft(graph: nx.DiGraph, num_machines: int, insertion: bool = True, speeds=None, costs=None, bandwidth=None, latency=0.0):
     """Implements the core HEFT algorithm. It schedules tasks (nodes in the DAG) across a given number of machines to minimize the overall execution time.
 
+    The graph is compiled once into CSR arrays (see :mod:`compiled_dag`) and scheduled by :func:`heft_compiled`.
+
     Args:
         graph (nx.DiGraph): A networkx directed acyclic graph where nodes represent tasks and edges represent dependencies between tasks. Each node has a 'duration' attribute indicating the task's execution time.
         num_machines (int): The number of machines available for executing these tasks.
+        insertion (bool, optional): Whether tasks may be inserted in the idle gaps of a machine. Defaults to True.
+        speeds (sequence of float, optional): Speed factor of each machine, a task taking ``duration / speed`` on it.
+        costs (array-like, optional): Execution time of each task (rows, in ``graph.nodes`` order) on each machine (columns).
+        bandwidth (float, optional): Data size sent per second between two machines, for the 'data_size' edge attributes.
+        latency (float, optional): Latency of every transfer between two machines, in seconds. Defaults to 0.
 
     Returns:
     Any: A schedule that is a list of lists. Each sublist represents the schedule for a machine, containing dictionaries with keys 'start_time', 'end_time', 'duration', and 'job_index', detailing each task's scheduling.
     """
-    tasks = list(graph.nodes)
-    ranks = calculate_ranks(graph)
+    return heft_compiled(compiled_dag.compile_dag(graph), num_machines, insertion=insertion, speeds=speeds, costs=costs,
+                         bandwidth=bandwidth, latency=latency)
+
+def heft_compiled(dag: compiled_dag.CompiledDAG, num_machines: int, insertion: bool = True, speeds=None, costs=None,
+                  bandwidth=None, latency=0.0, columnar: bool = False, writer=None):
+    """Runs HEFT on a compiled DAG. Tasks are taken by decreasing upward rank (ties broken by topological order, so that
+    every task is placed after its predecessors) and the earliest start time of a task is read from the finish times of its
+    predecessors through a :class:`FinishTimeIndex`. Each task then goes to the machine giving it the earliest finish time,
+    either in an idle gap left by a dependency wait (insertion policy) or after the last task of the machine.
+
+    With heterogeneous machines (``speeds`` or ``costs``) the ranks are computed from the average cost of each task over
+    the machines, as in the original HEFT, and the finish time of a task is evaluated on all the machines at once by
+    :func:`list_schedule_heterogeneous`. The same goes when the edges carry communication costs (``bandwidth`` and
+    ``latency``, see :func:`compiled_dag.transfer_times`) : they are added to the ranks, and to the earliest start of a
+    task on every machine but the one its predecessor ran on.
 
-    # Initialize schedule and free times for each machine
-    schedule = [[] for _ in range(num_machines)]
-    free_time = [0] * num_machines
+    Args:
+        dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+        num_machines (int): The number of machines available for executing these tasks.
+        insertion (bool, optional): Whether tasks may be inserted in the idle gaps of a machine. Defaults to True.
+        speeds (sequence of float, optional): Speed factor of each machine, a task taking ``duration / speed`` on it.
+        costs (array-like, optional): Execution time of each task (rows, by compact id) on each machine (columns).
+        bandwidth (float, optional): Data size sent per second between two machines, for the data sizes of the edges.
+        latency (float, optional): Latency of every transfer between two machines, in seconds. Defaults to 0.
+        columnar (bool, optional): Whether to return a :class:`columnar_schedule.ColumnarSchedule`. Defaults to False.
+        writer (columnar_schedule.NDJSONScheduleWriter, optional): Receives every task as soon as it is placed.
 
-    # Sort tasks by decreasing order of rank
-    sorted_tasks = sorted(tasks, key=lambda task: ranks[task], reverse=True)
+    Returns:
+    Any: A schedule in the same list of lists format as :func:`heft`, with 'job_index' holding the original node ids.
+    """
+    levels = compiled_dag.topological_levels(dag)
+    positions = compiled_dag.topological_positions(levels, dag.num_nodes)
+    transfers = compiled_dag.transfer_times(dag, bandwidth=bandwidth, latency=latency)
+    if speeds is None and costs is None and transfers is None:
+        ranks = compiled_dag.upward_ranks(dag, levels)
+        return list_schedule_compiled(dag, num_machines, ranks, tie_breaker=positions, insertion=insertion, columnar=columnar,
+                                      writer=writer)
+    if speeds is None and costs is None:
+        speeds = np.ones(num_machines)
+    cost_row, mean_costs = machine_costs(dag, num_machines, speeds=speeds, costs=costs)
+    ranks = compiled_dag.upward_ranks(dag, levels, durations=mean_costs, edge_costs=transfers)
+    return list_schedule_heterogeneous(dag, num_machines, cost_row, ranks, tie_breaker=positions, insertion=insertion,
+                                       transfers=transfers, columnar=columnar, writer=writer)
+
+def list_schedule_compiled(dag: compiled_dag.CompiledDAG, num_machines: int, priority, tie_breaker=None, insertion: bool = True,
+                           columnar: bool = False, writer=None):
+    """Schedules a compiled DAG with an arbitrary priority rule. Ready tasks wait in a heap and the one of highest priority
+    (then lowest tie breaker) is placed next, on the machine giving it the earliest finish time. With upward ranks as the
+    priority and topological positions as the tie breaker this is exactly :func:`heft_compiled`.
 
-    # Iterate through sorted tasks and allocate to machines
-    for task in sorted_tasks:
-        machine = select_machine(task, schedule, free_time)
-        start_time = max([free_time[machine], earliest_start_time(task, graph, schedule)])
-        end_time = start_time + nx.get_node_attributes(graph, "duration")[task].total_seconds()
-        schedule[machine].append({'start_time': start_time, 'end_time': end_time, 'duration': end_time - start_time, 'job_index': task})
-        free_time[machine] = end_time
+    Args:
+        dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+        num_machines (int): The number of machines available for executing these tasks.
+        priority (np.ndarray): The priority of each task, indexed by compact id. Higher goes first.
+        tie_breaker (np.ndarray, optional): Order between tasks of equal priority, lower goes first. Defaults to the compact ids.
+        insertion (bool, optional): Whether tasks may be inserted in the idle gaps of a machine. Defaults to True.
+        columnar (bool, optional): Whether to return a :class:`columnar_schedule.ColumnarSchedule`. Defaults to False.
+        writer (columnar_schedule.NDJSONScheduleWriter, optional): Receives every task as soon as it is placed.
 
-    return schedule
+    Returns:
+    Any: A schedule in the same list of lists format as :func:`heft`.
+    """
+    negated_priority = (-np.asarray(priority, dtype=np.float64)).tolist()
+    tie_breaker = np.arange(dag.num_nodes) if tie_breaker is None else tie_breaker
+    tie_breaker = np.asarray(tie_breaker).tolist()
+
+    node_ids = dag.node_ids.tolist()
+    durations = dag.durations.tolist()
+    succ_offsets = dag.succ_offsets.tolist()
+    succ_indices = dag.succ_indices.tolist()
+    in_degree = np.diff(dag.pred_offsets).tolist()
+    finish_times = FinishTimeIndex(dag)
+    ready = [(negated_priority[task], tie_breaker[task], task) for task in range(dag.num_nodes) if in_degree[task] == 0]
+    heapq.heapify(ready)
+
+    # Placements in order, and idle-time index for each machine
+    placed, machines, start_times, end_times = array('q'), array('q'), array('d'), array('d')
+    timelines = MachineTimelines(num_machines, insertion=insertion)
+
+    while ready:
+        _, _, task = heapq.heappop(ready)
+        duration = durations[task]
+        machine, start_time = select_machine(timelines, finish_times.earliest_start_time(task), duration)
+        end_time = start_time + duration
+        timelines.reserve(machine, start_time, end_time)
+        placed.append(task)
+        machines.append(machine)
+        start_times.append(start_time)
+        end_times.append(end_time)
+        if writer is not None:
+            writer.write(node_ids[task], machine, start_time, end_time)
+        finish_times.record(task, end_time)
+        for successor in succ_indices[succ_offsets[task]:succ_offsets[task + 1]]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                heapq.heappush(ready, (negated_priority[successor], tie_breaker[successor], successor))
+
+    schedule = columnar_schedule.ColumnarSchedule.from_tasks(dag, placed, machines, start_times, end_times, num_machines)
+    return schedule if columnar else schedule.to_legacy()
+
+def machine_costs(dag: compiled_dag.CompiledDAG, num_machines: int, speeds=None, costs=None):
+    """Builds the machine model of heterogeneous machines, given either as speed factors or as a full cost matrix.
+
+    Args:
+        dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+        num_machines (int): The number of machines.
+        speeds (sequence of float, optional): Speed factor of each machine, a task taking ``duration / speed`` on it.
+        costs (array-like, optional): Execution time of each task (rows, by compact id) on each machine (columns).
+
+    Returns:
+    tuple: A function returning the vector of execution times of a task on every machine, and the vector of the average
+    execution time of every task.
+    """
+    if costs is not None:
+        costs = np.asarray(costs, dtype=np.float64)
+        if costs.shape != (dag.num_nodes, num_machines):
+            raise ValueError(f"The cost matrix must have shape ({dag.num_nodes}, {num_machines}), got {costs.shape}.")
+        return costs.__getitem__, costs.mean(axis=1)
+    inverse_speeds = 1 / np.asarray(speeds, dtype=np.float64)
+    if inverse_speeds.shape != (num_machines,) or not np.all(inverse_speeds > 0):
+        raise ValueError(f"Expected {num_machines} positive machine speeds.")
+    durations = dag.durations
+    return (lambda task: durations[task] * inverse_speeds), durations * inverse_speeds.mean()
+
+def list_schedule_heterogeneous(dag: compiled_dag.CompiledDAG, num_machines: int, cost_row, priority, tie_breaker=None, insertion: bool = True,
+                                transfers=None, columnar: bool = False, writer=None):
+    """Schedules a compiled DAG on heterogeneous machines. Tasks are taken by priority as in :func:`list_schedule_compiled`,
+    and each one goes to the machine giving it the earliest finish time, computed for all the machines in one vectorised
+    step (see :class:`HeterogeneousTimelines`).
+
+    With communication costs the earliest start of a task depends on the machine. Only the predecessor whose data
+    arrives last matters on the other machines, so the vector of ready times is that arrival everywhere, corrected on
+    the machine of that predecessor, which keeps the work linear in the number of edges.
+
+    Args:
+        dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+        num_machines (int): The number of machines.
+        cost_row (callable): Returns the vector of execution times of a task on every machine (see :func:`machine_costs`).
+        priority (np.ndarray): The priority of each task, indexed by compact id. Higher goes first.
+        tie_breaker (np.ndarray, optional): Order between tasks of equal priority, lower goes first. Defaults to the compact ids.
+        insertion (bool, optional): Whether tasks may be inserted in the idle gaps of a machine. Defaults to True.
+        transfers (np.ndarray, optional): Transfer time of each edge between two machines, aligned with ``dag.succ_indices``
+            (see :func:`compiled_dag.transfer_times`).
+        columnar (bool, optional): Whether to return a :class:`columnar_schedule.ColumnarSchedule`. Defaults to False.
+        writer (columnar_schedule.NDJSONScheduleWriter, optional): Receives every task as soon as it is placed.
+
+    Returns:
+    Any: A schedule in the same list of lists format as :func:`heft`, 'duration' being the execution time on the machine.
+    """
+    negated_priority = (-np.asarray(priority, dtype=np.float64)).tolist()
+    tie_breaker = np.arange(dag.num_nodes) if tie_breaker is None else tie_breaker
+    tie_breaker = np.asarray(tie_breaker).tolist()
+
+    node_ids = dag.node_ids.tolist()
+    succ_offsets = dag.succ_offsets.tolist()
+    succ_indices = dag.succ_indices.tolist()
+    in_degree = np.diff(dag.pred_offsets).tolist()
+    finish_times = FinishTimeIndex(dag)
+    ready = [(negated_priority[task], tie_breaker[task], task) for task in range(dag.num_nodes) if in_degree[task] == 0]
+    heapq.heapify(ready)
+
+    placed, machines, start_times, end_times = array('q'), array('q'), array('d'), array('d')
+    timelines = HeterogeneousTimelines(num_machines, insertion=insertion)
+    if transfers is not None:
+        pred_offsets = dag.pred_offsets.tolist()
+        pred_indices = dag.pred_indices.tolist()
+        pred_transfers = transfers[compiled_dag.predecessor_edges(dag)].tolist()
+        finish_time = finish_times.finish_time
+        machine_of = [0] * dag.num_nodes
+
+    while ready:
+        _, _, task = heapq.heappop(ready)
+        costs = cost_row(task)
+        if transfers is None:
+            ready_time = finish_times.earliest_start_time(task)
+        else:
+            # Latest arrival over all the predecessors, and over those that ran on another machine than its sender
+            latest, latest_machine, others = 0.0, -1, 0.0
+            for edge in range(pred_offsets[task], pred_offsets[task + 1]):
+                predecessor = pred_indices[edge]
+                arrival = finish_time[predecessor] + pred_transfers[edge]
+                if arrival > latest:
+                    if machine_of[predecessor] != latest_machine:
+                        others = latest
+                    latest, latest_machine = arrival, machine_of[predecessor]
+                elif machine_of[predecessor] != latest_machine and arrival > others:
+                    others = arrival
+            ready_time = latest
+            if latest_machine >= 0:
+                local = max([finish_time[predecessor] for predecessor in pred_indices[pred_offsets[task]:pred_offsets[task + 1]]
+                             if machine_of[predecessor] == latest_machine])
+                ready_time = np.full(num_machines, latest)
+                ready_time[latest_machine] = max(others, local)
+        machine, start_time = timelines.earliest_finish(ready_time, costs)
+        end_time = start_time + float(costs[machine])
+        timelines.reserve(machine, start_time, end_time)
+        if transfers is not None:
+            machine_of[task] = machine
+        placed.append(task)
+        machines.append(machine)
+        start_times.append(start_time)
+        end_times.append(end_time)
+        if writer is not None:
+            writer.write(node_ids[task], machine, start_time, end_time)
+        finish_times.record(task, end_time)
+        for successor in succ_indices[succ_offsets[task]:succ_offsets[task + 1]]:
+            in_degree[successor] -= 1
+            if in_degree[successor] == 0:
+                heapq.heappush(ready, (negated_priority[successor], tie_breaker[successor], successor))
+
+    schedule = columnar_schedule.ColumnarSchedule.from_tasks(dag, placed, machines, start_times, end_times, num_machines)
+    return schedule if columnar else schedule.to_legacy()
 
 def earliest_start_time(task, graph, schedule):
     """Calculates the earliest start time for a task on any machine, considering the task dependencies and the current schedule.
 
+    This scans the whole schedule and is kept for callers that only hold a schedule. The schedulers use a
+    :class:`FinishTimeIndex` instead, which answers the same question in O(in-degree).
+
     Args:
         task (dict): The task for which to calculate the earliest start time.
         graph (nx.DiGraph): The DAG of tasks.
@@ -263,13 +518,37 @@ def earliest_start_time(task, graph, schedule):
     Returns:
     float: The earliest time at which the specified task can start executing.
     """
-    dependencies = list(graph.predecessors(task))
+    dependencies = set(graph.predecessors(task))
     if not dependencies:
         return 0
     else:
         max_end_time = max([job['end_time'] for machine_schedule in schedule for job in machine_schedule if job['job_index'] in dependencies])
         return max_end_time
 
+class FinishTimeIndex:
+    """Finish times of the scheduled tasks, stored in a dense float64 array keyed by compact node id.
+
+    The schedulers record every task as it is placed, so the earliest start time of a task is the largest finish time among
+    its predecessors, read through the predecessor CSR arrays of the compiled DAG in O(in-degree).
+
+    Args:
+        dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+    """
+
+    def __init__(self, dag: compiled_dag.CompiledDAG):
+        self.finish_time = array('d', bytes(8 * dag.num_nodes))
+        self._pred_offsets = dag.pred_offsets.tolist()
+        self._pred_indices = dag.pred_indices.tolist()
+
+    def record(self, task: int, end_time: float):
+        """Stores the finish time of a placed task."""
+        self.finish_time[task] = end_time
+
+    def earliest_start_time(self, task: int):
+        """Returns the time at which all the predecessors of ``task`` have finished (0 for entry tasks)."""
+        finish_time = self.finish_time
+        return max([finish_time[pred] for pred in self._pred_indices[self._pred_offsets[task]:self._pred_offsets[task + 1]]], default=0)
+
 def calculate_ranks(graph: nx.DiGraph):
     """Calculates the priority rank for each task in the graph, which is used to order tasks for scheduling. The rank of a task is the longest path from it to an exit task, including its own duration.
 
@@ -277,41 +556,335 @@ def calculate_ranks(graph: nx.DiGraph):
         graph (nx.DiGraph): The DAG of tasks.
 
     Returns:
-    dict: A dictionary mapping each task to its rank.
+    dict: A dictionary mapping each task to its rank, in seconds.
     """
-    ranks = {}
-    for task in nx.topological_sort(graph):
-        rank = calculate_rank(task, ranks, graph)
-        ranks[task] = rank
-    return ranks
+    dag = compiled_dag.compile_dag(graph)
+    return dict(zip(dag.node_ids.tolist(), compiled_dag.upward_ranks(dag).tolist()))
 
-def calculate_rank(task, ranks, graph, memo={}):
-    """ Recursively calculates the rank of a given task. Utilizes memoization to avoid recalculating ranks for tasks.
+def select_machine(timelines, ready_time, duration):
+    """Selects the machine on which a task finishes the earliest. The machines are identical, so this is also the machine on
+    which it starts the earliest.
 
     Args:
-        task (Any): The task for which to calculate the rank.
-        ranks (dict):  A dictionary of precomputed ranks for some tasks.
-        graph (nx.DiGraph): The DAG of tasks.
-        memo (dict, optional): A dictionary used for memoization of task ranks. Defaults to {}.
+        timelines (MachineTimelines): The free times and idle gaps of the machines.
+        ready_time (float): The time at which all the predecessors of the task have finished.
+        duration (float): The duration of the task.
 
     Returns:
-    Any: The rank of the specified task.
+    tuple: The selected machine and the start time of the task on it.
     """
-    if task in ranks:
-        return ranks[task]
-    elif task in memo:
-        return memo[task]
-    else:
-        successors = list(graph.successors(task))
-        if not successors:
-            return nx.get_node_attributes(graph, "duration")[task]
+    return timelines.earliest_slot(ready_time, duration)
+
+class _Timelines:
+    """Keeps, for every machine, the time at which its last task ends and the idle gaps before that time.
+
+    The idle gaps of a machine are two parallel sorted lists (starts and ends, which never overlap) searched with
+    ``bisect``. Every change of a free time or of the gaps is reported to the ``_free_time_moved``, ``_gap_added`` and
+    ``_gap_removed`` hooks, so subclasses only maintain the summaries their own queries read.
+
+    Args:
+        num_machines (int): The number of machines.
+        insertion (bool, optional): Whether idle gaps are recorded and reused. Defaults to True.
+    """
+
+    def __init__(self, num_machines: int, insertion: bool = True):
+        self.free_time = [0.0] * num_machines
+        self.insertion = insertion
+        self._gap_starts = [[] for _ in range(num_machines)]
+        self._gap_ends = [[] for _ in range(num_machines)]
+
+    def reserve(self, machine: int, start_time: float, end_time: float):
+        """Marks ``[start_time, end_time)`` as busy on ``machine``, either at its end or inside one of its idle gaps."""
+        free_time = self.free_time[machine]
+        starts, ends = self._gap_starts[machine], self._gap_ends[machine]
+        if start_time >= free_time:
+            if self.insertion and start_time > free_time:
+                starts.append(free_time)
+                ends.append(start_time)
+                self._gap_added(machine, free_time, start_time)
+            self.free_time[machine] = end_time
+            self._free_time_moved(machine, end_time)
+            return
+        index = bisect.bisect_right(starts, start_time) - 1
+        if index < 0 or end_time > ends[index]:
+            raise ValueError(f"Machine {machine} is not idle between {start_time} and {end_time}.")
+        gap_start, gap_end = starts[index], ends[index]
+        self._gap_removed(machine, gap_start, gap_end)
+        replacement = [(s, e) for (s, e) in ((gap_start, start_time), (end_time, gap_end)) if e > s]
+        starts[index:index + 1] = [s for s, _ in replacement]
+        ends[index:index + 1] = [e for _, e in replacement]
+        for s, e in replacement:
+            self._gap_added(machine, s, e)
+
+    def _free_time_moved(self, machine, free_time):
+        pass
+
+    def _gap_added(self, machine, start, end):
+        pass
+
+    def _gap_removed(self, machine, start, end):
+        pass
+
+class MachineTimelines(_Timelines):
+    """Machine timelines for identical machines, where the earliest start also gives the earliest finish.
+
+    The free times live in a min-heap so the earliest machine is found in O(log M). All the idle gaps are also indexed
+    together in a :class:`_GapIndex`, so finding the earliest gap that fits a task does not visit every machine.
+
+    Args:
+        num_machines (int): The number of machines.
+        insertion (bool, optional): Whether idle gaps are recorded and reused. Defaults to True.
+    """
+
+    def __init__(self, num_machines: int, insertion: bool = True):
+        super().__init__(num_machines, insertion=insertion)
+        self._free_heap = [(0.0, machine) for machine in range(num_machines)]
+        self._gaps = _GapIndex()
+
+    def earliest_slot(self, ready_time: float, duration: float):
+        """Returns the machine and start time giving the earliest start (and finish) for a task."""
+        free_heap = self._free_heap
+        while free_heap[0][0] != self.free_time[free_heap[0][1]]:
+            heapq.heappop(free_heap)
+        free_time, machine = free_heap[0]
+        if free_time <= ready_time:
+            return machine, ready_time
+        gap = self._gaps.find(ready_time, duration, free_time)
+        if gap is not None:
+            return gap
+        return machine, free_time
+
+    def _free_time_moved(self, machine, free_time):
+        heapq.heappush(self._free_heap, (free_time, machine))
+
+    def _gap_added(self, machine, start, end):
+        self._gaps.add(start, end, machine)
+
+    def _gap_removed(self, machine, start, end):
+        self._gaps.remove(start, end, machine)
+
+class HeterogeneousTimelines(_Timelines):
+    """Machine timelines for machines of different speeds, where the earliest start no longer gives the earliest finish.
+
+    Only the per-machine gap lists are kept (no free-time heap nor global gap index, which answer earliest-start queries).
+    The free times and the longest idle gap of every machine are mirrored in numpy vectors, so the finish time of a task
+    at the end of every machine is a single vector operation. Only the machines with an idle gap long enough, and late
+    enough, to beat that are then searched gap by gap.
+
+    Args:
+        num_machines (int): The number of machines.
+        insertion (bool, optional): Whether idle gaps are recorded and reused. Defaults to True.
+    """
+
+    def __init__(self, num_machines: int, insertion: bool = True):
+        super().__init__(num_machines, insertion=insertion)
+        self._free_times = np.zeros(num_machines)
+        self._longest_gap = np.zeros(num_machines)
+        self._last_gap_end = np.zeros(num_machines)
+
+    def earliest_finish(self, ready_time, costs):
+        """Returns the machine and start time giving the earliest finish for a task whose execution time on each machine is
+        ``costs``. ``ready_time`` is either a single time or the time the task is ready on each machine."""
+        starts = np.maximum(self._free_times, ready_time)
+        finishes = starts + costs
+        machine = int(np.argmin(finishes))
+        best_start, best_finish = float(starts[machine]), float(finishes[machine])
+        if self.insertion:
+            candidates = np.flatnonzero((self._longest_gap >= costs) & (self._last_gap_end > ready_time)
+                                        & (ready_time + costs < best_finish))
+            per_machine = np.ndim(ready_time) > 0
+            for candidate in candidates.tolist():
+                cost = float(costs[candidate])
+                candidate_ready = float(ready_time[candidate]) if per_machine else ready_time
+                start = self._first_fit(candidate, candidate_ready, cost, best_finish - cost)
+                if start is not None:
+                    machine, best_start, best_finish = candidate, start, start + cost
+        return machine, best_start
+
+    def _first_fit(self, machine, ready_time, cost, latest_start):
+        """Returns the earliest start, before ``latest_start``, of an idle gap of ``machine`` that holds ``cost`` after ``ready_time``."""
+        starts, ends = self._gap_starts[machine], self._gap_ends[machine]
+        for index in range(bisect.bisect_right(ends, ready_time), len(starts)):
+            start = max(starts[index], ready_time)
+            if start >= latest_start:
+                return None
+            if ends[index] - start >= cost:
+                return start
+        return None
+
+    def reserve(self, machine: int, start_time: float, end_time: float):
+        at_end = start_time >= self.free_time[machine]
+        super().reserve(machine, start_time, end_time)
+        starts, ends = self._gap_starts[machine], self._gap_ends[machine]
+        self._free_times[machine] = self.free_time[machine]
+        if not ends:
+            # No gap left, the machine must not pass the prefilter of earliest_finish any more
+            self._longest_gap[machine] = 0.0
+            self._last_gap_end[machine] = 0.0
+            return
+        if at_end:
+            self._longest_gap[machine] = max(self._longest_gap[machine], ends[-1] - starts[-1])
         else:
-            max_rank = max(calculate_rank(succ, ranks, graph, memo) for succ in successors)
-            rank = nx.get_node_attributes(graph, "duration")[task] + max_rank
-            memo[task] = rank  # Memoize the rank for this task
-            return rank
-
-def select_machine(task, schedule, free_time):
-    # Dummy function for machine selection
-    # You can implement a more sophisticated strategy based on machine capabilities
-    return min(range(len(schedule)), key=lambda machine: free_time[machine])
\ No newline at end of file
+            # A gap was split, the longest one may be gone
+            self._longest_gap[machine] = max([end - start for start, end in zip(starts, ends)])
+        self._last_gap_end[machine] = ends[-1]
+
+class _MaxTree:
+    """A max segment tree over a list of values, to find the first value after an index (or the last one before it) that
+    reaches a threshold in O(log n) instead of scanning the list."""
+
+    def __init__(self, values=()):
+        self.build(values)
+
+    def build(self, values):
+        size = 1
+        while size < len(values):
+            size *= 2
+        tree = [float("-inf")] * (2 * size)
+        tree[size:size + len(values)] = values
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self._size = size
+        self._tree = tree
+
+    def update(self, index, value):
+        tree = self._tree
+        node = index + self._size
+        tree[node] = value
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def first_at_least(self, lo, threshold):
+        """Returns the smallest index from ``lo`` on whose value is at least ``threshold``, or None."""
+        return self._first(1, 0, self._size, lo, threshold)
+
+    def _first(self, node, node_lo, node_hi, lo, threshold):
+        if node_hi <= lo or self._tree[node] < threshold:
+            return None
+        if node_hi - node_lo == 1:
+            return node_lo
+        middle = (node_lo + node_hi) // 2
+        found = self._first(2 * node, node_lo, middle, lo, threshold)
+        return found if found is not None else self._first(2 * node + 1, middle, node_hi, lo, threshold)
+
+    def last_at_least(self, hi, threshold):
+        """Returns the largest index below ``hi`` whose value is at least ``threshold``, or None."""
+        return self._last(1, 0, self._size, hi, threshold)
+
+    def _last(self, node, node_lo, node_hi, hi, threshold):
+        if node_lo >= hi or self._tree[node] < threshold:
+            return None
+        if node_hi - node_lo == 1:
+            return node_lo
+        middle = (node_lo + node_hi) // 2
+        found = self._last(2 * node + 1, middle, node_hi, hi, threshold)
+        return found if found is not None else self._last(2 * node, node_lo, middle, hi, threshold)
+
+class _GapIndex:
+    """The idle gaps of all the machines as ``(start, end, machine)`` tuples, in a sorted list split into blocks.
+
+    Each block remembers its first start, its largest end and its longest gap. The largest ends and longest gaps of the
+    blocks are also kept in :class:`_MaxTree` s, so a query bisects to the right block and descends the trees to the
+    blocks that can hold the task in O(log n). Insertions and removals only touch one block and one path of each tree,
+    the trees being rebuilt only when a block is split or emptied.
+    """
+
+    _BLOCK_SIZE = 128
+
+    def __init__(self):
+        self._blocks = []
+        self._firsts = []
+        self._max_ends = []
+        self._max_lengths = []
+        self._end_tree = _MaxTree()
+        self._length_tree = _MaxTree()
+
+    def _rebuild(self):
+        self._end_tree.build(self._max_ends)
+        self._length_tree.build(self._max_lengths)
+
+    def _refresh(self, b):
+        block = self._blocks[b]
+        self._firsts[b] = block[0][0]
+        self._max_ends[b] = max([gap[1] for gap in block])
+        self._max_lengths[b] = max([gap[1] - gap[0] for gap in block])
+        self._end_tree.update(b, self._max_ends[b])
+        self._length_tree.update(b, self._max_lengths[b])
+
+    def add(self, start, end, machine):
+        gap = (start, end, machine)
+        if not self._blocks:
+            self._blocks.append([gap])
+            self._firsts.append(start)
+            self._max_ends.append(end)
+            self._max_lengths.append(end - start)
+            self._rebuild()
+            return
+        b = max(bisect.bisect_right(self._firsts, start) - 1, 0)
+        block = self._blocks[b]
+        bisect.insort(block, gap)
+        self._firsts[b] = block[0][0]
+        if end > self._max_ends[b]:
+            self._max_ends[b] = end
+            self._end_tree.update(b, end)
+        if end - start > self._max_lengths[b]:
+            self._max_lengths[b] = end - start
+            self._length_tree.update(b, end - start)
+        if len(block) > 2 * self._BLOCK_SIZE:
+            self._blocks.insert(b + 1, block[self._BLOCK_SIZE:])
+            del block[self._BLOCK_SIZE:]
+            self._firsts.insert(b + 1, 0.0)
+            self._max_ends.insert(b + 1, 0.0)
+            self._max_lengths.insert(b + 1, 0.0)
+            self._rebuild()
+            self._refresh(b)
+            self._refresh(b + 1)
+
+    def remove(self, start, end, machine):
+        gap = (start, end, machine)
+        b = bisect.bisect_right(self._firsts, start) - 1
+        while b >= 0:
+            block = self._blocks[b]
+            index = bisect.bisect_left(block, gap)
+            if index < len(block) and block[index] == gap:
+                del block[index]
+                if not block:
+                    del self._blocks[b], self._firsts[b], self._max_ends[b], self._max_lengths[b]
+                    self._rebuild()
+                elif index == 0 or end == self._max_ends[b] or end - start == self._max_lengths[b]:
+                    self._refresh(b)
+                return
+            b -= 1
+        raise KeyError(gap)
+
+    def find(self, ready_time, duration, limit):
+        """Returns the (machine, start) of the gap where a task ready at ``ready_time`` starts the earliest, if that start
+        is before ``limit``."""
+        blocks, firsts = self._blocks, self._firsts
+        k = bisect.bisect_right(firsts, ready_time)
+        needed_end = ready_time + duration
+        # A gap opened before the task is ready fits if it lasts until ready_time + duration; the task then starts
+        # at ready_time, which nothing can beat. Only block k - 1 holds gaps opened after ready_time, so at most two
+        # blocks are scanned.
+        b = self._end_tree.last_at_least(k, needed_end)
+        while b is not None:
+            for start, end, machine in blocks[b]:
+                if start > ready_time:
+                    break
+                if end >= needed_end:
+                    return machine, ready_time
+            b = self._end_tree.last_at_least(b, needed_end)
+        # Otherwise the task starts at the beginning of the first long enough gap opened after ready_time.
+        b = self._length_tree.first_at_least(max(k - 1, 0), duration)
+        while b is not None and firsts[b] <= limit:
+            for start, end, machine in blocks[b]:
+                if start <= ready_time:
+                    continue
+                if start > limit:
+                    return None
+                if end - start >= duration:
+                    return machine, start
+            b = self._length_tree.first_at_least(b + 1, duration)
+        return None
@@ -1,8 +1,11 @@
 import networkx as nx
+import numpy as np
 import matplotlib.pyplot as plt
 import datetime
 
 import algorithm as alg
+import columnar_schedule
+import compiled_dag
 from data_loader import load_dag_from_json
 
 
@@ -26,7 +29,7 @@ def transform_node_to_edge(G):
         parent_weight = G.nodes[parent]['duration']
         Gt.add_edge(parent, child, weight=parent_weight)
    
-    feuilles = [node for node in G.nodes() if len(nx.descendants(G, node)) == 0]
+    feuilles = [node for node, out_degree in G.out_degree() if out_degree == 0]
     Gt.add_node('end')
 
     for feuille in feuilles:
@@ -42,15 +45,15 @@ def total_weight(T):
     Calculates the total weight of all edges in a graph.
     
     Parameters:
-    - T (nx.DiGraph): The directed graph whose edge weights are to be summed.
+    - T (nx.DiGraph): The directed graph whose edge weights (in seconds) are to be summed.
     
     Returns:
     - datetime.timedelta: The sum of all edge weights in the graph.
     """
-    somme_timedelta = datetime.timedelta()
+    somme_secondes = 0.0
     for (u, v) in T.edges():
-        somme_timedelta += T[u][v]['weight']
-    return somme_timedelta
+        somme_secondes += T[u][v]['weight']
+    return datetime.timedelta(seconds=somme_secondes)
 
 
 def critical_path(G):
@@ -58,18 +61,30 @@ def critical_path(G):
     Finds the critical path in the input graph, defined as the longest path in terms of total duration.
     
     Parameters:
-    - G (nx.DiGraph): The directed acyclic graph (DAG) in which to find the critical path.
+    - G (nx.DiGraph or compiled_dag.CompiledDAG): The directed acyclic graph (DAG) in which to find the critical path.
     
     Returns:
     - datetime.timedelta: The total duration of the critical path.
     """
-    T = transform_node_to_edge(G)
-    critical_path_length = datetime.timedelta()
-    critical_path = nx.dag_longest_path(Gt, weight='duration')
-    for (u, v) in T.edges():
-        if u in critical_path and v in critical_path:
-            critical_path_length += T[u][v]['weight']
-    return critical_path_length
+    dag = G if isinstance(G, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(G)
+    if dag.num_nodes == 0:
+        return datetime.timedelta()
+    return datetime.timedelta(seconds=float(compiled_dag.upward_ranks(dag).max()))
+
+
+def schedule_makespan(schedule):
+    """
+    Returns the makespan of an existing schedule, i.e. the end time of its last job.
+    
+    Parameters:
+    - schedule (list or columnar_schedule.ColumnarSchedule): List of schedules for each machine, each one ordered by start time.
+    
+    Returns:
+    - float: The makespan in seconds.
+    """
+    if isinstance(schedule, columnar_schedule.ColumnarSchedule):
+        return schedule.makespan
+    return max([machine[-1]['end_time'] for machine in schedule if machine], default=0)
 
 
 def makespan(G, nombre_machine):
@@ -81,15 +96,53 @@ def makespan(G, nombre_machine):
     - nombre_machine (int): The number of machines available for scheduling.
     
     Returns:
-    - datetime.timedelta: The makespan for the scheduling scenario.
+    - float: The makespan for the scheduling scenario, in seconds.
+    """
+    schedule = alg.allocate_jobs_to_machines_with_heuristic(G, num_machines=nombre_machine)
+    return schedule_makespan(schedule)
+
+
+def schedule_metrics(G, schedule, num_machines=None):
+    """
+    Computes the quality criteria of an existing schedule without rescheduling anything.
+    
+    The critical path length comes from a single reverse topological pass over the compiled DAG (see
+    compiled_dag.upward_ranks), the other criteria from a single pass over the schedule.
+    
+    Parameters:
+    - G (nx.DiGraph or compiled_dag.CompiledDAG): The graph representing the set of jobs.
+    - schedule (list or columnar_schedule.ColumnarSchedule): List of schedules for each machine.
+    - num_machines (int, optional): The number of machines, defaults to the number of machines of the schedule.
+    
+    Returns:
+    - dict: 'critical_path_length', 'makespan', 'sequential_time' (sum of the durations, all in seconds), 'slr'
+      (makespan / critical path), 'speedup' (sequential time / makespan), 'efficiency' (speedup / machines) and
+      'utilisation', the busy fraction of each machine over the makespan.
     """
-    A = G.copy()
-    schedule = alg.allocate_jobs_to_machines_with_heuristic(A ,num_machines=nombre_machine)
-    pers_makespan = []
-    for machine in schedule:
-        pers_makespan.append(machine[-1]['end_time'])
-    makespan = max(pers_makespan)
-    return makespan
+    dag = G if isinstance(G, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(G)
+    num_machines = num_machines or len(schedule)
+    critical_path_length = float(compiled_dag.upward_ranks(dag).max()) if dag.num_nodes else 0.0
+    sequential_time = float(dag.durations.sum())
+    if isinstance(schedule, columnar_schedule.ColumnarSchedule):
+        busy_time = np.bincount(schedule.machines, weights=schedule.durations, minlength=num_machines).tolist()
+        schedule_end = schedule.makespan
+    else:
+        busy_time = [0.0] * num_machines
+        schedule_end = 0.0
+        for machine, machine_schedule in enumerate(schedule):
+            for job in machine_schedule:
+                busy_time[machine] += job['end_time'] - job['start_time']
+                schedule_end = max(schedule_end, job['end_time'])
+    speedup = sequential_time / schedule_end if schedule_end else 0.0
+    return {
+        'critical_path_length': critical_path_length,
+        'makespan': schedule_end,
+        'sequential_time': sequential_time,
+        'slr': schedule_end / critical_path_length if critical_path_length else 0.0,
+        'speedup': speedup,
+        'efficiency': speedup / num_machines if num_machines else 0.0,
+        'utilisation': [busy / schedule_end if schedule_end else 0.0 for busy in busy_time],
+    }
 
 
 def convertir_date(secondes):
@@ -125,19 +178,19 @@ def SLR(G, nombre_machine):
     Returns:
     - float: The Schedule Length Ratio.
     """
-    MSP = makespan(G, nombre_machine)
-    crit_path = critical_path(G).total_seconds()
-    return MSP / crit_path
+    schedule = alg.allocate_jobs_to_machines_with_heuristic(G, num_machines=nombre_machine)
+    return schedule_metrics(G, schedule, nombre_machine)['slr']
 
 
 if __name__ == "__main__":
-    G = load_dag_from_json("./smallComplex.json")
+    G = load_dag_from_json("./data/smallComplex.json")
     Gt = transform_node_to_edge(G)
     print("Le poids total est", total_weight(Gt))
     print("Le poids du chemin critique est", critical_path(G))
-    MSP = makespan(G, 3)
-    print("Le makespan est de", convertir_date(makespan(G, 1500)))
-    print("Le SLR est de", SLR(G, 3))
+    metrics = schedule_metrics(G, alg.allocate_jobs_to_machines_with_heuristic(G, num_machines=3), 3)
+    print("Le makespan est de", datetime.timedelta(seconds=metrics['makespan']))
+    print("Le SLR est de", metrics['slr'])
+    print("L'efficacité est de", metrics['efficiency'])
 
 
 
@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import timeit
+from types import SimpleNamespace
+
+# Final states of a task, as the values of azure.batch.models.TaskState
+COMPLETED = "completed"
+MANIFEST_NAME = ".etags.json"
+
+
+def task_failed(task):
+    """
+    Whether a completed task failed: its execution result is 'failure', it has failure info or a non-zero exit code.
+    """
+    execution_info = getattr(task, "execution_info", None)
+    if execution_info is None:
+        return False
+    result = getattr(execution_info, "result", None)
+    return (str(getattr(result, "value", result)) == "failure" or getattr(execution_info, "failure_info", None) is not None
+            or (getattr(execution_info, "exit_code", None) or 0) != 0)
+
+
+def _state(task):
+    # TaskState is a str enum in the SDK, the stand-ins use plain strings
+    return str(getattr(task.state, "value", task.state))
+
+
+async def wait_for_tasks(batch_client, job_id, task_ids, initial_interval=1.0, max_interval=60.0, backoff=2.0,
+                         timeout=None, stop_on_failure=True, on_change=print):
+    """
+    Waits until every task of ``task_ids`` has completed, polling them all with one listing of the job per round.
+
+    The interval between rounds starts at ``initial_interval`` and is multiplied by ``backoff`` (with some jitter) up to
+    ``max_interval`` while nothing changes; it goes back to ``initial_interval`` as soon as a task changes state.
+
+    Args:
+    - batch_client: An azure.batch.BatchServiceClient, or any object whose ``task.list(job_id)`` returns tasks with an
+      ``id``, a ``state`` and an ``execution_info`` (e.g. :class:`LocalBatchClient`).
+    - job_id (str): The job of the tasks.
+    - task_ids (list of str): The tasks to wait for.
+    - initial_interval (float, optional): First polling interval in seconds. Defaults to 1.
+    - max_interval (float, optional): Largest polling interval in seconds. Defaults to 60.
+    - backoff (float, optional): Growth factor of the interval. Defaults to 2.
+    - timeout (float, optional): Gives up (raising TimeoutError) after that many seconds. Defaults to None (no limit).
+    - stop_on_failure (bool, optional): Returns as soon as one task fails instead of waiting for the others. Defaults to True.
+    - on_change (callable, optional): Called with a message on every change of state. Defaults to print.
+    Returns:
+    - dict: The latest state of each task ('completed', 'failed' for a completed task that failed, or the running
+      state of the tasks left when returning early on a failure).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+    states = dict.fromkeys(task_ids)
+    interval = initial_interval
+    while True:
+        tasks = await asyncio.to_thread(lambda: list(batch_client.task.list(job_id)))
+        changed = False
+        for task in tasks:
+            if task.id not in states:
+                continue
+            state = _state(task)
+            if state == COMPLETED and task_failed(task):
+                state = "failed"
+            if state != states[task.id]:
+                states[task.id] = state
+                changed = True
+                on_change(f"Task {task.id} status: {state}")
+        done = [state in (COMPLETED, "failed") for state in states.values()]
+        if all(done) or (stop_on_failure and "failed" in states.values()):
+            return states
+        interval = initial_interval if changed else min(interval * backoff, max_interval)
+        delay = interval * random.uniform(0.8, 1.0)
+        if deadline is not None:
+            if loop.time() + delay > deadline:
+                raise TimeoutError(f"Tasks of job {job_id} still running after {timeout}s: "
+                                   f"{[task_id for task_id, finished in zip(states, done) if not finished]}")
+        await asyncio.sleep(delay)
+
+
+def _download_blob(container_client, blob, path):
+    # Streamed chunk by chunk into a partial file, only moved in place once complete
+    partial_path = path + ".part"
+    with open(partial_path, "wb") as file_handle:
+        for chunk in container_client.get_blob_client(blob=blob.name).download_blob().chunks():
+            file_handle.write(chunk)
+    os.replace(partial_path, path)
+
+
+async def download_blobs(container_client, destination="./results", name_starts_with=None, max_concurrency=8,
+                         on_download=print):
+    """
+    Downloads the blobs of a container to ``destination``, preserving their names, at most ``max_concurrency`` at a time.
+
+    Each blob is streamed to disk chunk by chunk instead of being read into memory. Blobs whose local file already has
+    their size and whose etag matches the one recorded at their last download (in ``.etags.json`` of ``destination``)
+    are skipped, so downloading the results again only fetches what changed.
+
+    Args:
+    - container_client: An azure.storage.blob.ContainerClient, or any object with the same ``list_blobs`` and
+      ``get_blob_client(blob).download_blob().chunks()`` (e.g. :class:`LocalContainerClient`).
+    - destination (str, optional): Local directory of the files. Defaults to "./results".
+    - name_starts_with (str, optional): Only downloads the blobs whose name starts with it. Defaults to None (all).
+    - max_concurrency (int, optional): Number of blobs downloaded at once. Defaults to 8.
+    - on_download (callable, optional): Called with a message for each downloaded blob. Defaults to print.
+    Returns:
+    - tuple: The names of the downloaded blobs and those of the skipped blobs.
+    """
+    manifest_path = os.path.join(destination, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as file_handle:
+            etags = json.load(file_handle)
+    except (OSError, ValueError):
+        etags = {}
+    blobs = await asyncio.to_thread(lambda: list(container_client.list_blobs(name_starts_with=name_starts_with)))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    downloaded, skipped = [], []
+
+    async def fetch(blob):
+        path = os.path.join(destination, blob.name)
+        if etags.get(blob.name) == blob.etag and os.path.isfile(path) and os.path.getsize(path) == blob.size:
+            skipped.append(blob.name)
+            return
+        async with semaphore:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            await asyncio.to_thread(_download_blob, container_client, blob, path)
+        etags[blob.name] = blob.etag
+        downloaded.append(blob.name)
+        on_download(f"Downloaded {blob.name} to {path}")
+
+    try:
+        await asyncio.gather(*(fetch(blob) for blob in blobs))
+    finally:
+        # Whatever was downloaded before a failure is not fetched again on the next run
+        os.makedirs(destination, exist_ok=True)
+        with open(manifest_path, "w") as file_handle:
+            json.dump(etags, file_handle, indent=4)
+    return downloaded, skipped
+
+
+async def run_and_download(batch_client, container_client, job_id, task_ids, destination="./results",
+                           name_starts_with=None, max_concurrency=8, on_download=print, **polling):
+    """
+    Waits for the tasks (see :func:`wait_for_tasks`, which takes the keyword arguments ``polling``) and downloads their
+    results once they have all completed successfully (see :func:`download_blobs`).
+
+    Returns:
+    - dict: The latest state of each task. Nothing is downloaded if one of them failed.
+    """
+    states = await wait_for_tasks(batch_client, job_id, task_ids, **polling)
+    if all(state == COMPLETED for state in states.values()):
+        print("Tasks completed. Downloading files from blob ... ")
+        downloaded, skipped = await download_blobs(container_client, destination, name_starts_with=name_starts_with,
+                                                   max_concurrency=max_concurrency, on_download=on_download)
+        print(f"Download finished: {len(downloaded)} downloaded, {len(skipped)} already present.")
+    else:
+        print("Tasks failed:", [task_id for task_id, state in states.items() if state == "failed"])
+    return states
+
+
+class LocalBatchClient:
+    """
+    A local stand-in for azure.batch.BatchServiceClient, enough for :func:`wait_for_tasks`: each task is 'active', then
+    'running', then 'completed' after the given number of seconds from the creation of the client.
+
+    Args:
+    - durations (dict): The duration in seconds of each task id.
+    - failures (set, optional): The tasks that complete with exit code 1.
+    """
+
+    def __init__(self, durations, failures=()):
+        self.durations = dict(durations)
+        self.failures = set(failures)
+        self.calls = 0
+        self._start = timeit.default_timer()
+        self.task = self
+
+    def _task(self, task_id):
+        elapsed = timeit.default_timer() - self._start
+        duration = self.durations[task_id]
+        if elapsed >= duration:
+            execution_info = SimpleNamespace(exit_code=int(task_id in self.failures), failure_info=None,
+                                             result="failure" if task_id in self.failures else "success")
+            return SimpleNamespace(id=task_id, state=COMPLETED, execution_info=execution_info)
+        return SimpleNamespace(id=task_id, state="running" if elapsed >= duration / 2 else "active", execution_info=None)
+
+    def get(self, job_id, task_id):
+        self.calls += 1
+        return self._task(task_id)
+
+    def list(self, job_id, **kwargs):
+        self.calls += 1
+        return [self._task(task_id) for task_id in self.durations]
+
+
+class LocalContainerClient:
+    """
+    A local stand-in for azure.storage.blob.ContainerClient serving the files of a directory as blobs, enough for
+    :func:`download_blobs`. The etag of a blob is derived from the size and modification time of its file.
+
+    Args:
+    - root (str): The directory of the blobs.
+    - chunk_size (int, optional): Size of the chunks of a download. Defaults to 4 MiB.
+    """
+
+    def __init__(self, root, chunk_size=4 * 1024 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.downloads = 0
+
+    def list_blobs(self, name_starts_with=None):
+        for directory, _, files in os.walk(self.root):
+            for file_name in sorted(files):
+                path = os.path.join(directory, file_name)
+                name = os.path.relpath(path, self.root).replace(os.sep, "/")
+                if name_starts_with and not name.startswith(name_starts_with):
+                    continue
+                stat = os.stat(path)
+                yield SimpleNamespace(name=name, size=stat.st_size, etag=f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"')
+
+    def get_blob_client(self, blob):
+        return SimpleNamespace(download_blob=lambda: SimpleNamespace(chunks=lambda: self._chunks(blob)))
+
+    def _chunks(self, blob):
+        self.downloads += 1
+        with open(os.path.join(self.root, blob), "rb") as file_handle:
+            while chunk := file_handle.read(self.chunk_size):
+                yield chunk
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="batch_orchestration",
+                                     description="Runs the orchestration against local stand-ins of Batch and Blob storage.")
+    parser.add_argument("--num_tasks", type=int, default=20, help="Number of simulated tasks")
+    parser.add_argument("--max_seconds", type=float, default=3.0, help="Longest simulated task duration")
+    parser.add_argument("--num_blobs", type=int, default=50, help="Number of simulated result files")
+    parser.add_argument("--fail", action="store_true", help="Make one task fail")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    task_ids = [f"Task{i}" for i in range(args.num_tasks)]
+    batch_client = LocalBatchClient({task_id: rng.uniform(0, args.max_seconds) for task_id in task_ids},
+                                    failures=task_ids[:1] if args.fail else ())
+    with tempfile.TemporaryDirectory() as container, tempfile.TemporaryDirectory() as destination:
+        for i in range(args.num_blobs):
+            os.makedirs(os.path.join(container, "GreedgulerJob", task_ids[i % len(task_ids)]), exist_ok=True)
+            with open(os.path.join(container, "GreedgulerJob", task_ids[i % len(task_ids)], f"out{i}.txt"), "wb") as f:
+                f.write(os.urandom(rng.randint(1, 1 << 20)))
+        container_client = LocalContainerClient(container, chunk_size=64 * 1024)
+        start_time = timeit.default_timer()
+        states = asyncio.run(run_and_download(batch_client, container_client, "GreedgulerJob", task_ids, destination,
+                                              initial_interval=0.1, max_interval=1.0, on_change=lambda message: None,
+                                              on_download=lambda message: None))
+        print(f"Finished in {timeit.default_timer() - start_time:.2f}s with {batch_client.calls} listings of the job")
+        if not args.fail:
+            downloaded, skipped = asyncio.run(download_blobs(container_client, destination, on_download=lambda message: None))
+            print(f"Second download: {len(downloaded)} downloaded, {len(skipped)} skipped")
@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+import algorithm
+import compiled_dag
+import data_loader
+
+DATA_FILES = ["data/xsmallComplex.json", "data/smallComplex.json", "data/MediumComplex.json"]
+# (num_nodes, density_level) of the generated graphs, a lower density level giving more edges
+GENERATED_SIZES = [(250, 8), (250, 2), (1000, 8), (1000, 2), (2000, 8), (2000, 2)]
+
+
+def _makespan(schedule):
+    return max([machine[-1]["end_time"] for machine in schedule if machine], default=0)
+
+
+def _rx_heuristic(graph, num_machines):
+    jobs = algorithm.allocate_jobs_to_machines_with_heuristic_rx(graph, num_machines=num_machines)
+    return algorithm.transform_allocation_format(jobs, num_machines)
+
+
+# Scheduler name -> (input format, function returning a list of lists schedule)
+SCHEDULERS = {
+    "heft": ("nx", algorithm.heft),
+    "allocate_jobs_to_machines_nx": ("nx", algorithm.allocate_jobs_to_machines_nx),
+    "rx_heuristic": ("rx", _rx_heuristic),
+}
+
+
+def measure(scheduler, graph, num_machines, repeat=3):
+    """
+    Runs a scheduler on a graph and measures it.
+
+    The wall time is the best of ``repeat`` runs; the peak memory is measured in a separate run under tracemalloc, so that
+    tracing does not inflate the timings.
+
+    Args:
+    - scheduler (callable): A function (graph, num_machines) returning a list of lists schedule.
+    - graph (Any): The graph in the format the scheduler expects.
+    - num_machines (int): The number of machines.
+    - repeat (int, optional): The number of timed runs. Defaults to 3.
+    Returns:
+    - dict: 'wall_time' (s), 'peak_memory_mb' and the 'schedule' of the last run.
+    """
+    wall_time = float("inf")
+    for _ in range(repeat):
+        start_time = timeit.default_timer()
+        schedule = scheduler(graph, num_machines)
+        wall_time = min(wall_time, timeit.default_timer() - start_time)
+    tracemalloc.start()
+    scheduler(graph, num_machines)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"wall_time": wall_time, "peak_memory_mb": peak / (1024 * 1024), "schedule": schedule}
+
+
+def iter_inputs(data_files, generated_sizes, max_duration=3600, seed=0):
+    """
+    Yields (name, nx graph, rx graph) for every bundled data file and generated graph.
+    """
+    for path in data_files:
+        if not os.path.exists(path):
+            print("Skipping missing file " + path)
+            continue
+        yield path, data_loader.load_dag_from_json(path), data_loader.load_dag_from_json_rx(path)
+    for num_nodes, density_level in generated_sizes:
+        graph = data_loader.generate_random_dag(num_nodes, max_duration, density_level=density_level, seed=seed)
+        yield f"random_{num_nodes}_d{density_level}", graph, data_loader.rx_from_nx(graph)
+
+
+def run_benchmarks(machine_counts, schedulers=None, data_files=DATA_FILES, generated_sizes=GENERATED_SIZES, repeat=3):
+    """
+    Runs every scheduler on every input and machine count.
+
+    Returns:
+    - list of dict: One record per run with the input, its size, the scheduler, the machine count, 'wall_time',
+      'peak_memory_mb', 'makespan' and 'slr' (makespan over critical path length).
+    """
+    schedulers = schedulers or list(SCHEDULERS)
+    results = []
+    for name, graph, rx_graph in iter_inputs(data_files, generated_sizes):
+        dag = compiled_dag.compile_dag(graph)
+        critical_path_length = float(compiled_dag.upward_ranks(dag).max()) if dag.num_nodes else 0.0
+        for scheduler_name in schedulers:
+            input_format, scheduler = SCHEDULERS[scheduler_name]
+            for num_machines in machine_counts:
+                measured = measure(scheduler, rx_graph if input_format == "rx" else graph, num_machines, repeat=repeat)
+                makespan = _makespan(measured["schedule"])
+                record = {"input": name, "num_nodes": dag.num_nodes, "num_edges": dag.num_edges,
+                          "scheduler": scheduler_name, "num_machines": num_machines,
+                          "wall_time": measured["wall_time"], "peak_memory_mb": measured["peak_memory_mb"],
+                          "makespan": makespan,
+                          "slr": makespan / critical_path_length if critical_path_length else None}
+                print(f"{name:<28} {scheduler_name:<30} m={num_machines:<4} {record['wall_time']:.4f}s "
+                      f"{record['peak_memory_mb']:.1f}MB makespan={makespan:.1f} slr={record['slr']}")
+                results.append(record)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current, tolerance=0.10):
+    """
+    Compares two benchmark reports and returns the runs whose wall time, peak memory or makespan grew by more than
+    ``tolerance`` (relative).
+
+    Returns:
+    - list of dict: The regressions, with the metric, the previous and the current value.
+    """
+    key = lambda record: (record["input"], record["scheduler"], record["num_machines"])
+    previous_records = {key(record): record for record in previous["results"]}
+    regressions = []
+    for record in current["results"]:
+        before = previous_records.get(key(record))
+        if before is None:
+            continue
+        for metric in ("wall_time", "peak_memory_mb", "makespan"):
+            if before[metric] and record[metric] > before[metric] * (1 + tolerance):
+                regressions.append({"input": record["input"], "scheduler": record["scheduler"],
+                                    "num_machines": record["num_machines"], "metric": metric,
+                                    "previous": before[metric], "current": record[metric]})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="benchmark")
+    parser.add_argument("--num_machines", type=int, nargs="+", default=[3, 8, 32], help="Machine counts to schedule on")
+    parser.add_argument("--schedulers", nargs="+", choices=list(SCHEDULERS), help="Schedulers to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per measurement (the best is kept)")
+    parser.add_argument("--no_generated", action="store_true", help="Only run on the bundled data files")
+    parser.add_argument("--output", default="intermediates/benchmark.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Relative increase reported as a regression")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "date": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": run_benchmarks(args.num_machines, schedulers=args.schedulers,
+                                  generated_sizes=[] if args.no_generated else GENERATED_SIZES, repeat=args.repeat),
+    }
+    with open(args.output, "w") as file_handle:
+        json.dump(report, file_handle, indent=2)
+    print("Report written to " + args.output)
+
+    if args.compare:
+        with open(args.compare) as file_handle:
+            regressions = compare(json.load(file_handle), report, tolerance=args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,262 @@
+import json
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import compiled_dag
+
+# The jobs of one machine, as slices of the columns of a ColumnarSchedule
+MachineView = namedtuple("MachineView", ["job_ids", "start_times", "end_times"])
+
+
+class ColumnarSchedule:
+    """
+    A schedule stored as parallel arrays, one entry per job, instead of one dict per job.
+
+    Jobs are grouped by machine and ordered by start time within each machine, so the jobs of machine ``m`` are the
+    entries ``machine_offsets[m]:machine_offsets[m + 1]`` of every column. Indexing or iterating the schedule gives the
+    legacy list of lists of dicts (see :meth:`to_legacy`), built on first use only, so code written for the legacy
+    format keeps working.
+
+    Attributes:
+    - job_ids (np.ndarray): The original id of each job (int64 when possible).
+    - machines (np.ndarray): int64 vector of the machine of each job.
+    - start_times (np.ndarray): float64 vector of the start time of each job, in seconds.
+    - end_times (np.ndarray): float64 vector of the end time of each job, in seconds.
+    - machine_offsets (np.ndarray): int64 vector of length ``num_machines + 1``.
+    """
+
+    def __init__(self, job_ids, machines, start_times, end_times, num_machines=None):
+        job_ids = job_ids if isinstance(job_ids, np.ndarray) else compiled_dag._as_id_array(job_ids)
+        machines = np.asarray(machines, dtype=np.int64)
+        start_times = np.asarray(start_times, dtype=np.float64)
+        end_times = np.asarray(end_times, dtype=np.float64)
+        if num_machines is None:
+            num_machines = int(machines.max()) + 1 if len(machines) else 0
+        if len(machines) and (machines.min() < 0 or machines.max() >= num_machines):
+            raise ValueError(f"Machine indices must lie in [0, {num_machines}).")
+        # Stable, so jobs starting together keep the order they were placed in
+        order = np.lexsort((start_times, machines))
+        self.job_ids = job_ids[order]
+        self.machines = machines[order]
+        self.start_times = start_times[order]
+        self.end_times = end_times[order]
+        self.machine_offsets = np.zeros(num_machines + 1, dtype=np.int64)
+        np.cumsum(np.bincount(machines, minlength=num_machines), out=self.machine_offsets[1:])
+        self._legacy = None
+
+    @classmethod
+    def from_tasks(cls, dag: compiled_dag.CompiledDAG, tasks, machines, start_times, end_times, num_machines=None):
+        """
+        Builds a schedule from the compact ids of the jobs of a compiled DAG.
+        """
+        return cls(dag.node_ids[np.asarray(tasks, dtype=np.int64)], machines, start_times, end_times, num_machines)
+
+    @classmethod
+    def from_legacy(cls, schedule):
+        """
+        Builds a schedule from the legacy list of lists of dicts.
+        """
+        jobs = [job for machine_schedule in schedule for job in machine_schedule]
+        machines = np.repeat(np.arange(len(schedule)), [len(machine_schedule) for machine_schedule in schedule])
+        return cls([job["job_index"] for job in jobs], machines, [job["start_time"] for job in jobs],
+                   [job["end_time"] for job in jobs], num_machines=len(schedule))
+
+    @property
+    def num_machines(self):
+        return len(self.machine_offsets) - 1
+
+    @property
+    def num_jobs(self):
+        return len(self.job_ids)
+
+    @property
+    def durations(self):
+        return self.end_times - self.start_times
+
+    @property
+    def makespan(self):
+        """The end time of the last job (0 for an empty schedule)."""
+        return float(self.end_times.max()) if self.num_jobs else 0.0
+
+    def machine_view(self, machine: int):
+        """
+        Returns the jobs of ``machine`` as a :class:`MachineView` of array slices, without copying them.
+        """
+        begin, end = self.machine_offsets[machine], self.machine_offsets[machine + 1]
+        return MachineView(self.job_ids[begin:end], self.start_times[begin:end], self.end_times[begin:end])
+
+    def to_legacy(self):
+        """
+        Returns the schedule as a list of lists of dicts with keys 'start_time', 'end_time', 'duration' and
+        'job_index', one list per machine. It is built on the first call and cached.
+        """
+        if self._legacy is None:
+            jobs = [{'start_time': start_time, 'end_time': end_time, 'duration': duration, 'job_index': job_id}
+                    for job_id, start_time, end_time, duration in zip(self.job_ids.tolist(), self.start_times.tolist(),
+                                                                      self.end_times.tolist(), self.durations.tolist())]
+            offsets = self.machine_offsets.tolist()
+            self._legacy = [jobs[offsets[machine]:offsets[machine + 1]] for machine in range(self.num_machines)]
+        return self._legacy
+
+    def __len__(self):
+        return self.num_machines
+
+    def __getitem__(self, machine):
+        return self.to_legacy()[machine]
+
+    def __iter__(self):
+        return iter(self.to_legacy())
+
+    def write_json(self, file_handle):
+        """
+        Writes the schedule in the legacy JSON layout (the one ``json.dump`` gives for :meth:`to_legacy`), straight from
+        the columns. Raises ValueError on infinite or NaN times, which JSON cannot hold.
+        """
+        if not (np.isfinite(self.start_times).all() and np.isfinite(self.end_times).all()):
+            raise ValueError("Start and end times must be finite to be written as JSON.")
+        if self.job_ids.dtype == np.int64:
+            job_ids = [str(job_id) for job_id in self.job_ids.tolist()]
+        else:
+            job_ids = [json.dumps(job_id) for job_id in self.job_ids.tolist()]
+        jobs = [f'{{"start_time": {start_time!r}, "end_time": {end_time!r}, "duration": {duration!r}, "job_index": {job_id}}}'
+                for job_id, start_time, end_time, duration in zip(job_ids, self.start_times.tolist(),
+                                                                  self.end_times.tolist(), self.durations.tolist())]
+        offsets = self.machine_offsets.tolist()
+        file_handle.write("[" + ", ".join("[" + ", ".join(jobs[offsets[machine]:offsets[machine + 1]]) + "]"
+                                          for machine in range(self.num_machines)) + "]")
+
+
+def as_columnar(schedule):
+    """
+    Returns ``schedule`` as a :class:`ColumnarSchedule`, converting it if it is in the legacy list of lists format.
+    """
+    return schedule if isinstance(schedule, ColumnarSchedule) else ColumnarSchedule.from_legacy(schedule)
+
+
+def dump_json(schedule, file_handle):
+    """
+    Writes a schedule, columnar or legacy, in the legacy JSON layout. Raises ValueError on infinite or NaN times.
+    """
+    if isinstance(schedule, ColumnarSchedule):
+        schedule.write_json(file_handle)
+    else:
+        json.dump(schedule, file_handle, allow_nan=False)
+
+
+class NDJSONScheduleWriter:
+    """
+    Writes a schedule as line-delimited JSON, one line per job with its 'job_index', 'machine', 'start_time' and
+    'end_time', written as soon as the job is placed. A first line gives 'num_machines', so that machines left empty
+    are not lost on reading.
+
+    Args:
+    - file_handle: A text file open for writing.
+    - num_machines (int): The number of machines of the schedule.
+    """
+
+    def __init__(self, file_handle, num_machines: int):
+        self._file_handle = file_handle
+        file_handle.write(f'{{"num_machines": {int(num_machines)}}}\n')
+
+    def write(self, job_id, machine: int, start_time: float, end_time: float):
+        """Writes the line of one job. Raises ValueError on infinite or NaN times, which JSON cannot hold."""
+        if not (math.isfinite(start_time) and math.isfinite(end_time)):
+            raise ValueError(f"Start and end times of job {job_id} must be finite to be written as JSON.")
+        job_id = job_id if type(job_id) is int else json.dumps(job_id)
+        self._file_handle.write(f'{{"job_index": {job_id}, "machine": {int(machine)}, '
+                                f'"start_time": {float(start_time)!r}, "end_time": {float(end_time)!r}}}\n')
+
+    def write_schedule(self, schedule: ColumnarSchedule):
+        """Writes the lines of every job of a schedule."""
+        for job_id, machine, start_time, end_time in zip(schedule.job_ids.tolist(), schedule.machines.tolist(),
+                                                         schedule.start_times.tolist(), schedule.end_times.tolist()):
+            self.write(job_id, machine, start_time, end_time)
+
+
+def read_ndjson(file_handle):
+    """
+    Reads a schedule written by :class:`NDJSONScheduleWriter`. Lines may come in any order.
+    """
+    num_machines = None
+    job_ids, machines, start_times, end_times = [], [], [], []
+    for line in file_handle:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "num_machines" in record:
+            num_machines = record["num_machines"]
+            continue
+        job_ids.append(record["job_index"])
+        machines.append(record["machine"])
+        start_times.append(record["start_time"])
+        end_times.append(record["end_time"])
+    return ColumnarSchedule(job_ids, machines, start_times, end_times, num_machines)
+
+
+def save_npz(schedule, path):
+    """
+    Saves a schedule, columnar or legacy, as the columns of an uncompressed .npz archive. Ids that are not integers are
+    stored as strings.
+    """
+    schedule = as_columnar(schedule)
+    job_ids = schedule.job_ids if schedule.job_ids.dtype == np.int64 else schedule.job_ids.astype(str)
+    np.savez(path, job_ids=job_ids, machines=schedule.machines, start_times=schedule.start_times,
+             end_times=schedule.end_times, num_machines=np.int64(schedule.num_machines))
+
+
+def load_npz(path):
+    """
+    Loads a schedule saved by :func:`save_npz`.
+    """
+    with np.load(path) as archive:
+        job_ids = archive["job_ids"]
+        if job_ids.dtype != np.int64:
+            job_ids = compiled_dag._as_id_array(job_ids.tolist())
+        return ColumnarSchedule(job_ids, archive["machines"], archive["start_times"], archive["end_times"],
+                                int(archive["num_machines"]))
+
+
+def schedule_format(path):
+    """
+    Returns the format of a schedule file from its extension: 'npz', 'ndjson' (.ndjson or .jsonl) or 'json' (the legacy
+    list of lists of dicts) for anything else.
+    """
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    return {".npz": "npz", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(extension, "json")
+
+
+def save_schedule(schedule, path, format=None):
+    """
+    Saves a schedule, columnar or legacy, in ``format`` ('json', 'ndjson' or 'npz'), by default the one of the extension
+    of ``path`` (see :func:`schedule_format`).
+    """
+    format = format or schedule_format(path)
+    if format == "npz":
+        save_npz(schedule, path)
+        return
+    with open(path, "w") as file_handle:
+        if format == "ndjson":
+            schedule = as_columnar(schedule)
+            NDJSONScheduleWriter(file_handle, schedule.num_machines).write_schedule(schedule)
+        elif format == "json":
+            dump_json(schedule, file_handle)
+        else:
+            raise ValueError(f"Unknown schedule format {format}.")
+
+
+def load_schedule(path, format=None):
+    """
+    Loads a schedule saved in any of the formats of :func:`save_schedule` as a :class:`ColumnarSchedule`.
+    """
+    format = format or schedule_format(path)
+    if format == "npz":
+        return load_npz(path)
+    with open(path) as file_handle:
+        if format == "ndjson":
+            return read_ndjson(file_handle)
+        if format == "json":
+            return ColumnarSchedule.from_legacy(json.load(file_handle))
+    raise ValueError(f"Unknown schedule format {format}.")
@@ -0,0 +1,357 @@
+import numpy as np
+import networkx as nx
+from datetime import timedelta
+from multiprocessing import shared_memory
+
+
+class CompiledDAG:
+    """
+    A read-only, array-backed representation of a task DAG.
+
+    Nodes are renumbered to compact ids ``0..num_nodes-1``. Successors and predecessors are stored
+    in CSR form : the successors of node ``i`` are ``succ_indices[succ_offsets[i]:succ_offsets[i+1]]``
+    (and likewise for predecessors), so that every traversal is a slice instead of a graph lookup.
+
+    Attributes:
+    - node_ids (np.ndarray): The original identifier of each compact node (int64 when possible).
+    - durations (np.ndarray): float64 vector of the node durations, in seconds.
+    - succ_offsets (np.ndarray): int64 vector of length ``num_nodes + 1``.
+    - succ_indices (np.ndarray): int64 vector of successor compact ids, grouped by source node.
+    - pred_offsets (np.ndarray): int64 vector of length ``num_nodes + 1``.
+    - pred_indices (np.ndarray): int64 vector of predecessor compact ids, grouped by target node.
+    - edge_sizes (np.ndarray or None): float64 vector of the size of the data sent along each edge, aligned with
+      ``succ_indices``, when the input gives them.
+    - edge_latencies (np.ndarray or None): float64 vector of the fixed latency (in seconds) of each edge, aligned with
+      ``succ_indices``, when the input gives them.
+    """
+
+    def __init__(self, node_ids, durations, succ_offsets, succ_indices, pred_offsets, pred_indices, edge_sizes=None,
+                 edge_latencies=None):
+        self.node_ids = node_ids
+        self.durations = durations
+        self.succ_offsets = succ_offsets
+        self.succ_indices = succ_indices
+        self.pred_offsets = pred_offsets
+        self.pred_indices = pred_indices
+        self.edge_sizes = edge_sizes
+        self.edge_latencies = edge_latencies
+        self._index = None
+
+    @property
+    def num_nodes(self):
+        return len(self.durations)
+
+    @property
+    def num_edges(self):
+        return len(self.succ_indices)
+
+    def index_of(self, node_id):
+        """
+        Returns the compact id of a node given its original identifier.
+        """
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.node_ids.tolist())}
+        return self._index[node_id]
+
+    def successors(self, i):
+        return self.succ_indices[self.succ_offsets[i]:self.succ_offsets[i + 1]]
+
+    def predecessors(self, i):
+        return self.pred_indices[self.pred_offsets[i]:self.pred_offsets[i + 1]]
+
+
+def _as_id_array(node_ids):
+    """
+    Keeps integer node ids in an int64 vector and falls back to an object vector for anything else
+    (e.g. the string ids of a graph reloaded from GraphML).
+    """
+    node_ids = list(node_ids)
+    if all(isinstance(node, (int, np.integer)) and not isinstance(node, bool) for node in node_ids):
+        return np.asarray(node_ids, dtype=np.int64)
+    array = np.empty(len(node_ids), dtype=object)
+    array[:] = node_ids
+    return array
+
+
+def _csr(keys, values, num_nodes):
+    """
+    Groups ``values`` by ``keys`` and returns the (offsets, indices) CSR pair, and the order of the input entries in it.
+    """
+    order = np.lexsort((values, keys))
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=num_nodes), out=offsets[1:])
+    return offsets, values[order], order
+
+
+def from_edges(node_ids, durations, sources, targets, sizes=None, latencies=None):
+    """
+    Builds a CompiledDAG from compact edge arrays.
+
+    Args:
+    - node_ids (sequence): The original identifier of each compact node.
+    - durations (sequence of float): The duration of each node in seconds.
+    - sources (sequence of int): Compact id of the source of each edge.
+    - targets (sequence of int): Compact id of the target of each edge.
+    - sizes (sequence of float, optional): Size of the data sent along each edge.
+    - latencies (sequence of float, optional): Fixed latency of each edge, in seconds.
+    Returns:
+    - CompiledDAG: The compiled graph.
+    """
+    durations = np.ascontiguousarray(durations, dtype=np.float64)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    num_nodes = len(durations)
+    succ_offsets, succ_indices, order = _csr(sources, targets, num_nodes)
+    pred_offsets, pred_indices, _ = _csr(targets, sources, num_nodes)
+    if not isinstance(node_ids, np.ndarray):
+        node_ids = _as_id_array(node_ids)
+    if sizes is not None:
+        sizes = np.asarray(sizes, dtype=np.float64)[order]
+    if latencies is not None:
+        latencies = np.asarray(latencies, dtype=np.float64)[order]
+    return CompiledDAG(node_ids, durations, succ_offsets, succ_indices, pred_offsets, pred_indices, sizes, latencies)
+
+
+def _seconds(duration):
+    if isinstance(duration, timedelta):
+        return duration.total_seconds()
+    return float(duration)
+
+
+def compile_dag(graph: nx.DiGraph):
+    """
+    Compiles a networkx DAG whose nodes carry a 'duration' attribute into a CompiledDAG. The optional 'data_size' and
+    'latency' edge attributes are kept as the communication data of the edges.
+
+    Args:
+    - graph (nx.DiGraph): The DAG of tasks.
+    Returns:
+    - CompiledDAG: The compiled graph, with nodes numbered in ``graph.nodes`` order.
+    """
+    node_ids = list(graph.nodes)
+    index = {node: i for i, node in enumerate(node_ids)}
+    durations = np.fromiter((_seconds(duration) for _, duration in graph.nodes(data="duration", default=0.0)),
+                            dtype=np.float64, count=len(node_ids))
+    num_edges = graph.number_of_edges()
+    sources = np.fromiter((index[u] for u, _ in graph.edges), dtype=np.int64, count=num_edges)
+    targets = np.fromiter((index[v] for _, v in graph.edges), dtype=np.int64, count=num_edges)
+    edge_data = {}
+    for attribute in ("data_size", "latency"):
+        values = np.fromiter((value for _, _, value in graph.edges(data=attribute, default=0.0)), dtype=np.float64,
+                             count=num_edges)
+        edge_data[attribute] = values if values.any() else None
+    return from_edges(node_ids, durations, sources, targets, sizes=edge_data["data_size"], latencies=edge_data["latency"])
+
+
+def to_networkx(dag: CompiledDAG):
+    """
+    Rebuilds a networkx DAG (original node ids, 'duration' attribute in seconds) from a CompiledDAG.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    Returns:
+    - nx.DiGraph: The equivalent networkx graph.
+    """
+    graph = nx.DiGraph()
+    node_ids = dag.node_ids.tolist()
+    graph.add_nodes_from((node, {"duration": duration}) for node, duration in zip(node_ids, dag.durations.tolist()))
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets)).tolist()
+    graph.add_edges_from((node_ids[u], node_ids[v]) for u, v in zip(sources, dag.succ_indices.tolist()))
+    for attribute, values in (("data_size", dag.edge_sizes), ("latency", dag.edge_latencies)):
+        if values is not None:
+            nx.set_edge_attributes(graph, {(node_ids[u], node_ids[v]): value for u, v, value in
+                                           zip(sources, dag.succ_indices.tolist(), values.tolist())}, attribute)
+    return graph
+
+
+def _gather(offsets, indices, rows):
+    """
+    Concatenates the CSR slices of ``rows`` in one vectorised step.
+
+    Returns:
+    - tuple: The concatenated values and the length of each row's slice.
+    """
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return indices[:0], counts
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return indices[positions], counts
+
+
+def topological_levels(dag: CompiledDAG):
+    """
+    Splits the DAG into topological generations : level 0 holds the nodes without predecessors and
+    level k the nodes whose predecessors all sit in levels below k.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    Returns:
+    - list of np.ndarray: The compact ids of each level.
+    Raises:
+    - ValueError: If the graph contains a cycle.
+    """
+    in_degree = np.diff(dag.pred_offsets)
+    current = np.flatnonzero(in_degree == 0)
+    levels = []
+    seen = 0
+    while current.size:
+        levels.append(current)
+        seen += current.size
+        successors, _ = _gather(dag.succ_offsets, dag.succ_indices, current)
+        np.subtract.at(in_degree, successors, 1)
+        current = np.unique(successors[in_degree[successors] == 0])
+    if seen != dag.num_nodes:
+        raise ValueError("The graph contains a cycle and cannot be scheduled.")
+    return levels
+
+
+def upward_ranks(dag: CompiledDAG, levels=None, durations=None, edge_costs=None):
+    """
+    Computes the HEFT upward rank of every node : its own duration plus the largest rank among its
+    successors (plus the cost of the edge to it, if any), i.e. the length of the longest path from the node to an
+    exit node.
+
+    The ranks are computed level by level in reverse topological order, each level being a single
+    ``np.maximum.reduceat`` over the concatenated successor ranks.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    - levels (list of np.ndarray, optional): Precomputed topological levels.
+    - durations (np.ndarray, optional): Node weights to use instead of ``dag.durations``, e.g. the average cost of each
+      node over heterogeneous machines.
+    - edge_costs (np.ndarray, optional): Weight of each edge, aligned with ``succ_indices`` (see transfer_times).
+    Returns:
+    - np.ndarray: float64 vector of ranks indexed by compact id.
+    """
+    if levels is None:
+        levels = topological_levels(dag)
+    ranks = np.array(dag.durations if durations is None else durations, dtype=np.float64)
+    for level in reversed(levels):
+        counts = dag.succ_offsets[level + 1] - dag.succ_offsets[level]
+        level = level[counts > 0]
+        if not level.size:
+            continue
+        successors, counts = _gather(dag.succ_offsets, dag.succ_indices, level)
+        segment_starts = np.cumsum(counts) - counts
+        successor_ranks = ranks[successors]
+        if edge_costs is not None:
+            successor_ranks += _gather(dag.succ_offsets, edge_costs, level)[0]
+        ranks[level] += np.maximum.reduceat(successor_ranks, segment_starts)
+    return ranks
+
+
+def topological_positions(levels, num_nodes):
+    """
+    Returns the position of every node in the topological order given by ``levels``.
+    """
+    positions = np.empty(num_nodes, dtype=np.int64)
+    if levels:
+        positions[np.concatenate(levels)] = np.arange(num_nodes)
+    return positions
+
+
+def critical_path(dag: CompiledDAG, ranks=None):
+    """
+    Returns the critical path of the DAG, i.e. its longest path in terms of total duration.
+
+    The path starts at the node of largest upward rank and repeatedly follows the successor of largest rank.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    - ranks (np.ndarray, optional): Precomputed upward ranks.
+    Returns:
+    - list of int: The compact ids of the nodes on the critical path, in order.
+    """
+    if dag.num_nodes == 0:
+        return []
+    if ranks is None:
+        ranks = upward_ranks(dag)
+    node = int(np.argmax(ranks))
+    path = [node]
+    while dag.succ_offsets[node + 1] > dag.succ_offsets[node]:
+        successors = dag.successors(node)
+        node = int(successors[np.argmax(ranks[successors])])
+        path.append(node)
+    return path
+
+
+def transfer_times(dag: CompiledDAG, bandwidth=None, latency=0.0):
+    """
+    Returns the time needed to send the data of every edge from one machine to another : ``latency`` plus the latency
+    of the edge plus its data size over ``bandwidth``. Two tasks on the same machine exchange their data for free.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    - bandwidth (float, optional): Data size sent per second. Defaults to ignoring the data sizes.
+    - latency (float, optional): Latency added to every transfer, in seconds. Defaults to 0.
+    Returns:
+    - np.ndarray or None: float64 vector aligned with ``succ_indices``, or None if every transfer is free.
+    """
+    times = np.full(dag.num_edges, float(latency))
+    if dag.edge_latencies is not None:
+        times += dag.edge_latencies
+    if bandwidth is not None and dag.edge_sizes is not None:
+        times += dag.edge_sizes / bandwidth
+    return times if times.any() else None
+
+
+def predecessor_edges(dag: CompiledDAG):
+    """
+    Returns, for every entry of ``pred_indices``, the position of the same edge in ``succ_indices``, so that edge data
+    can be read while walking predecessors.
+    """
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    return np.lexsort((sources, dag.succ_indices))
+
+
+_ARRAY_FIELDS = ("durations", "succ_offsets", "succ_indices", "pred_offsets", "pred_indices", "edge_sizes", "edge_latencies")
+
+
+def to_shared_memory(dag: CompiledDAG):
+    """
+    Copies the arrays of a CompiledDAG into one shared memory block, so that worker processes can attach to the graph
+    instead of receiving a pickled copy each.
+
+    Args:
+    - dag (CompiledDAG): The compiled graph.
+    Returns:
+    - tuple: The SharedMemory block, which the caller must close and unlink once the workers are done, and a small
+      picklable descriptor to pass to attach_shared_memory.
+    """
+    arrays = {field: getattr(dag, field) for field in _ARRAY_FIELDS if getattr(dag, field) is not None}
+    integer_ids = dag.node_ids.dtype == np.int64
+    if integer_ids:
+        arrays["node_ids"] = dag.node_ids
+    size = sum(array.nbytes for array in arrays.values())
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    layout = {}
+    offset = 0
+    for field, array in arrays.items():
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)[:] = array
+        layout[field] = (offset, len(array), array.dtype.str)
+        offset += array.nbytes
+    descriptor = {"name": block.name, "layout": layout,
+                  "node_ids": None if integer_ids else dag.node_ids.tolist()}
+    return block, descriptor
+
+
+def attach_shared_memory(descriptor):
+    """
+    Attaches to a DAG published with to_shared_memory.
+
+    Args:
+    - descriptor (dict): The descriptor returned by to_shared_memory.
+    Returns:
+    - tuple: The SharedMemory block (keep a reference to it as long as the graph is used, then close it) and the
+      CompiledDAG whose arrays are read-only views of the block.
+    """
+    block = shared_memory.SharedMemory(name=descriptor["name"])
+    arrays = {}
+    for field, (offset, length, dtype) in descriptor["layout"].items():
+        array = np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf, offset=offset)
+        array.flags.writeable = False
+        arrays[field] = array
+    node_ids = arrays.pop("node_ids") if descriptor["node_ids"] is None else _as_id_array(descriptor["node_ids"])
+    return block, CompiledDAG(node_ids, **arrays)
@@ -0,0 +1,179 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import timeit
+
+import numpy as np
+
+import compiled_dag
+import data_loader
+
+# Layout of a .gdag file : a fixed-size header followed by the arrays of the CompiledDAG, all 8-byte values, in the order
+# durations (float64), node_ids, succ_offsets, succ_indices, pred_offsets, pred_indices (int64), then the edge data the
+# header flags announce, edge_sizes and edge_latencies (float64).
+MAGIC = b"GDAG"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHqqqq32s")
+HEADER_SIZE = 128
+FLAG_EDGE_SIZES = 1
+FLAG_EDGE_LATENCIES = 2
+
+
+def cache_path_for(json_path: str):
+    """
+    Returns the default location of the compiled cache of a DAG JSON file (next to it, with a .gdag extension).
+    """
+    return os.path.splitext(json_path)[0] + ".gdag"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file_handle:
+        for chunk in iter(lambda: file_handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _new_file_mode():
+    # The mode open() gives a new file, whereas mkstemp always gives 0600
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_gdag(dag: compiled_dag.CompiledDAG, path: str, source_path: str = None):
+    """
+    Writes a CompiledDAG to a .gdag file. The file is written next to its destination and renamed into place, so readers
+    (e.g. the other instances of a multi-instance task) never see a partial file.
+
+    Args:
+    - dag (compiled_dag.CompiledDAG): The compiled graph. Its node ids must be integers.
+    - path (str): The destination .gdag file.
+    - source_path (str, optional): The JSON file the graph was loaded from, whose size, mtime and hash are recorded.
+    """
+    if dag.node_ids.dtype != np.int64:
+        raise ValueError("Only DAGs with integer node ids can be written to a .gdag file.")
+    if source_path is not None:
+        stat = os.stat(source_path)
+        source_size, source_mtime, source_hash = stat.st_size, stat.st_mtime_ns, _file_sha256(source_path)
+    else:
+        source_size, source_mtime, source_hash = -1, -1, bytes(32)
+    flags = (FLAG_EDGE_SIZES if dag.edge_sizes is not None else 0) | (FLAG_EDGE_LATENCIES if dag.edge_latencies is not None else 0)
+    header = _HEADER.pack(MAGIC, VERSION, flags, dag.num_nodes, dag.num_edges, source_size, source_mtime, source_hash)
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".gdag.tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file_handle:
+            if hasattr(os, "fchmod"):
+                # Readable by the other users of a shared directory, as a file written in place would be
+                os.fchmod(file_handle.fileno(), _new_file_mode())
+            file_handle.write(header.ljust(HEADER_SIZE, b"\0"))
+            for values, dtype in ((dag.durations, np.float64), (dag.node_ids, np.int64),
+                                  (dag.succ_offsets, np.int64), (dag.succ_indices, np.int64),
+                                  (dag.pred_offsets, np.int64), (dag.pred_indices, np.int64),
+                                  (dag.edge_sizes, np.float64), (dag.edge_latencies, np.float64)):
+                if values is not None:
+                    file_handle.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+def read_header(path: str):
+    """
+    Reads the header of a .gdag file.
+
+    Returns:
+    - dict: 'flags', 'num_nodes', 'num_edges', 'source_size', 'source_mtime_ns' and 'source_sha256'.
+    Raises:
+    - ValueError: If the file is not a .gdag file of a supported version.
+    """
+    with open(path, "rb") as file_handle:
+        raw = file_handle.read(HEADER_SIZE)
+    if len(raw) < _HEADER.size:
+        raise ValueError(f"{path} is not a .gdag file.")
+    magic, version, flags, num_nodes, num_edges, source_size, source_mtime, source_hash = _HEADER.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} .gdag file.")
+    return {"flags": flags, "num_nodes": num_nodes, "num_edges": num_edges, "source_size": source_size,
+            "source_mtime_ns": source_mtime, "source_sha256": source_hash}
+
+
+def load_gdag(path: str):
+    """
+    Maps a .gdag file in memory and returns a CompiledDAG whose arrays are read-only views of the mapping. Nothing is
+    copied, so processes loading the same file share a single page-cache copy.
+
+    Args:
+    - path (str): The .gdag file.
+    Returns:
+    - compiled_dag.CompiledDAG: The compiled graph.
+    """
+    header = read_header(path)
+    num_nodes, num_edges = header["num_nodes"], header["num_edges"]
+    with open(path, "rb") as file_handle:
+        mapping = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+    arrays = []
+    offset = HEADER_SIZE
+    for count, dtype in ((num_nodes, np.float64), (num_nodes, np.int64), (num_nodes + 1, np.int64),
+                         (num_edges, np.int64), (num_nodes + 1, np.int64), (num_edges, np.int64)):
+        arrays.append(np.frombuffer(mapping, dtype=dtype, count=count, offset=offset))
+        offset += 8 * count
+    for flag in (FLAG_EDGE_SIZES, FLAG_EDGE_LATENCIES):
+        if header["flags"] & flag:
+            arrays.append(np.frombuffer(mapping, dtype=np.float64, count=num_edges, offset=offset))
+            offset += 8 * num_edges
+        else:
+            arrays.append(None)
+    durations, node_ids, succ_offsets, succ_indices, pred_offsets, pred_indices, edge_sizes, edge_latencies = arrays
+    return compiled_dag.CompiledDAG(node_ids, durations, succ_offsets, succ_indices, pred_offsets, pred_indices,
+                                    edge_sizes, edge_latencies)
+
+
+def is_fresh(cache_path: str, source_path: str):
+    """
+    Tells whether a .gdag file was built from the current version of its source. Size and mtime are checked first; when
+    only the mtime differs (the file was touched or copied) the content hash decides.
+    """
+    try:
+        header = read_header(cache_path)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(source_path)
+    if header["source_size"] != stat.st_size:
+        return False
+    if header["source_mtime_ns"] == stat.st_mtime_ns:
+        return True
+    if header["source_sha256"] != _file_sha256(source_path):
+        return False
+    # Same content : record the new mtime so the next load skips the hash
+    with open(cache_path, "r+b") as file_handle:
+        file_handle.write(_HEADER.pack(MAGIC, VERSION, header["flags"], header["num_nodes"], header["num_edges"],
+                                       stat.st_size, stat.st_mtime_ns, header["source_sha256"]))
+    return True
+
+
+def load_dag_cached(json_path: str, cache_path: str = None):
+    """
+    Loads a DAG JSON file through its compiled .gdag cache, (re)building the cache with the streaming loader when it is
+    missing or stale.
+
+    Args:
+    - json_path (str): The DAG JSON file.
+    - cache_path (str, optional): Where the cache lives. Defaults to the JSON path with a .gdag extension.
+    Returns:
+    - compiled_dag.CompiledDAG: The compiled graph, memory-mapped from the cache.
+    """
+    if cache_path is None:
+        cache_path = cache_path_for(json_path)
+    if not is_fresh(cache_path, json_path):
+        dag = data_loader.load_dag_streaming(json_path)
+        write_gdag(dag, cache_path, source_path=json_path)
+        print("Compiled DAG cache written to " + cache_path)
+    start_time = timeit.default_timer()
+    dag = load_gdag(cache_path)
+    print("Mapping DAG cache took:", timeit.default_timer() - start_time)
+    return dag
@@ -0,0 +1,251 @@
+import argparse
+import timeit
+
+import numpy as np
+
+import compiled_dag
+
+GENERATORS = ["layered", "fork_join", "fan_out_in", "erdos_renyi", "workflow"]
+
+
+def _durations(rng, num_nodes, max_duration):
+    # Whole seconds in [1, max_duration], as generate_random_dag always drew them
+    return rng.integers(1, max_duration, size=num_nodes, endpoint=True).astype(np.float64)
+
+
+def _compile(durations, sources, targets):
+    """
+    Builds the CompiledDAG of compact edge arrays, node ids being the compact ids. Every generator only draws edges from
+    lower to higher ids, so the ids are a topological order; duplicate edges are dropped.
+    """
+    num_nodes = len(durations)
+    keys = np.unique(np.asarray(sources, dtype=np.int64) * num_nodes + np.asarray(targets, dtype=np.int64))
+    return compiled_dag.from_edges(np.arange(num_nodes, dtype=np.int64), durations, keys // num_nodes, keys % num_nodes)
+
+
+def order_pairs(num_nodes: int, edge_probability: float, rng):
+    """
+    Draws every pair i < j of ``range(num_nodes)`` independently with probability ``edge_probability``.
+
+    The number of edges is drawn first, then that many distinct pair indices, which are decoded to (i, j) in closed
+    form, so the cost is linear in the number of edges rather than in the number of pairs.
+
+    Returns:
+    - tuple: The ``sources`` and ``targets`` int64 vectors.
+    """
+    num_pairs = num_nodes * (num_nodes - 1) // 2
+    num_edges = rng.binomial(num_pairs, edge_probability) if num_pairs else 0
+    pairs = np.sort(rng.choice(num_pairs, size=num_edges, replace=False)) if num_edges else np.zeros(0, dtype=np.int64)
+    # Pair k is (i, j) with k = j * (j - 1) / 2 + i and i < j
+    targets = ((1 + np.sqrt(1 + 8 * pairs.astype(np.float64))) // 2).astype(np.int64)
+    targets -= targets * (targets - 1) // 2 > pairs
+    targets += (targets + 1) * targets // 2 <= pairs
+    sources = pairs - targets * (targets - 1) // 2
+    return sources, targets
+
+
+def erdos_renyi(num_nodes: int, edge_probability: float, max_duration=3600, seed=None):
+    """
+    Generates an Erdős–Rényi DAG on a fixed order: every pair of nodes is linked, from the lower id to the higher one,
+    with probability ``edge_probability``.
+
+    Args:
+    - num_nodes (int): The number of nodes.
+    - edge_probability (float): The probability of each edge.
+    - max_duration (int, optional): Durations are whole seconds drawn uniformly in [1, max_duration]. Defaults to 3600.
+    - seed (int, optional): Seed of the NumPy random generator.
+    Returns:
+    - compiled_dag.CompiledDAG: The generated graph.
+    """
+    rng = np.random.default_rng(seed)
+    durations = _durations(rng, num_nodes, max_duration)
+    sources, targets = order_pairs(num_nodes, edge_probability, rng)
+    return compiled_dag.from_edges(np.arange(num_nodes, dtype=np.int64), durations, sources, targets)
+
+
+def layered(num_nodes: int, num_layers: int, mean_in_degree=2.0, max_duration=3600, seed=None):
+    """
+    Generates a layered DAG: the nodes are split into ``num_layers`` layers of (almost) equal size, and every node past
+    the first layer depends on 1 + Poisson(mean_in_degree - 1) nodes drawn uniformly from the previous layer.
+
+    Args:
+    - num_nodes (int): The number of nodes.
+    - num_layers (int): The number of layers, i.e. the depth of the graph.
+    - mean_in_degree (float, optional): Mean number of dependencies of a node past the first layer. Defaults to 2.
+    - max_duration (int, optional): Durations are whole seconds drawn uniformly in [1, max_duration]. Defaults to 3600.
+    - seed (int, optional): Seed of the NumPy random generator.
+    Returns:
+    - compiled_dag.CompiledDAG: The generated graph.
+    """
+    rng = np.random.default_rng(seed)
+    num_layers = max(1, min(num_layers, num_nodes))
+    layer_of = np.arange(num_nodes, dtype=np.int64) * num_layers // max(num_nodes, 1)
+    layer_start = np.searchsorted(layer_of, np.arange(num_layers + 1))
+    dependents = np.flatnonzero(layer_of > 0)
+    in_degrees = 1 + rng.poisson(max(mean_in_degree - 1, 0), size=len(dependents))
+    targets = np.repeat(dependents, in_degrees)
+    previous = layer_of[targets] - 1
+    previous_size = layer_start[previous + 1] - layer_start[previous]
+    sources = layer_start[previous] + (rng.random(len(targets)) * previous_size).astype(np.int64)
+    return _compile(_durations(rng, num_nodes, max_duration), sources, targets)
+
+
+def fork_join(num_stages: int, width: int, depth=1, max_duration=3600, seed=None):
+    """
+    Generates a fork-join DAG: ``num_stages`` stages in a row, each one forking into ``width`` parallel chains of
+    ``depth`` tasks that join into the node forking the next stage.
+
+    Args:
+    - num_stages (int): The number of stages.
+    - width (int): The number of parallel chains of a stage.
+    - depth (int, optional): The number of tasks of each chain. Defaults to 1.
+    - max_duration (int, optional): Durations are whole seconds drawn uniformly in [1, max_duration]. Defaults to 3600.
+    - seed (int, optional): Seed of the NumPy random generator.
+    Returns:
+    - compiled_dag.CompiledDAG: The generated graph, of ``num_stages * (width * depth + 1) + 1`` nodes.
+    """
+    if width < 1 or depth < 1:
+        raise ValueError(f"A fork-join stage needs at least one chain of at least one task, got width {width} and "
+                         f"depth {depth}.")
+    rng = np.random.default_rng(seed)
+    stage_size = width * depth + 1
+    num_nodes = num_stages * stage_size + 1
+    # Chain task (stage, chain, step) is fork(stage) + 1 + chain * depth + step, fork(stage + 1) being the join
+    forks = np.arange(num_stages, dtype=np.int64)[:, None] * stage_size
+    chain_starts = forks + 1 + np.arange(width, dtype=np.int64)[None, :] * depth
+    steps = (chain_starts[:, :, None] + np.arange(depth - 1, dtype=np.int64)[None, None, :]).ravel()
+    sources = np.concatenate([np.repeat(forks.ravel(), width), steps, (chain_starts + depth - 1).ravel()])
+    targets = np.concatenate([chain_starts.ravel(), steps + 1, np.repeat(forks.ravel() + stage_size, width)])
+    return compiled_dag.from_edges(np.arange(num_nodes, dtype=np.int64), _durations(rng, num_nodes, max_duration),
+                                   sources, targets)
+
+
+def fan_out_in(depth: int, fan_out: int, max_duration=3600, seed=None):
+    """
+    Generates a fan-out/fan-in DAG: a root fans out to ``fan_out`` children, each of them to as many, ``depth`` times,
+    and the leaves are then reduced by a mirrored tree back to a single sink (as in a map-reduce).
+
+    Args:
+    - depth (int): The number of fan-out (and fan-in) levels.
+    - fan_out (int): The number of children of each node of the out-tree, and of parents of each node of the in-tree.
+    - max_duration (int, optional): Durations are whole seconds drawn uniformly in [1, max_duration]. Defaults to 3600.
+    - seed (int, optional): Seed of the NumPy random generator.
+    Returns:
+    - compiled_dag.CompiledDAG: The generated graph.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = fan_out ** np.arange(depth + 1, dtype=np.int64)
+    # Out-tree levels 0..depth, then the in-tree levels depth-1..0 after them
+    starts = np.concatenate([[0], np.cumsum(np.concatenate([sizes, sizes[-2::-1]]))])
+    num_nodes = int(starts[-1])
+    sources, targets = [], []
+    for level in range(depth):
+        children = np.arange(sizes[level + 1], dtype=np.int64)
+        sources.append(starts[level] + children // fan_out)
+        targets.append(starts[level + 1] + children)
+        mirrored = 2 * depth - level
+        sources.append(starts[mirrored - 1] + children)
+        targets.append(starts[mirrored] + children // fan_out)
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    return compiled_dag.from_edges(np.arange(num_nodes, dtype=np.int64), _durations(rng, num_nodes, max_duration),
+                                   sources, targets)
+
+
+def workflow_like(num_nodes: int, reference: compiled_dag.CompiledDAG, seed=None):
+    """
+    Generates a DAG shaped like a real workflow (e.g. ``MediumComplex.json``), of any size.
+
+    Durations and numbers of dependencies are drawn from those of the reference graph, and each dependency lies as many
+    positions back in the generated order as a dependency of the reference in its topological order, so that the degree
+    and duration distributions and the locality of the edges match.
+
+    Args:
+    - num_nodes (int): The number of nodes.
+    - reference (compiled_dag.CompiledDAG): The workflow to imitate.
+    - seed (int, optional): Seed of the NumPy random generator.
+    Returns:
+    - compiled_dag.CompiledDAG: The generated graph.
+    """
+    rng = np.random.default_rng(seed)
+    if num_nodes == 0:
+        return compiled_dag.from_edges(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64),
+                                       np.zeros(0, dtype=np.int64))
+    positions = compiled_dag.topological_positions(compiled_dag.topological_levels(reference), reference.num_nodes)
+    reference_sources = np.repeat(np.arange(reference.num_nodes), np.diff(reference.succ_offsets))
+    spans = positions[reference.succ_indices] - positions[reference_sources]
+    durations = rng.choice(reference.durations, size=num_nodes)
+    in_degrees = rng.choice(np.diff(reference.pred_offsets), size=num_nodes)
+    in_degrees[0] = 0
+    targets = np.repeat(np.arange(num_nodes, dtype=np.int64), in_degrees)
+    sources = targets - (rng.choice(spans, size=len(targets)) if len(spans) else 1)
+    # Dependencies reaching before the first node are drawn uniformly among the earlier nodes instead
+    early = sources < 0
+    sources[early] = (rng.random(int(early.sum())) * targets[early]).astype(np.int64)
+    return _compile(durations, sources, targets)
+
+
+def _format_duration(seconds: float):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:010.7f}"
+
+
+def write_json(dag: compiled_dag.CompiledDAG, path: str):
+    """
+    Writes a compiled DAG with integer node ids in the JSON format of the data files ("Data" durations and "Dependencies"
+    of every node, and "DataSizes"/"Latencies" when the edges have them), in one pass over its arrays.
+    """
+    node_ids = dag.node_ids.tolist()
+    pred_offsets = dag.pred_offsets.tolist()
+    pred_ids = dag.node_ids[dag.pred_indices].tolist()
+    edge_fields = [(field, values[compiled_dag.predecessor_edges(dag)].tolist())
+                   for field, values in (("DataSizes", dag.edge_sizes), ("Latencies", dag.edge_latencies)) if values is not None]
+    with open(path, "w") as file_handle:
+        file_handle.write('{"nodes": {')
+        for task, (node_id, duration) in enumerate(zip(node_ids, dag.durations.tolist())):
+            first, last = pred_offsets[task], pred_offsets[task + 1]
+            extra = "".join(f', "{field}": {values[first:last]}' for field, values in edge_fields)
+            file_handle.write(f'{", " if task else ""}"{node_id}": {{"Data": "{_format_duration(duration)}", '
+                              f'"Dependencies": {pred_ids[first:last]}{extra}}}')
+        file_handle.write("}}")
+
+
+if __name__ == "__main__":
+    import dag_cache
+    import data_loader
+
+    parser = argparse.ArgumentParser(prog="dag_generators")
+    parser.add_argument("shape", choices=GENERATORS, help="Shape of the generated DAG")
+    parser.add_argument("num_nodes", type=int, help="Number of nodes (layered, erdos_renyi and workflow)")
+    parser.add_argument("--output", default="intermediates/generated.json", help="Where to write the DAG: .json (data file format) or .gdag (compiled arrays)")
+    parser.add_argument("--seed", type=int, help="Seed of the random generator")
+    parser.add_argument("--max_duration", type=int, default=3600, help="Largest duration in seconds")
+    parser.add_argument("--layers", type=int, default=100, help="Number of layers (layered)")
+    parser.add_argument("--degree", type=float, default=2.0, help="Mean number of dependencies of a node (layered, erdos_renyi)")
+    parser.add_argument("--width", type=int, default=8, help="Parallel chains per stage (fork_join)")
+    parser.add_argument("--depth", type=int, default=1, help="Tasks per chain (fork_join) or number of fan-out levels (fan_out_in)")
+    parser.add_argument("--fan_out", type=int, default=4, help="Children per node (fan_out_in)")
+    parser.add_argument("--reference", default="data/MediumComplex.json", help="Workflow imitated by the workflow shape")
+    args = parser.parse_args()
+
+    start_time = timeit.default_timer()
+    if args.shape == "layered":
+        dag = layered(args.num_nodes, args.layers, mean_in_degree=args.degree, max_duration=args.max_duration, seed=args.seed)
+    elif args.shape == "fork_join":
+        num_stages = max(1, args.num_nodes // (args.width * args.depth + 1))
+        dag = fork_join(num_stages, args.width, depth=args.depth, max_duration=args.max_duration, seed=args.seed)
+    elif args.shape == "fan_out_in":
+        dag = fan_out_in(args.depth, args.fan_out, max_duration=args.max_duration, seed=args.seed)
+    elif args.shape == "erdos_renyi":
+        # Node j has j * probability dependencies, degree of them on average
+        probability = min(1.0, 2 * args.degree / max(args.num_nodes - 1, 1))
+        dag = erdos_renyi(args.num_nodes, probability, max_duration=args.max_duration, seed=args.seed)
+    else:
+        dag = workflow_like(args.num_nodes, data_loader.load_dag_streaming(args.reference), seed=args.seed)
+    print(f"Generated {dag.num_nodes} nodes and {dag.num_edges} edges in {timeit.default_timer() - start_time:.3f}s")
+    if args.output.endswith(".gdag"):
+        dag_cache.write_gdag(dag, args.output)
+    else:
+        write_json(dag, args.output)
+    print("Written to", args.output)
@@ -2,41 +2,44 @@
 import networkx as nx
 import matplotlib.pyplot as plt
 from networkx.drawing.nx_pydot import graphviz_layout
-import random
 import json
+import sys
 from datetime import datetime, timedelta
 import timeit
 import rustworkx as rx
+import numpy as np
+from array import array
 
+import compiled_dag
+import dag_generators
 
-def generate_random_dag(num_nodes:int, max_duration:int, density_level=2):
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def generate_random_dag(num_nodes:int, max_duration:int, density_level=2, seed=None):
     """
     Generates a random Directed Acyclic Graph (DAG) with specified number of nodes,
     maximum duration for each node, and density level for edge creation.
 
+    Every pair i < j is linked with probability 1 / (density_level + 1). The edges are drawn in time linear in their
+    number by :func:`dag_generators.order_pairs` instead of a draw per pair; see :mod:`dag_generators` for other shapes.
+
     :param num_nodes: The number of nodes in the DAG.
     :type num_nodes: int
     :param max_duration: The maximum duration of each node as a limit for random generation.
     :type max_duration: int
     :param density_level: Controls the density of edges in the DAG. Higher values result in a sparser graph. Defaults to 2.
     :type density_level: int, optional
-    :return: A networkx DiGraph object representing the generated DAG.
+    :param seed: Seed of the NumPy random generator. Defaults to None.
+    :type seed: int, optional
+    :return: A networkx DiGraph object representing the generated DAG, with durations in seconds.
     :rtype: nx.DiGraph
     """
-    # Create a directed acyclic graph (DAG)
-    dag = nx.DiGraph()
-
-    # Add nodes to the graph
-    for i in range(num_nodes):
-        dag.add_node(i, duration=timedelta(seconds=random.randint(1, max_duration)))
-
-    # Add edges to create a DAG
-    for i in range(num_nodes - 1):
-        for j in range(i + 1, num_nodes):
-            if random.choice([True] + [False]*density_level):
-                dag.add_edge(i, j)
-
-    return dag
+    dag = dag_generators.erdos_renyi(num_nodes, 1 / (density_level + 1), max_duration=max_duration, seed=seed)
+    return compiled_dag.to_networkx(dag)
 
 def plot_dag(dag):
     """
@@ -59,9 +62,13 @@ def load_dag_from_json(filepath: str):
     """
     Loads a DAG from a JSON file. The JSON format is expected to contain nodes with durations and their dependencies.
 
+    A node may also list, in the same order as its "Dependencies", the size of the data it receives from each of them
+    ("DataSizes") and the latency of each transfer in seconds ("Latencies"). They become the 'data_size' and 'latency'
+    attributes of the edges.
+
     :param filepath: The path to the JSON file containing the DAG information.
     :type filepath: str
-    :return: A networkx DiGraph object representing the loaded DAG.
+    :return: A networkx DiGraph object representing the loaded DAG, with node durations in seconds.
     :rtype: nx.DiGraph
     """
     print("Loading DAG from JSON file " + filepath + "....") #TODO: Custom logging with control of verbosity.
@@ -70,11 +77,12 @@ def load_dag_from_json(filepath: str):
     with open(filepath, "r") as file_handle:
         object_data = json.load(file_handle)
         nodes:dict = object_data["nodes"]
-        node_indices = [(int(k), {"duration":timedelta(hours=int(time_parts[0]), minutes=int(time_parts[1]), seconds=float(time_parts[2]))} ) for (k,v) in nodes.items() if (time_parts:=v["Data"].split(':'))]
+        durations = parse_durations([v["Data"] for v in nodes.values()]).tolist()
+        node_indices = [(int(k), {"duration": duration}) for (k, duration) in zip(nodes.keys(), durations)]
         edges = []
         for (k,v) in nodes.items():
-            for dep in v["Dependencies"]:
-                edges.append((dep, int(k)))
+            for dep, attributes in zip(v["Dependencies"], _edge_attributes(v)):
+                edges.append((dep, int(k), attributes))
         graph.add_nodes_from(node_indices)
         graph.add_edges_from(edges)
     elapsed = timeit.default_timer() - start_time
@@ -88,24 +96,21 @@ def load_dag_from_json_rx(filepath):
 
     :param filepath: The path to the JSON file containing the DAG information.
     :type filepath: str
-    :return: A tuple containing the retworkx PyDiGraph and a dictionary mapping node IDs to their durations.
+    :return: A tuple containing the retworkx PyDiGraph and a dictionary mapping node IDs to their durations in seconds.
     :rtype: tuple
     """
     print("Loading DAG from JSON file " + filepath + "....")  # TODO: Custom logging with control of verbosity.
     start_time = timeit.default_timer()
     graph = rx.PyDiGraph()
-    durations = {}
     nodes_list = []
     edges_list = []
     with open(filepath, "r") as file_handle:
         object_data = json.load(file_handle)
         nodes = object_data["nodes"]
         for node_id, node_data in nodes.items():
-            time_parts = node_data["Data"].split(':')
-            duration = timedelta(hours=int(time_parts[0]), minutes=int(time_parts[1]), seconds=float(time_parts[2]))
-            durations[int(node_id)] = duration
             nodes_list.append(int(node_id))
             edges_list += [(dep, int(node_id)) for dep in node_data["Dependencies"]]
+        durations = dict(zip(nodes_list, parse_durations([node_data["Data"] for node_data in nodes.values()]).tolist()))
     del object_data
     node_indices = graph.add_nodes_from(nodes_list)
     mapping = dict(zip(nodes_list, node_indices))
@@ -119,6 +124,283 @@ def load_dag_from_json_rx(filepath):
     print("Loading file took:", elapsed)
     return graph, durations
 
+def _edge_attributes(node_data):
+    """
+    Returns the attributes of the edges from the dependencies of a node, in the order of its "Dependencies".
+    """
+    attributes = [{} for _ in node_data["Dependencies"]]
+    for field, attribute in (("DataSizes", "data_size"), ("Latencies", "latency")):
+        values = node_data.get(field)
+        if values is None:
+            continue
+        if len(values) != len(attributes):
+            raise ValueError(f"Malformed DAG file: {field} does not match Dependencies.")
+        for edge, value in zip(attributes, values):
+            edge[attribute] = float(value)
+    return attributes
+
+
+class _JSONNodeStream:
+    """
+    Incremental reader for the ``{"nodes": {id: {"Data": ..., "Dependencies": [...]}}}`` document.
+
+    The file is read in fixed-size chunks and each node object is decoded on its own with ``json.JSONDecoder.raw_decode``,
+    so only one chunk and one node are held in memory at any time.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, file_handle, chunk_size):
+        self._file_handle = file_handle
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        chunk = self._file_handle.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Skips whitespace and returns the next character (an empty string at the end of the file)."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in self._WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, character):
+        if self._peek() != character:
+            raise ValueError(f"Malformed DAG file: expected '{character}' at offset {self._pos} of the current chunk.")
+        self._pos += 1
+
+    def _decode(self):
+        """Decodes the JSON value starting at the current position, reading more of the file while it is truncated."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof or not self._fill():
+                    raise
+                continue
+            # A number may continue in the next chunk
+            if end == len(self._buffer) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _members(self):
+        """Yields the (key, position) of each member of the object starting at the current position, the caller reading the value."""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._decode()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("Malformed DAG file: expected ',' or '}' between members.")
+
+    def nodes(self):
+        """Yields the (node_id, node_data) pairs of the "nodes" object."""
+        for key in self._members():
+            if key != "nodes":
+                self._decode()
+                continue
+            for node_id in self._members():
+                yield node_id, self._decode()
+
+
+def iter_json_nodes(filepath: str, chunk_size=1 << 20):
+    """
+    Iterates over the nodes of a DAG JSON file without loading the whole document.
+
+    :param filepath: The path to the JSON file containing the DAG information.
+    :type filepath: str
+    :param chunk_size: Number of characters read from the file at a time. Defaults to 1M.
+    :type chunk_size: int, optional
+    :return: An iterator of (node_id, node_data) pairs, node_data holding the "Data" and "Dependencies" fields.
+    :rtype: iterator
+    """
+    with open(filepath, "r") as file_handle:
+        yield from _JSONNodeStream(file_handle, chunk_size).nodes()
+
+
+_DURATION_BATCH = 1 << 16
+
+
+def _duration_seconds(text: str):
+    hours, minutes, seconds = text.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _parse_fixed_width(texts):
+    """
+    Parses duration strings that all share the layout of the first one, in one pass over their bytes.
+    Returns None when they do not.
+    """
+    width = len(texts[0])
+    layout = texts[0]
+    colons = [i for i, character in enumerate(layout) if character == ':']
+    dot = layout.find('.')
+    try:
+        raw = "".join(texts).encode("ascii")
+    except UnicodeEncodeError:
+        return None
+    if len(colons) != 2 or len(raw) != width * len(texts) or not 0 < colons[0] < colons[1] - 1 < width - 2:
+        return None
+    # A dot anywhere but in the seconds (e.g. days in "1.02:00:00") is left to _duration_seconds, which rejects it
+    if dot != -1 and dot < colons[1]:
+        return None
+    characters = np.frombuffer(raw, dtype=np.uint8).reshape(len(texts), width)
+    separators = colons + ([dot] if dot != -1 else [])
+    digit_columns = np.ones(width, dtype=bool)
+    digit_columns[separators] = False
+    # Anything below '0' wraps around, so a single comparison checks that every digit column holds a digit
+    digits = characters - np.uint8(ord('0'))
+    if (characters[:, colons] != ord(':')).any() or (dot != -1 and (characters[:, dot] != ord('.')).any()) \
+            or (digits[:, digit_columns] > 9).any():
+        return None
+
+    def number(first, last):
+        value = np.zeros(len(texts), dtype=np.int64)
+        for column in range(first, last):
+            value = value * 10 + digits[:, column]
+        return value
+
+    seconds_end = dot if dot != -1 else width
+    seconds = (number(0, colons[0]) * 3600 + number(colons[0] + 1, colons[1]) * 60
+               + number(colons[1] + 1, seconds_end)).astype(np.float64)
+    if dot != -1 and dot < width - 1:
+        seconds += number(dot + 1, width) / 10.0 ** (width - dot - 1)
+    return seconds
+
+
+def parse_durations(texts):
+    """
+    Parses "HH:MM:SS.fffffff" duration strings into a float64 vector of seconds.
+
+    The strings are grouped by length and each group sharing one layout (e.g. "00:02:00" or "01:50:19.3177493") is parsed
+    in a single vectorised pass over its bytes; strings that do not fit a layout are split one by one.
+
+    :param texts: The duration strings.
+    :type texts: list of str
+    :return: The durations in seconds.
+    :rtype: np.ndarray
+    """
+    seconds = np.empty(len(texts), dtype=np.float64)
+    if not texts:
+        return seconds
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    for length in np.unique(lengths).tolist():
+        rows = np.flatnonzero(lengths == length)
+        group = texts if len(rows) == len(texts) else [texts[row] for row in rows.tolist()]
+        parsed = _parse_fixed_width(group)
+        if parsed is None:
+            parsed = np.fromiter((_duration_seconds(text) for text in group), dtype=np.float64, count=len(group))
+        seconds[rows] = parsed
+    return seconds
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process in MB, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def load_dag_streaming(filepath: str, chunk_size=1 << 20):
+    """
+    Loads a DAG from a JSON file in a single streaming pass, straight into the arrays of a CompiledDAG.
+
+    Node ids, durations (in seconds) and edges are appended to typed arrays as the file is read, so the memory used is
+    about the size of the final graph rather than several times the size of the JSON document. The optional
+    "DataSizes" and "Latencies" of the edges (see load_dag_from_json) are kept as well.
+
+    :param filepath: The path to the JSON file containing the DAG information.
+    :type filepath: str
+    :param chunk_size: Number of characters read from the file at a time. Defaults to 1M.
+    :type chunk_size: int, optional
+    :return: The compiled DAG.
+    :rtype: compiled_dag.CompiledDAG
+    """
+    print("Streaming DAG from JSON file " + filepath + "....")
+    start_time = timeit.default_timer()
+    node_ids = array('q')
+    durations = array('d')
+    dependencies = array('q')
+    dependents = array('q')
+    edge_data = {"DataSizes": array('d'), "Latencies": array('d')}
+    pending_durations = []
+    for node_id, node_data in iter_json_nodes(filepath, chunk_size):
+        index = len(node_ids)
+        node_ids.append(int(node_id))
+        pending_durations.append(node_data["Data"])
+        if len(pending_durations) == _DURATION_BATCH:
+            durations.frombytes(parse_durations(pending_durations).tobytes())
+            pending_durations.clear()
+        for dep in node_data["Dependencies"]:
+            dependencies.append(dep)
+            dependents.append(index)
+        for field, values in edge_data.items():
+            given = node_data.get(field)
+            if given is None:
+                values.extend([0.0] * len(node_data["Dependencies"]))
+            elif len(given) != len(node_data["Dependencies"]):
+                raise ValueError(f"Malformed DAG file: {field} does not match Dependencies.")
+            else:
+                values.extend(map(float, given))
+    durations.frombytes(parse_durations(pending_durations).tobytes())
+    ids = np.frombuffer(node_ids, dtype=np.int64)
+    dependencies = np.frombuffer(dependencies, dtype=np.int64)
+    # Map the original ids of the dependencies to compact ids
+    order = np.argsort(ids, kind="stable")
+    positions = np.searchsorted(ids, dependencies, sorter=order)
+    positions[positions == len(ids)] = 0
+    sources = order[positions] if len(ids) else positions
+    unknown = ids[sources] != dependencies if len(ids) else dependencies != dependencies
+    if unknown.any():
+        raise ValueError(f"Malformed DAG file: dependency {dependencies[unknown][0]} is not a node.")
+    sizes, latencies = (np.frombuffer(values, dtype=np.float64) for values in edge_data.values())
+    dag = compiled_dag.from_edges(ids.copy(), np.frombuffer(durations, dtype=np.float64),
+                                  sources, np.frombuffer(dependents, dtype=np.int64),
+                                  sizes=sizes if sizes.any() else None, latencies=latencies if latencies.any() else None)
+    elapsed = timeit.default_timer() - start_time
+    print("Loading file took:", elapsed, "- peak RSS (MB):", peak_rss_mb())
+    return dag
+
+
+def rx_from_nx(graph: nx.DiGraph):
+    """
+    Converts a networkx DAG (e.g. one produced by generate_random_dag) into the (PyDiGraph, durations) tuple used by the rustworkx scheduler.
+
+    :param graph: The DAG, with a 'duration' attribute on each node.
+    :type graph: nx.DiGraph
+    :return: A tuple containing the retworkx PyDiGraph and a dictionary mapping node IDs to their durations.
+    :rtype: tuple
+    """
+    rx_graph = rx.PyDiGraph()
+    nodes_list = list(graph.nodes)
+    mapping = dict(zip(nodes_list, rx_graph.add_nodes_from(nodes_list)))
+    rx_graph.add_edges_from_no_data([(mapping[a], mapping[b]) for a, b in graph.edges])
+    return rx_graph, dict(graph.nodes(data="duration"))
+
 if __name__ == "__main__":
     # Example usage of the functions defined above
     # Uncomment the desired function calls to generate, load, and plot a DAG
@@ -1,4 +1,6 @@
+import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 import plotly.figure_factory as ff
 import json 
 import pandas as pd
@@ -11,6 +13,10 @@ import dash_cytoscape as cyto
 from dash import html
 
 import algorithm
+import applicated_criteria
+import columnar_schedule
+import compiled_dag
+import dag_cache
 import data_loader
 import verification
 from data_loader import load_dag_from_json
@@ -24,32 +30,304 @@ cyto.load_extra_layouts()
 
 def plot_schedule(schedule,file_input=True, output='html'): # TODO: remove second argument
     if file_input:
-        with open(schedule) as file_handle:
-            schedule = json.load(file_handle)
-    job_list = [] 
-    for (index, machine_jobs) in enumerate(schedule):
-        machine = "Machine " + str(index+1)
-        job_list += [{"job_index": job["job_index"],"start_time": datetime.fromtimestamp(job["start_time"]), "end_time": datetime.fromtimestamp(job["end_time"]), "duration": job["duration"], "machine": machine} for job in machine_jobs] #[dict(job, **{"machine": machine}) for job in machine_jobs[:10] ]
-
-    df = pd.DataFrame(job_list)
+        schedule = columnar_schedule.load_schedule(schedule)
+    # Columns straight into the frame, without a dict per job
+    schedule = columnar_schedule.as_columnar(schedule)
+    df = pd.DataFrame({"job_index": schedule.job_ids,
+                       "start_time": pd.to_datetime(schedule.start_times, unit="s"),
+                       "end_time": pd.to_datetime(schedule.end_times, unit="s"),
+                       "duration": schedule.durations,
+                       "machine": pd.Categorical.from_codes(schedule.machines, [f"Machine {index + 1}" for index in range(schedule.num_machines)])})
     
     fig_sched = px.timeline(df, x_start="start_time", x_end="end_time", y="machine", color="machine", hover_data="job_index")
     if output != "Dash":
         return fig_sched.to_html(full_html=False, include_plotlyjs='cdn')
     else:
-        return fig_sched 
-            
-        
+        return fig_sched
+
+
+# Visible jobs up to which the downsampled Gantt draws every job, and number of time buckets above it
+DETAIL_LIMIT = 5000
+NUM_BUCKETS = 400
+
+
+def _to_datetime(seconds):
+    # Epoch seconds to datetime64 in one vectorised cast
+    return (np.asarray(seconds, dtype=np.float64) * 1000).astype("datetime64[ms]")
+
+
+def _to_seconds(value):
+    return np.datetime64(value, "ms").astype(np.int64) / 1000
+
+
+def bucket_schedule(schedule, window_start, window_end, num_buckets=NUM_BUCKETS):
+    """
+    Aggregates the jobs of each machine over ``num_buckets`` equal time buckets of [window_start, window_end].
+
+    The busy time of a machine before a time t is read from the cumulated durations of its jobs with one binary search,
+    so the cost is O(machines * buckets * log(jobs)) whatever the number of jobs in the window.
+
+    Returns:
+    - tuple: ``edges`` (the num_buckets + 1 bucket bounds, in seconds), ``busy`` (machines x buckets, the busy fraction of
+      each bucket) and ``counts`` (machines x buckets, the number of jobs overlapping each bucket).
+    """
+    schedule = columnar_schedule.as_columnar(schedule)
+    edges = np.linspace(window_start, window_end, num_buckets + 1)
+    width = (window_end - window_start) / num_buckets
+    busy = np.zeros((schedule.num_machines, num_buckets))
+    counts = np.zeros((schedule.num_machines, num_buckets), dtype=np.int64)
+    for machine in range(schedule.num_machines):
+        view = schedule.machine_view(machine)
+        if not len(view.job_ids):
+            continue
+        durations = view.end_times - view.start_times
+        done = np.concatenate(([0.0], np.cumsum(durations)))
+        # Jobs before the last one started are over, the last one may still be running
+        started = np.searchsorted(view.start_times, edges, side="right")
+        last = np.maximum(started - 1, 0)
+        running = np.clip(edges - view.start_times[last], 0, durations[last])
+        busy_before = np.where(started > 0, done[last] + running, 0.0)
+        busy[machine] = np.diff(busy_before) / width if width else 0.0
+        counts[machine] = (np.searchsorted(view.start_times, edges[1:], side="left")
+                           - np.searchsorted(view.end_times, edges[:-1], side="right"))
+    return edges, busy, counts
+
+
+def downsampled_gantt(schedule, window=None):
+    """
+    Draws the Gantt chart of ``window`` (start, end in seconds, the whole schedule by default) for large schedules.
+
+    Up to DETAIL_LIMIT visible jobs, each job is a segment of a single WebGL (Scattergl) trace. Beyond that, the jobs of
+    each machine are aggregated into NUM_BUCKETS time buckets (see :func:`bucket_schedule`) drawn as one heatmap image of
+    busy fractions, so the browser receives O(machines * buckets) points however many jobs the schedule has.
+    """
+    schedule = columnar_schedule.as_columnar(schedule)
+    if window is None:
+        window = (float(schedule.start_times.min()) if schedule.num_jobs else 0.0, max(schedule.makespan, 1.0))
+    window_start, window_end = window
+    labels = [f"Machine {index + 1}" for index in range(schedule.num_machines)]
+    visible = np.flatnonzero((schedule.start_times < window_end) & (schedule.end_times > window_start))
+    if len(visible) <= DETAIL_LIMIT:
+        # One segment per job, separated by NaN gaps
+        x = np.full(3 * len(visible), np.nan)
+        x[0::3], x[1::3] = schedule.start_times[visible], schedule.end_times[visible]
+        y = np.repeat(schedule.machines[visible], 3)
+        text = np.repeat(schedule.job_ids[visible].astype(str), 3)
+        trace = go.Scattergl(x=_to_datetime(x), y=np.asarray(labels)[y], mode="lines",
+                             line={"width": 12}, text=text, hoverinfo="text+x", connectgaps=False)
+    else:
+        edges, busy, counts = bucket_schedule(schedule, window_start, window_end)
+        trace = go.Heatmap(x=_to_datetime((edges[:-1] + edges[1:]) / 2), y=labels, z=busy, customdata=counts,
+                           zmin=0, zmax=1, colorscale="Blues", colorbar={"title": "busy"},
+                           hovertemplate="%{y}<br>%{x}<br>busy %{z:.0%}<br>%{customdata} jobs<extra></extra>")
+    figure = go.Figure(trace)
+    figure.update_layout(xaxis={"type": "date", "range": _to_datetime([window_start, window_end])},
+                         yaxis={"autorange": "reversed"}, uirevision="gantt")
+    return figure
+
+
+def gantt_graph(app, graph_id, schedule):
+    """
+    Returns a dcc.Graph showing :func:`downsampled_gantt` of ``schedule``, and registers the callback that redraws it for
+    the visible time window whenever the user zooms or pans, the schedule staying on the server.
+    """
+    schedule = columnar_schedule.as_columnar(schedule)
+
+    @app.callback(dash.Output(graph_id, "figure"), dash.Input(graph_id, "relayoutData"))
+    def redraw(relayout_data):
+        relayout_data = relayout_data or {}
+        if "xaxis.range[0]" in relayout_data:
+            return downsampled_gantt(schedule, (_to_seconds(relayout_data["xaxis.range[0]"]),
+                                                _to_seconds(relayout_data["xaxis.range[1]"])))
+        if "xaxis.range" in relayout_data:
+            return downsampled_gantt(schedule, tuple(_to_seconds(value) for value in relayout_data["xaxis.range"]))
+        if relayout_data and "xaxis.autorange" not in relayout_data:
+            # A change that does not touch the time axis (e.g. hovering mode)
+            raise dash.exceptions.PreventUpdate
+        return downsampled_gantt(schedule)
+
+    return dcc.Graph(id=graph_id, figure=downsampled_gantt(schedule))
+
+
+def schedule_graph(app, graph_id, schedule, mode="auto"):
+    """
+    Returns the Dash component of a schedule (or schedule file): the plain timeline of :func:`plot_schedule`, or the
+    downsampled Gantt of :func:`gantt_graph` for ``mode="buckets"``, ``"auto"`` choosing it beyond DETAIL_LIMIT jobs.
+    """
+    if isinstance(schedule, (str, os.PathLike)):
+        schedule = columnar_schedule.load_schedule(schedule)
+    schedule = columnar_schedule.as_columnar(schedule)
+    if mode == "buckets" or (mode == "auto" and schedule.num_jobs > DETAIL_LIMIT):
+        return gantt_graph(app, graph_id, schedule)
+    return dcc.Graph(id=graph_id, figure=plot_schedule(schedule, file_input=False, output="Dash"))
 
 def elements_from_nx(graph):
     #pos =  graphviz_layout(graph, prog="dot")
     elements = []
+    durations = nx.get_node_attributes(graph, 'duration')
     
     for node in graph.nodes:
         elements.append({'data': {'id': str(node), 'label': str(node) }})
     for edge in graph.edges:
-        elements.append({'data': {'source': str(edge[0]), 'target': str(edge[1]), 'duration': str(nx.get_node_attributes(graph, 'duration')[edge[0]])}})
+        elements.append({'data': {'source': str(edge[0]), 'target': str(edge[1]), 'duration': str(timedelta(seconds=durations[edge[0]]))}})
     return elements
+
+
+class DagExplorer:
+    """
+    Keeps a DAG on the server, indexed for the explorer mode of the app, which only ever sends a bounded view of it to
+    Cytoscape: either the level summary (one node per band of topological levels) or the k-hop neighbourhood of a job.
+
+    Views and highlights only walk the CSR adjacency of the compiled DAG, so they cost O(degree) per job shown instead of
+    a scan of every edge.
+
+    Args:
+    - graph (nx.DiGraph or compiled_dag.CompiledDAG): The DAG to explore.
+    - max_nodes (int, optional): Most nodes sent in a single view. Defaults to 300.
+    """
+
+    def __init__(self, graph, max_nodes=300):
+        self.dag = graph if isinstance(graph, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(graph)
+        self.max_nodes = max_nodes
+        levels = compiled_dag.topological_levels(self.dag)
+        # Consecutive levels are merged into bands so that the summary has at most max_nodes nodes
+        self.band_size = max(1, -(-len(levels) // max_nodes))
+        level_of = np.empty(self.dag.num_nodes, dtype=np.int64)
+        for level, nodes in enumerate(levels):
+            level_of[nodes] = level
+        self.band_of = level_of // self.band_size
+        self.num_bands = -(-len(levels) // self.band_size)
+        self._band_members = np.argsort(self.band_of, kind="stable")
+        self._band_offsets = np.zeros(self.num_bands + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.band_of, minlength=self.num_bands), out=self._band_offsets[1:])
+        self._labels = [str(node) for node in self.dag.node_ids.tolist()]
+        self._task_of = {label: task for task, label in enumerate(self._labels)}
+        self._summary = None
+
+    def task_of(self, node_id):
+        """Returns the compact id of a job given its id (as shown in Cytoscape), or None if there is no such job."""
+        return self._task_of.get(str(node_id))
+
+    def _elements(self, tasks):
+        shown = set(tasks)
+        elements = [{'data': {'id': self._labels[task], 'label': self._labels[task]}} for task in tasks]
+        for task in tasks:
+            duration = str(timedelta(seconds=float(self.dag.durations[task])))
+            for successor in self.dag.successors(task).tolist():
+                if successor in shown:
+                    elements.append({'data': {'source': self._labels[task], 'target': self._labels[successor], 'label': duration}})
+        return elements
+
+    def level_summary(self):
+        """
+        Returns the Cytoscape elements of the collapsed view: one node per band of levels with its number of jobs, and one
+        edge per pair of bands linked by dependencies, labelled with their number.
+        """
+        if self._summary is None:
+            counts = np.diff(self._band_offsets).tolist()
+            elements = []
+            for band, count in enumerate(counts):
+                first, last = band * self.band_size, (band + 1) * self.band_size - 1
+                name = f"Level {first}" if self.band_size == 1 else f"Levels {first}-{last}"
+                elements.append({'data': {'id': f"band-{band}", 'label': f"{name} ({count} jobs)", 'band': band}})
+            sources = np.repeat(self.band_of, np.diff(self.dag.succ_offsets))
+            targets = self.band_of[self.dag.succ_indices]
+            pairs, edge_counts = np.unique(sources * self.num_bands + targets, return_counts=True)
+            for pair, count in zip(pairs.tolist(), edge_counts.tolist()):
+                source, target = divmod(pair, self.num_bands)
+                if source != target:
+                    elements.append({'data': {'source': f"band-{source}", 'target': f"band-{target}", 'label': f"{count} edges"}})
+            self._summary = elements
+        return self._summary
+
+    def band(self, band):
+        """Returns the elements of the jobs of one band of levels (the first max_nodes of them) and the edges between them."""
+        members = self._band_members[self._band_offsets[band]:self._band_offsets[band + 1]]
+        return self._elements(members[:self.max_nodes].tolist())
+
+    def neighbourhood(self, node_id, hops=1):
+        """
+        Returns the elements of the jobs within ``hops`` dependencies of a job, in either direction, and the edges
+        between them. The search stops once max_nodes jobs are found, the closest ones first.
+        """
+        start = self.task_of(node_id)
+        if start is None:
+            raise KeyError(node_id)
+        seen = {start}
+        order = [start]
+        frontier = [start]
+        for _ in range(hops):
+            next_frontier = []
+            for task in frontier:
+                for neighbour in self.dag.predecessors(task).tolist() + self.dag.successors(task).tolist():
+                    if neighbour not in seen and len(order) < self.max_nodes:
+                        seen.add(neighbour)
+                        order.append(neighbour)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return self._elements(order)
+
+    def highlight(self, node_id):
+        """
+        Returns the explorer stylesheet highlighting a job, its predecessors and the edges to its predecessors and
+        successors, read from the adjacency of that job only.
+        """
+        task = self.task_of(node_id)
+        if task is None:
+            return explorer_stylesheet
+        label = self._labels[task]
+        stylesheet = list(explorer_stylesheet)
+        for predecessor in [label] + [self._labels[other] for other in self.dag.predecessors(task).tolist()]:
+            stylesheet.append({'selector': f'node[id="{predecessor}"]', 'style': {'background-color': '#2081C3'}})
+        for predecessor in self.dag.predecessors(task).tolist():
+            stylesheet.append({'selector': f'edge[source="{self._labels[predecessor]}"][target="{label}"]', 'style': {'line-color': '#78D5D7'}})
+        for successor in self.dag.successors(task).tolist():
+            stylesheet.append({'selector': f'edge[source="{label}"][target="{self._labels[successor]}"]', 'style': {'line-color': '#C21F3D'}})
+        return stylesheet
+
+
+def explorer_components(app, explorer, hops=1):
+    """
+    Returns the Dash components of the explorer mode and registers its callback. The page opens on the level summary;
+    tapping a band shows its jobs, tapping a job (or typing its id) shows its neighbourhood within the chosen number of
+    hops with its dependencies highlighted, and the summary button goes back to the collapsed view.
+    """
+    controls = html.Div([
+        dcc.Input(id="explorer-job", type="text", placeholder="Job id", debounce=True),
+        dcc.Input(id="explorer-hops", type="number", min=0, step=1, value=hops),
+        html.Button("Level summary", id="explorer-summary"),
+    ])
+    graph = cyto.Cytoscape(
+        id="explorer",
+        elements=explorer.level_summary(),
+        style={'width': '100%', 'height': '700px'},
+        layout={'name': 'dagre', 'rankSep': 20, 'edgeSep': 10, 'nodeSep': 10, 'spacingFactor': 1.2},
+        responsive=True,
+        stylesheet=explorer_stylesheet,
+    )
+
+    @app.callback(
+        dash.Output('explorer', 'elements'),
+        dash.Output('explorer', 'stylesheet'),
+        dash.Input('explorer', 'tapNodeData'),
+        dash.Input('explorer-job', 'value'),
+        dash.Input('explorer-hops', 'value'),
+        dash.Input('explorer-summary', 'n_clicks'),
+        prevent_initial_call=True,
+    )
+    def navigate(tapped_node, job_id, hops, _):
+        trigger = dash.ctx.triggered_id
+        if trigger == 'explorer-summary':
+            return explorer.level_summary(), explorer_stylesheet
+        if trigger == 'explorer' and tapped_node and 'band' in tapped_node:
+            return explorer.band(tapped_node['band']), explorer_stylesheet
+        if trigger == 'explorer' and tapped_node:
+            job_id = tapped_node['id']
+        if job_id is None or explorer.task_of(job_id) is None:
+            raise dash.exceptions.PreventUpdate
+        return explorer.neighbourhood(job_id, int(hops or 0)), explorer.highlight(job_id)
+
+    return [controls, graph]
         
 
 
@@ -58,34 +336,27 @@ GRAPH_FILE = './intermediates/test_graph.graphml'
 
 
 def calculate_schedule(dag: nx.DiGraph, num_machines, calculate_criteria = True) -> list:
-    dag_sc1 = dag.copy()
-    dag_sc2 = dag.copy()
-    schedule_1 = algorithm.heft(dag_sc1 ,num_machines=num_machines)
+    # Compiled once, the schedulers, the verifier and the metrics all work on the same arrays
+    compiled = compiled_dag.compile_dag(dag)
+    schedule_1 = algorithm.heft_compiled(compiled, num_machines=num_machines, columnar=True)
     with open("intermediates/schedule_1.json", "w") as file_handle:
-        json.dump(schedule_1, file_handle)
-    schedule_2 = algorithm.allocate_jobs_to_machines_nx(dag_sc2 ,num_machines=num_machines)
+        schedule_1.write_json(file_handle)
+    schedule_2 = algorithm.allocate_jobs_compiled(compiled, num_machines=num_machines, columnar=True)
     with open("intermediates/schedule_2.json", "w") as file_handle:
-        json.dump(schedule_2, file_handle)
-    overlap_schedule_1 = verification.verifcation_overlap_machine(schedule_1)
-    dependencies_schedule_1 = verification.verification_dependencies(dag, schedule_1)
-    overlap_schedule_2 = verification.verifcation_overlap_machine(schedule_2)
-    dependencies_schedule_2 = verification.verification_dependencies(dag, schedule_2)
-    result = [{'schedule': schedule_1, 'overlap': overlap_schedule_1, 'dependencies': dependencies_schedule_1},
-              {'schedule': schedule_2, 'overlap': overlap_schedule_2, 'dependencies': dependencies_schedule_2}]
+        schedule_2.write_json(file_handle)
+    result = []
+    for schedule in (schedule_1, schedule_2):
+        violations = verification.verify_schedule(compiled, schedule)
+        result.append({'schedule': schedule, 'violations': violations,
+                       'overlap': not any(v['type'] in ('overlap', 'order') for v in violations),
+                       'dependencies': not any(v['type'] == 'dependency' for v in violations)})
     if calculate_criteria:
-        critical_path_duration:timedelta = timedelta(seconds=0)
-        critical_path = nx.dag_longest_path(dag)
-        for node in critical_path:
-            critical_path_duration += nx.get_node_attributes(dag,"duration")[node]
-        srs_1 = max([l[-1]["end_time"] for l in schedule_1]) / critical_path_duration.total_seconds()
-        srs_2 = max([l[-1]["end_time"] for l in schedule_2]) / critical_path_duration.total_seconds()
-        result[0]["srs"] = srs_1
-        result[1]["srs"] = srs_2
-        result[0]["critical_path_duration"] = critical_path_duration
-        result[1]["critical_path_duration"] = critical_path_duration
-        return result
-    else:
-        return result
+        for entry in result:
+            entry["metrics"] = applicated_criteria.schedule_metrics(compiled, entry["schedule"], num_machines)
+            entry["srs"] = entry["metrics"]["slr"]
+            # Durations are seconds everywhere else, timedelta is only for display
+            entry["critical_path_duration"] = timedelta(seconds=entry["metrics"]["critical_path_length"])
+    return result
 
 
 default_stylesheet =  [
@@ -108,6 +379,15 @@ default_stylesheet =  [
         },
     ]
 
+# Same as default_stylesheet, the explorer edges being labelled by their own 'label'
+explorer_stylesheet = [
+        default_stylesheet[0],
+        {
+            "selector": 'edge',
+            "style": dict(default_stylesheet[1]["style"], label='data(label)'),
+        },
+    ]
+
 app = dash.Dash(__name__)
 
 
@@ -115,27 +395,34 @@ app = dash.Dash(__name__)
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog="data_viz")
     parser.add_argument('num_machines', type=int, help='Number of machines', default=3)
-    parser.add_argument("--schedule_only", type=str, nargs="+", help="List of paths to the schedule json files that you want to visualize")
+    parser.add_argument("--schedule_only", type=str, nargs="+", help="List of paths to the schedule files (.json, .ndjson or .npz) that you want to visualize")
     parser.add_argument('--file', help='Path to the file containing the DAG (optional)')
     parser.add_argument('--gen', action='store_true', help='Generate a random DAG (optional)')
     parser.add_argument('--num_nodes', type=int, help='Number of nodes in the DAG (required if --gen is used)')
     parser.add_argument('--max_duration', type=int, help='Maximum duration of jobs in the DAG (required if --gen is used)')
     parser.add_argument('--density', type=int, help="Set the edge density for the generated graph ", default=1)
     parser.add_argument("--reload", action="store_true", help="Reuse previously generated graph and regenerate a schedule again")
+    parser.add_argument("--cache", action="store_true", help="Load --file through its compiled .gdag cache instead of parsing the JSON")
     parser.add_argument("--nograph", action="store_true", help="Use if you don't want to render a large graph, must be used for larger data")
+    parser.add_argument("--explorer", action="store_true", help="Explore the DAG from the server, one level summary or job neighbourhood at a time, instead of sending the whole graph (works for large DAGs)")
+    parser.add_argument("--hops", type=int, default=1, help="Number of dependencies around a job shown by --explorer")
+    parser.add_argument("--gantt", choices=["auto", "timeline", "buckets"], default="auto", help="Gantt rendering: every job as a timeline bar, or WebGL time buckets redrawn on zoom (auto picks buckets for large schedules)")
     args = parser.parse_args()
     app_contents = []
     if args.schedule_only:
         # Load schedule from file and append it to the page to draw
-        for file in args.schedule_only:
-            app_contents.append(dcc.Graph(figure=plot_schedule(file, output="Dash")))
+        for index, file in enumerate(args.schedule_only):
+            app_contents.append(schedule_graph(app, f"schedule-{index}", file, mode=args.gantt))
         
     elif args.file:
-        dag = data_loader.load_dag_from_json(args.file)
+        if args.cache:
+            dag = compiled_dag.to_networkx(dag_cache.load_dag_cached(args.file))
+        else:
+            dag = data_loader.load_dag_from_json(args.file)
         schedules = calculate_schedule(dag, args.num_machines)
         app_contents.append(html.Div("Critical Path Length : " + str(schedules[0]["critical_path_duration"])))
-        for schedule in schedules:
-            app_contents.append(dcc.Graph(figure=plot_schedule(schedule["schedule"],file_input=False, output="Dash")))
+        for index, schedule in enumerate(schedules):
+            app_contents.append(schedule_graph(app, f"schedule-{index}", schedule["schedule"], mode=args.gantt))
             app_contents.append(html.Div("SRS = " + str(schedule["srs"])))
             app_contents.append(html.Div("Overlap = " + str(schedule["overlap"])))
             app_contents.append(html.Div("Dependencies = " + str(schedule["dependencies"])))
@@ -146,19 +433,14 @@ if __name__ == "__main__":
             parser.error("--gen requires --num_nodes and --max_duration.")
         # Generate a new random DAG
         dag = data_loader.generate_random_dag(args.num_nodes, args.max_duration, density_level=args.density)
-        # Convert timedelta values to total seconds for 'duration' attribute
-        cached_dag = dag.copy()
-        for node, data in cached_dag.nodes(data=True):
-            if 'duration' in data:
-                data['duration'] = data['duration'].total_seconds()
-        # Save the generated graph to the file
-        nx.write_graphml(cached_dag, GRAPH_FILE)
+        # Save the generated graph to the file (durations are already in seconds)
+        nx.write_graphml(dag, GRAPH_FILE)
         print("New graph generated and saved to file.")
         # RECALCULATE SCHEDULE
         schedules = calculate_schedule(dag, args.num_machines)
         app_contents.append(html.Div("Critical Path Length : " + str(schedules[0]["critical_path_duration"])))
-        for schedule in schedules:
-            app_contents.append(dcc.Graph(figure=plot_schedule(schedule["schedule"],file_input=False, output="Dash")))
+        for index, schedule in enumerate(schedules):
+            app_contents.append(schedule_graph(app, f"schedule-{index}", schedule["schedule"], mode=args.gantt))
             app_contents.append(html.Div("SRS = " + str(schedule["srs"])))
             app_contents.append(html.Div("Overlap = " + str(schedule["overlap"])))
             app_contents.append(html.Div("Dependencies = " + str(schedule["dependencies"])))
@@ -166,16 +448,12 @@ if __name__ == "__main__":
     elif args["reload"]:
         # Load the existing graph
         dag = nx.read_graphml(GRAPH_FILE)
-        # Convert total seconds back to timedelta for 'duration' attribute
-        for node, data in dag.nodes(data=True):
-            if 'duration' in data:
-                data['duration'] = timedelta(seconds=data['duration'])
         print("Graph loaded from file.") 
         # RECALCULATE SCHEDULE
         schedules = calculate_schedule(dag, args.num_machines)
         app_contents.append(html.Div("Critical Path Length : " + str(schedules[0]["critical_path_duration"])))
-        for schedule in schedules:
-            app_contents.append(dcc.Graph(figure=plot_schedule(schedule["schedule"],file_input=False, output="Dash")))
+        for index, schedule in enumerate(schedules):
+            app_contents.append(schedule_graph(app, f"schedule-{index}", schedule["schedule"], mode=args.gantt))
             app_contents.append(html.Div("SRS = " + str(schedule["srs"])))
             app_contents.append(html.Div("Overlap = " + str(schedule["overlap"])))
             app_contents.append(html.Div("Dependencies = " + str(schedule["dependencies"])))
@@ -183,7 +461,10 @@ if __name__ == "__main__":
     else: 
         parser.error("You have to provide one of the four available options : --file, --gen, --reload or --schedule_only ")
     
-    if not (args.schedule_only or args.nograph):
+    if args.explorer and not args.schedule_only:
+        app_contents += explorer_components(app, DagExplorer(dag), hops=args.hops)
+    elif not (args.schedule_only or args.nograph):
+        nodes_by_label = {str(node): node for node in dag.nodes}
         app_contents.append(cyto.Cytoscape(
         id="cytoscape",
         elements=elements_from_nx(dag),
@@ -211,13 +492,13 @@ if __name__ == "__main__":
             highlighted_nodes = set([selected_node_id])
             highlighted_edges = []
 
-            for edge in dag.edges:
-                if selected_node_id == str(edge[1]):
-                    highlighted_nodes.add(str(edge[0]))
-                    highlighted_nodes.add(str(edge[1]))
-                    highlighted_edges.append({'selector': f'edge[source="{edge[0]}"][target="{edge[1]}"]', 'style': {'line-color': '#78D5D7'}})
-                elif selected_node_id == str(edge[0]):
-                    highlighted_edges.append({'selector': f'edge[source="{edge[0]}"][target="{edge[1]}"]', 'style': {'line-color': '#C21F3D'}})
+            # Only the edges of the selected node, through the adjacency of the graph
+            selected = nodes_by_label[selected_node_id]
+            for predecessor in dag.predecessors(selected):
+                highlighted_nodes.add(str(predecessor))
+                highlighted_edges.append({'selector': f'edge[source="{predecessor}"][target="{selected}"]', 'style': {'line-color': '#78D5D7'}})
+            for successor in dag.successors(selected):
+                highlighted_edges.append({'selector': f'edge[source="{selected}"][target="{successor}"]', 'style': {'line-color': '#C21F3D'}})
 
 
             stylesheet = [
@@ -247,4 +528,4 @@ if __name__ == "__main__":
     
 
     app.layout = html.Div(app_contents)
-    app.run_server(debug=True)
+    app.run(debug=True)
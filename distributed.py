@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import heapq
+import json
+import os
+import tempfile
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import algorithm
+import columnar_schedule
+import compiled_dag
+import dag_cache
+import data_loader
+import verification
+
+METHODS = ["auto", "components", "levels"]
+MANIFEST_NAME = "partitions.json"
+
+
+def weakly_connected_components(dag: compiled_dag.CompiledDAG):
+    """
+    Returns the component of every task, numbered 0..k-1 by smallest task, in a few vectorised passes over the edges:
+    each pass hooks the label of every edge end to the smaller of the two, then labels jump to their root.
+    """
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    targets = dag.succ_indices
+    labels = np.arange(dag.num_nodes)
+    while True:
+        lowest = np.minimum(labels[sources], labels[targets])
+        hooked = labels.copy()
+        np.minimum.at(hooked, labels[sources], lowest)
+        np.minimum.at(hooked, labels[targets], lowest)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            break
+        labels = hooked
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def _pack_components(dag, components, num_parts):
+    # Largest components first, each one to the part with the least work so far
+    work = np.bincount(components, weights=dag.durations)
+    loads = [(0.0, part) for part in range(num_parts)]
+    part_of_component = np.zeros(len(work), dtype=np.int64)
+    for component in np.argsort(-work, kind="stable").tolist():
+        load, part = heapq.heappop(loads)
+        part_of_component[component] = part
+        heapq.heappush(loads, (load + work[component], part))
+    return part_of_component[components]
+
+
+def _level_bands(dag, num_parts):
+    # Consecutive levels, cut where the cumulated work crosses a multiple of the total over num_parts
+    level_of = np.zeros(dag.num_nodes, dtype=np.int64)
+    levels = compiled_dag.topological_levels(dag)
+    for level, tasks in enumerate(levels):
+        level_of[tasks] = level
+    level_work = np.bincount(level_of, weights=dag.durations, minlength=len(levels))
+    work_before = np.cumsum(level_work) - level_work
+    total = max(float(level_work.sum()), np.finfo(np.float64).tiny)
+    band_of_level = np.minimum(num_parts * work_before // total, num_parts - 1).astype(np.int64)
+    return band_of_level[level_of]
+
+
+def partition_dag(dag: compiled_dag.CompiledDAG, num_parts: int, method="auto", balance=1.25):
+    """
+    Splits the tasks of a DAG into at most ``num_parts`` parts of similar total work.
+
+    Methods:
+    - "components": whole weakly connected components packed into the parts, so that no edge crosses two parts.
+    - "levels": bands of consecutive topological levels, so that edges only go from a band to a later one.
+    - "auto": components if their packing puts at most ``balance`` times the mean work in a part, else levels.
+
+    Returns:
+    - tuple: The method used and the int64 vector of the part of each task, numbered 0..k-1 without empty parts (in
+      band order for levels).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown partitioning method {method}.")
+    num_parts = max(1, min(num_parts, dag.num_nodes))
+    if method in ("auto", "components"):
+        parts = _pack_components(dag, weakly_connected_components(dag), num_parts)
+        work = np.bincount(parts, weights=dag.durations, minlength=num_parts)
+        if method == "components" or work.max() <= balance * work.mean():
+            return "components", np.unique(parts, return_inverse=True)[1]
+    return "levels", np.unique(_level_bands(dag, num_parts), return_inverse=True)[1]
+
+
+def subgraph(dag: compiled_dag.CompiledDAG, tasks):
+    """
+    Returns the CompiledDAG of the tasks ``tasks`` (compact ids, in increasing order) and of the edges between them,
+    with their original ids.
+    """
+    tasks = np.asarray(tasks, dtype=np.int64)
+    local = np.full(dag.num_nodes, -1, dtype=np.int64)
+    local[tasks] = np.arange(len(tasks))
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    inside = (local[sources] >= 0) & (local[dag.succ_indices] >= 0)
+    return compiled_dag.from_edges(dag.node_ids[tasks], dag.durations[tasks], local[sources[inside]],
+                                   local[dag.succ_indices[inside]],
+                                   sizes=None if dag.edge_sizes is None else dag.edge_sizes[inside],
+                                   latencies=None if dag.edge_latencies is None else dag.edge_latencies[inside])
+
+
+def _machine_shares(work, num_machines):
+    # At least one machine per part, the others by largest remainder of the share of the work
+    shares = work / work.sum() * (num_machines - len(work)) if work.sum() > 0 else np.zeros(len(work))
+    counts = 1 + np.floor(shares).astype(np.int64)
+    counts[np.argsort(-(shares - np.floor(shares)), kind="stable")[:num_machines - counts.sum()]] += 1
+    return counts
+
+
+def write_partitions(dag: compiled_dag.CompiledDAG, num_machines: int, num_parts: int, directory: str, method="auto"):
+    """
+    Partitions a DAG (see :func:`partition_dag`) and writes every part as a .gdag file of ``directory`` (e.g. the shared
+    directory of a multi-instance task), so that each instance only loads its own part, with a manifest giving the
+    machines of each part.
+
+    Parts of components get disjoint machines in proportion to their work, bands all the machines, one after the
+    other. Components are never split, so there are at most ``num_machines`` of their parts.
+
+    Returns:
+    - dict: The manifest, also written to ``partitions.json``: 'method', 'num_machines', 'num_parts', and 'parts', the
+      'path', 'num_tasks', 'machine_offset' and 'num_machines' of each part.
+    """
+    method_used, parts = partition_dag(dag, num_parts if method == "levels" else min(num_parts, num_machines), method)
+    if method_used == "levels" and num_parts > num_machines:
+        method_used, parts = partition_dag(dag, num_parts, "levels")
+    num_parts = int(parts.max()) + 1 if dag.num_nodes else 0
+    if method_used == "components":
+        counts = _machine_shares(np.bincount(parts, weights=dag.durations, minlength=num_parts), num_machines)
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    else:
+        counts = np.full(num_parts, num_machines)
+        offsets = np.zeros(num_parts, dtype=np.int64)
+    os.makedirs(directory, exist_ok=True)
+    order = np.argsort(parts, kind="stable")
+    bounds = np.searchsorted(parts[order], np.arange(num_parts + 1))
+    manifest = {"method": method_used, "num_machines": num_machines, "num_parts": num_parts, "parts": []}
+    for part in range(num_parts):
+        path = f"part_{part}.gdag"
+        tasks = order[bounds[part]:bounds[part + 1]]
+        dag_cache.write_gdag(subgraph(dag, tasks), os.path.join(directory, path))
+        manifest["parts"].append({"path": path, "num_tasks": len(tasks), "machine_offset": int(offsets[part]),
+                                  "num_machines": int(counts[part])})
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as file_handle:
+        json.dump(manifest, file_handle, indent=4)
+    return manifest
+
+
+def schedule_partition(directory: str, part: int):
+    """
+    Schedules one part written by :func:`write_partitions` with HEFT on its machines, loading nothing else, and saves
+    its schedule next to it as ``part_<part>.npz``, machines being numbered in the whole pool.
+
+    Returns:
+    - str: The path of the saved schedule.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as file_handle:
+        entry = json.load(file_handle)["parts"][part]
+    dag = dag_cache.load_gdag(os.path.join(directory, entry["path"]))
+    schedule = algorithm.heft_compiled(dag, entry["num_machines"], columnar=True)
+    schedule = columnar_schedule.ColumnarSchedule(schedule.job_ids, schedule.machines + entry["machine_offset"],
+                                                  schedule.start_times, schedule.end_times,
+                                                  entry["machine_offset"] + entry["num_machines"])
+    path = os.path.join(directory, f"part_{part}.npz")
+    columnar_schedule.save_npz(schedule, path)
+    return path
+
+
+def stitch_schedules(dag: compiled_dag.CompiledDAG, partial_schedules, num_machines: int):
+    """
+    Merges the schedules of the parts of a DAG, in band order, into one schedule respecting every edge.
+
+    Each job keeps its machine and its order on it, and is moved to the earliest time after the previous job of its
+    machine (from this part or an earlier one) and all its predecessors, including those of earlier parts. Parts of
+    components on disjoint machines are thus left unchanged, and each band starts as soon as the jobs it depends on
+    allow instead of after the whole previous band.
+
+    Args:
+    - dag (compiled_dag.CompiledDAG): The whole DAG.
+    - partial_schedules (list of columnar_schedule.ColumnarSchedule): The schedules of the parts, in band order.
+    - num_machines (int): The number of machines of the pool.
+    Returns:
+    - columnar_schedule.ColumnarSchedule: The stitched schedule.
+    """
+    positions = compiled_dag.topological_positions(compiled_dag.topological_levels(dag), dag.num_nodes)
+    pred_offsets = dag.pred_offsets.tolist()
+    pred_indices = dag.pred_indices.tolist()
+    finish = [0.0] * dag.num_nodes
+    free = [0.0] * num_machines
+    index_of = dag.index_of
+    placed, machines, start_times, end_times = [], [], [], []
+    for schedule in partial_schedules:
+        tasks = np.fromiter((index_of(job_id) for job_id in schedule.job_ids.tolist()), dtype=np.int64,
+                            count=schedule.num_jobs)
+        # A job starts after its predecessors of the part, ties being zero-duration ones: positions break them
+        order = np.lexsort((positions[tasks], schedule.start_times))
+        for task, machine, duration in zip(tasks[order].tolist(), schedule.machines[order].tolist(),
+                                           schedule.durations[order].tolist()):
+            start_time = max([free[machine]] + [finish[predecessor] for predecessor in
+                                                pred_indices[pred_offsets[task]:pred_offsets[task + 1]]])
+            finish[task] = free[machine] = start_time + duration
+            placed.append(task)
+            machines.append(machine)
+            start_times.append(start_time)
+            end_times.append(start_time + duration)
+    return columnar_schedule.ColumnarSchedule.from_tasks(dag, placed, machines, start_times, end_times, num_machines)
+
+
+def load_partial_schedules(directory: str):
+    """
+    Loads the schedules saved by :func:`schedule_partition` for every part of the manifest of ``directory``.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as file_handle:
+        manifest = json.load(file_handle)
+    return manifest, [columnar_schedule.load_npz(os.path.join(directory, f"part_{part}.npz"))
+                      for part in range(manifest["num_parts"])]
+
+
+def run_distributed(dag: compiled_dag.CompiledDAG, num_machines: int, num_parts: int, method="auto", directory=None,
+                    workers=None):
+    """
+    Runs the whole distributed mode locally: the DAG is partitioned into ``directory`` (a temporary one by default),
+    every part is scheduled by a separate worker process standing in for an instance, and the parts are stitched.
+
+    Returns:
+    - dict: 'schedule' (columnar), 'makespan', 'method', 'num_parts' and 'elapsed' (seconds of partitioning,
+      scheduling and stitching).
+    """
+    with tempfile.TemporaryDirectory() if directory is None else contextlib.nullcontext(directory) as directory:
+        elapsed = {}
+        start_time = timeit.default_timer()
+        manifest = write_partitions(dag, num_machines, num_parts, directory, method)
+        elapsed["partition"] = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        with ProcessPoolExecutor(max_workers=workers or manifest["num_parts"] or 1) as executor:
+            list(executor.map(schedule_partition, [directory] * manifest["num_parts"], range(manifest["num_parts"])))
+        elapsed["schedule"] = timeit.default_timer() - start_time
+        start_time = timeit.default_timer()
+        _, partial_schedules = load_partial_schedules(directory)
+        schedule = stitch_schedules(dag, partial_schedules, num_machines)
+        elapsed["stitch"] = timeit.default_timer() - start_time
+    return {"schedule": schedule, "makespan": schedule.makespan, "method": manifest["method"],
+            "num_parts": manifest["num_parts"], "elapsed": elapsed}
+
+
+def _load(path):
+    return dag_cache.load_gdag(path) if path.endswith(".gdag") else data_loader.load_dag_streaming(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="distributed")
+    commands = parser.add_subparsers(dest="command", required=True)
+    local = commands.add_parser("local", help="Partition, schedule the parts in worker processes and stitch them")
+    local.add_argument("num_machines", type=int, help="Number of machines")
+    local.add_argument("file", help="Path to the DAG (.json or .gdag)")
+    local.add_argument("--parts", type=int, default=5, help="Number of parts, one per instance")
+    local.add_argument("--method", choices=METHODS, default="auto", help="Partitioning method")
+    local.add_argument("--workers", type=int, help="Number of worker processes (default: one per part)")
+    local.add_argument("--output", default="schedule.json", help="Where to write the schedule (.json, .ndjson or .npz)")
+    partition = commands.add_parser("partition", help="Write the parts and their manifest to a shared directory")
+    partition.add_argument("num_machines", type=int, help="Number of machines")
+    partition.add_argument("file", help="Path to the DAG (.json or .gdag)")
+    partition.add_argument("directory", help="Directory of the parts")
+    partition.add_argument("--parts", type=int, default=5, help="Number of parts, one per instance")
+    partition.add_argument("--method", choices=METHODS, default="auto", help="Partitioning method")
+    schedule_part = commands.add_parser("schedule", help="Schedule one part (run by each instance)")
+    schedule_part.add_argument("directory", help="Directory of the parts")
+    schedule_part.add_argument("part", type=int, help="Index of the part")
+    stitch = commands.add_parser("stitch", help="Stitch the schedules of the parts (run by the coordinator)")
+    stitch.add_argument("file", help="Path to the DAG (.json or .gdag)")
+    stitch.add_argument("directory", help="Directory of the parts")
+    stitch.add_argument("--output", default="schedule.json", help="Where to write the schedule (.json, .ndjson or .npz)")
+    args = parser.parse_args()
+
+    if args.command == "local":
+        dag = _load(args.file)
+        result = run_distributed(dag, args.num_machines, args.parts, method=args.method, workers=args.workers)
+        print(f"{result['num_parts']} parts by {result['method']}, makespan={result['makespan']:.1f}, "
+              + ", ".join(f"{step} {seconds:.3f}s" for step, seconds in result["elapsed"].items()))
+        print("Valid:", not verification.verify_schedule(dag, result["schedule"]))
+        columnar_schedule.save_schedule(result["schedule"], args.output)
+    elif args.command == "partition":
+        manifest = write_partitions(_load(args.file), args.num_machines, args.parts, args.directory, args.method)
+        print(f"{manifest['num_parts']} parts by {manifest['method']} written to {args.directory}")
+    elif args.command == "schedule":
+        print("Schedule written to", schedule_partition(args.directory, args.part))
+    else:
+        dag = _load(args.file)
+        manifest, partial_schedules = load_partial_schedules(args.directory)
+        schedule = stitch_schedules(dag, partial_schedules, manifest["num_machines"])
+        print(f"Makespan: {schedule.makespan:.1f}")
+        columnar_schedule.save_schedule(schedule, args.output)
@@ -1,10 +1,26 @@
 import argparse
+import contextlib
 import algorithm
+import columnar_schedule
+import compiled_dag
+import dag_cache
 import data_loader
-import json 
 from cProfile import Profile
 from pstats import SortKey, Stats
 
+
+def run_scheduler(dag, engine, num_machines, writer=None):
+    """
+    Schedules the DAG with the selected engine and returns the schedule as a columnar_schedule.ColumnarSchedule, every
+    job also going to ``writer`` (a columnar_schedule.NDJSONScheduleWriter) as soon as it is placed if one is given.
+    """
+    if engine == "rx":
+        return algorithm.allocate_jobs_to_machines_with_heuristic_rx(dag, num_machines=num_machines, columnar=True, writer=writer)
+    if engine == "nx":
+        dag = compiled_dag.compile_dag(dag)
+    return algorithm.allocate_jobs_compiled(dag, num_machines=num_machines, columnar=True, writer=writer)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='greedguler')
     parser.add_argument('num_machines', type=int, help='Number of machines')
@@ -12,30 +28,47 @@ if __name__ == "__main__":
     parser.add_argument('--gen', action='store_true', help='Generate a random DAG (optional)')
     parser.add_argument('--num_nodes', type=int, help='Number of nodes in the DAG (required if --gen is used)')
     parser.add_argument('--max_duration', type=int, help='Maximum duration of jobs in the DAG (required if --gen is used)')
+    parser.add_argument('--engine', choices=['rx', 'nx', 'arrays'], default='rx', help='Graph representation used to load and schedule the DAG (default: rx, arrays streams the file into compiled arrays)')
+    parser.add_argument('--cache', action='store_true', help='With --engine arrays, load the DAG through its compiled .gdag cache, rebuilt when the JSON file changes')
+    parser.add_argument('--output', default='schedule.json', help='Where to write the schedule: .json (list of lists), .ndjson (one line per job, written as jobs are placed) or .npz (columns)')
     parser.add_argument("--profile", action="store_true", help="Whether or not to profile the algorithm code")
     args = parser.parse_args()
+    if args.cache and args.engine != "arrays":
+        parser.error("--cache requires --engine arrays.")
 
     if args.gen:
         if not (args.num_nodes and args.max_duration):
             parser.error("--gen requires --num_nodes and --max_duration.")
         dag = data_loader.generate_random_dag(args.num_nodes, args.max_duration)
+        if args.engine == "rx":
+            dag = data_loader.rx_from_nx(dag)
+        elif args.engine == "arrays":
+            dag = compiled_dag.compile_dag(dag)
     elif args.file:
-        dag = data_loader.load_dag_from_json(args.file)
+        if args.engine == "rx":
+            dag = data_loader.load_dag_from_json_rx(args.file)
+        elif args.engine == "arrays":
+            dag = dag_cache.load_dag_cached(args.file) if args.cache else data_loader.load_dag_streaming(args.file)
+        else:
+            dag = data_loader.load_dag_from_json(args.file)
     else:
         parser.error("Either --file or --gen must be provided.")
-    if args.profile:
-        with Profile() as profile:
-            schedule = algorithm.allocate_jobs_to_machines_with_heuristic(dag, num_machines=args.num_machines)
-            (
-            Stats(profile)
-            .strip_dirs()
-            .sort_stats(SortKey.CALLS)
-            .print_stats()
-            )
-    else:
-        schedule = algorithm.allocate_jobs_to_machines_with_heuristic(dag, num_machines=args.num_machines)
-    
+    # NDJSON is written while the jobs are placed, the other formats once the schedule is complete
+    streaming = columnar_schedule.schedule_format(args.output) == "ndjson"
+    with open(args.output, "w") if streaming else contextlib.nullcontext() as output_handle:
+        writer = columnar_schedule.NDJSONScheduleWriter(output_handle, args.num_machines) if streaming else None
+        if args.profile:
+            with Profile() as profile:
+                schedule = run_scheduler(dag, args.engine, args.num_machines, writer=writer)
+                (
+                Stats(profile)
+                .strip_dirs()
+                .sort_stats(SortKey.CALLS)
+                .print_stats()
+                )
+        else:
+            schedule = run_scheduler(dag, args.engine, args.num_machines, writer=writer)
     
-    with open("schedule.json", "w") as file_handle:
-        json.dump(schedule, file_handle)
-    #print(schedule)
\ No newline at end of file
+    if not streaming:
+        columnar_schedule.save_schedule(schedule, args.output)
+    #print(schedule)
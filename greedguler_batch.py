@@ -1,4 +1,5 @@
 import argparse
+import asyncio
 import os
 import subprocess
 import time
@@ -8,6 +9,9 @@ from azure.batch.batch_auth import SharedKeyCredentials
 from azure.storage.blob import BlobServiceClient, BlobClient
 import json
 
+import batch_orchestration
+import sweep
+
 try:
     import configs              
 except ImportError:
@@ -140,26 +144,22 @@ def create_task(batch_client, name_job, cmd, name_task, param_multi_inst=None):
     return dest_files
 
 
-def download_files_from_blob(blob_service_client:BlobServiceClient):
+def download_files_from_blob(blob_service_client:BlobServiceClient, name_starts_with=None, max_concurrency=8):
     """
     Downloads all files from a specified Azure Blob Storage container named "results".
 
     Each file from the container is downloaded to a local directory named "./results", preserving the blob structure.
+    Downloads run concurrently and are streamed to disk, files already downloaded with the same etag and size being
+    skipped (see batch_orchestration.download_blobs).
 
     Args:
         blob_service_client (BlobServiceClient): The client to interact with the Azure Blob Storage service.
+        name_starts_with (str, optional): Only downloads the blobs whose name starts with it. Defaults to None (all).
+        max_concurrency (int, optional): Number of blobs downloaded at once. Defaults to 8.
     """
     container_client = blob_service_client.get_container_client("results")
-    
-    blobs = container_client.list_blobs()
-    for blob in blobs:
-        blob_client = container_client.get_blob_client(blob=blob.name)  # Use blob.name
-        download_file_path = os.path.join("./results", blob.name)
-        os.makedirs(os.path.dirname(download_file_path), exist_ok=True)
-        with open(download_file_path, "wb") as download_file:
-            download_file.write(blob_client.download_blob().readall())
-            
-        print(f"Downloaded {blob.name} to {download_file_path}")
+    asyncio.run(batch_orchestration.download_blobs(container_client, "./results", name_starts_with=name_starts_with,
+                                                   max_concurrency=max_concurrency))
 
 
 def git_push_changes(repo_dir, commit_message="Automated Repo Update"):
@@ -210,6 +210,11 @@ if __name__ == "__main__":
     parser.add_argument('--pool_id', help='Id of pool', dest='pool_id', default='GreedgulerPool3')
     parser.add_argument('--new_job', help='Id of new job to create', dest='new_job')
     parser.add_argument('--new_pool', help='Id of new pool to create', dest='new_pool')
+    parser.add_argument('--size_from', help='DAG file used to size the new pool with a machine-count sweep', dest='size_from')
+    parser.add_argument('--max_nodes', type=int, help='Largest pool size tried by the sweep', dest='max_nodes', default=32)
+    parser.add_argument('--tolerance', type=float, help='Accepted relative distance to the critical path for the sweep', dest='tolerance', default=0.05)
+    parser.add_argument('--poll_interval', type=float, help='First interval in seconds between two polls of the task', dest='poll_interval', default=5.0)
+    parser.add_argument('--max_poll_interval', type=float, help='Largest interval in seconds between two polls of the task', dest='max_poll_interval', default=60.0)
     
     args = parser.parse_args()
     
@@ -220,11 +225,19 @@ if __name__ == "__main__":
     pool_id = "GreedgulerPool0"
 
     if args.new_pool:
-    
+
+        rule_scaling = configs.rule_scaling
+        if args.size_from:
+            # Size the pool at the knee of the makespan curve instead of guessing
+            sweep_result = sweep.sweep_machine_counts(args.size_from, list(range(1, args.max_nodes + 1)), tolerance=args.tolerance)
+            pool_size = sweep_result["knee"] or args.max_nodes
+            print("Pool sized to {0} nodes from the sweep of {1}".format(pool_size, args.size_from))
+            rule_scaling = sweep.autoscale_formula(pool_size)
+
         create_pool(
             batch_client = batch_client,
             name_pool = args.new_pool,
-            rule_scale_pool = configs.rule_scaling
+            rule_scale_pool = rule_scaling
             )
 
         pool_id = args.new_pool
@@ -278,14 +291,15 @@ if __name__ == "__main__":
                 param_multi_inst = multi_instance_task_param
                )
     
-    # Monitoring the task status
-    while True:
-        task = batch_client.task.get(job_id, task_id)
-        print(f"Task {task_id} status: {task.state}")
-        if task.state == 'completed':
-            print("Task completed. Downloading files from blob ... ")
-            download_files_from_blob(blob_service_client)
-            print("Download finished.")
-        time.sleep(10)  # Polling interval
-
-
+    # Monitoring the task status, polled less and less often while it does not change, until it completes or fails
+    states = asyncio.run(batch_orchestration.run_and_download(
+                batch_client = batch_client,
+                container_client = blob_service_client.get_container_client("results"),
+                job_id = job_id,
+                task_ids = [task_id],
+                name_starts_with = dest_files.container.path,
+                initial_interval = args.poll_interval,
+                max_interval = args.max_poll_interval
+               ))
+    if states[task_id] != batch_orchestration.COMPLETED:
+        raise SystemExit(1)
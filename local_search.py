@@ -0,0 +1,380 @@
+import argparse
+import bisect
+import heapq
+import random
+import timeit
+
+import columnar_schedule
+import compiled_dag
+import data_loader
+
+# Visits of a single task after which a propagation checks whether it runs around a cycle
+_MAX_VISITS = 16
+
+
+class ScheduleState:
+    """
+    A schedule held as one ordered task sequence per machine, every task starting as soon as both its predecessors and
+    the previous task of its machine are done.
+
+    Edits (moving or swapping tasks) only touch the sequences; :meth:`propagate` then recomputes the start and finish
+    times of the tasks downstream of the edit, and :meth:`rollback` undoes the last edit and its propagation.
+
+    Attributes:
+    - dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+    - durations (list of float): Duration of each task, by compact id.
+    - sequences (list of list of int): Compact ids of the tasks of each machine, in execution order.
+    - machine_of (list of int): Machine of each task.
+    - start (list of float): Start time of each task.
+    - finish (list of float): Finish time of each task.
+    - total_finish (float): Sum of the finish times, the secondary objective of the local search.
+    - retimed (list of int): The tasks whose times changed during the last propagation.
+    """
+
+    def __init__(self, dag: compiled_dag.CompiledDAG, sequences, durations=None):
+        self.dag = dag
+        self.node_ids = dag.node_ids.tolist()
+        self.durations = dag.durations.tolist() if durations is None else list(durations)
+        self.sequences = [list(sequence) for sequence in sequences]
+        self._succ_offsets = dag.succ_offsets.tolist()
+        self._succ_indices = dag.succ_indices.tolist()
+        self._pred_offsets = dag.pred_offsets.tolist()
+        self._pred_indices = dag.pred_indices.tolist()
+        self.machine_of = [-1] * dag.num_nodes
+        self._position = [-1] * dag.num_nodes
+        for machine in range(len(self.sequences)):
+            self._reindex(machine)
+        if -1 in self.machine_of:
+            raise ValueError(f"Job {self.node_ids[self.machine_of.index(-1)]} is not scheduled.")
+        self.start = [0.0] * dag.num_nodes
+        self.finish = [0.0] * dag.num_nodes
+        self.total_finish = 0.0
+        self.retimed = []
+        self._undo = None
+        if not self._retime_all():
+            raise ValueError("The machine order of the schedule contradicts the dependencies of the DAG.")
+
+    @classmethod
+    def from_schedule(cls, dag: compiled_dag.CompiledDAG, schedule):
+        """
+        Builds the state of a schedule in the list of lists format, keeping its machine assignment and the start order
+        of each machine. Idle gaps that no dependency requires are closed in the process.
+        """
+        sequences = []
+        for machine_schedule in schedule:
+            jobs = sorted(machine_schedule, key=lambda job: job["start_time"])
+            sequences.append([dag.index_of(job["job_index"]) for job in jobs])
+        return cls(dag, sequences)
+
+    def to_schedule(self):
+        """
+        Returns the schedule in the list of lists format.
+        """
+        return [[{'start_time': self.start[task], 'end_time': self.finish[task], 'duration': self.finish[task] - self.start[task],
+                  'job_index': self.node_ids[task]} for task in sequence] for sequence in self.sequences]
+
+    @property
+    def makespan(self):
+        return max(self.finish, default=0.0)
+
+    def _reindex(self, machine, first=0):
+        sequence = self.sequences[machine]
+        for position in range(first, len(sequence)):
+            task = sequence[position]
+            self.machine_of[task] = machine
+            self._position[task] = position
+
+    def _machine_next(self, task):
+        sequence = self.sequences[self.machine_of[task]]
+        position = self._position[task] + 1
+        return sequence[position] if position < len(sequence) else None
+
+    def _machine_previous(self, task):
+        position = self._position[task]
+        return self.sequences[self.machine_of[task]][position - 1] if position else None
+
+    def ready_time(self, task):
+        """
+        Returns the time at which all the predecessors of a task are done.
+        """
+        finish = self.finish
+        return max([finish[pred] for pred in self._pred_indices[self._pred_offsets[task]:self._pred_offsets[task + 1]]], default=0.0)
+
+    def _dependents(self, task):
+        return self._succ_indices[self._succ_offsets[task]:self._succ_offsets[task + 1]]
+
+    def _successors(self, task):
+        successors = self._dependents(task)
+        following = self._machine_next(task)
+        return successors if following is None else successors + [following]
+
+    def _retime_all(self):
+        """
+        Computes the times of every task in one topological pass over dependencies and machine order.
+
+        Returns:
+        - bool: False if the sequences contain a cycle (a task waiting on its own descendant).
+        """
+        waiting = [self._pred_offsets[task + 1] - self._pred_offsets[task] + (self._position[task] > 0)
+                   for task in range(self.dag.num_nodes)]
+        ready = [task for task, count in enumerate(waiting) if count == 0]
+        done = 0
+        while ready:
+            task = ready.pop()
+            self._retime(task)
+            done += 1
+            for successor in self._successors(task):
+                waiting[successor] -= 1
+                if waiting[successor] == 0:
+                    ready.append(successor)
+        self.total_finish = sum(self.finish)
+        return done == self.dag.num_nodes
+
+    def _retime(self, task):
+        begin = self.ready_time(task)
+        previous = self._machine_previous(task)
+        if previous is not None and self.finish[previous] > begin:
+            begin = self.finish[previous]
+        self.start[task] = begin
+        self.finish[task] = begin + self.durations[task]
+
+    def propagate(self, seeds):
+        """
+        Recomputes the times of the ``seeds`` and of the tasks downstream of them, through dependencies and machine
+        order. Tasks are visited by their previous start time and the propagation stops wherever the times do not
+        change, so an edit only costs the part of the schedule it actually shifts.
+
+        Args:
+        - seeds (iterable of int): The tasks whose machine order or duration changed.
+        Returns:
+        - bool: False if the sequences contain a cycle (a task waiting on its own descendant). The times changed so far
+          are still recorded, so that rollback restores them.
+        """
+        start, finish = self.start, self.finish
+        seeds = list(seeds)
+        saved = {}
+        visits = {}
+        checked = False
+        forced = set(seeds)
+        queued = set(forced)
+        heap = [(start[task], task) for task in forced]
+        heapq.heapify(heap)
+        total_finish = self.total_finish
+        cycle = False
+        while heap:
+            _, task = heapq.heappop(heap)
+            queued.discard(task)
+            visits[task] = visits.get(task, 0) + 1
+            if visits[task] > _MAX_VISITS and not checked:
+                # Many revisits may just come from the visiting order, but only a cycle makes them endless
+                checked = True
+                if self._has_cycle(seeds):
+                    cycle = True
+                    break
+            begin, end = start[task], finish[task]
+            self._retime(task)
+            if start[task] == begin and finish[task] == end and task not in forced:
+                continue
+            forced.discard(task)
+            saved.setdefault(task, (begin, end))
+            total_finish += finish[task] - end
+            for successor in self._successors(task):
+                if successor not in queued:
+                    queued.add(successor)
+                    previous_start = saved[successor][0] if successor in saved else start[successor]
+                    heapq.heappush(heap, (previous_start, successor))
+        self.retimed = list(saved)
+        if self._undo is not None:
+            self._undo[1].extend((task, begin, end) for task, (begin, end) in saved.items())
+        self.total_finish = total_finish
+        return not cycle
+
+    def _has_cycle(self, seeds):
+        """
+        Whether a cycle of dependencies and machine order is reachable from ``seeds``, by a depth-first search marking the
+        tasks of its current path. Every edit seeds its propagation with the tasks its new machine order leads to, so a
+        cycle it creates is always reachable.
+        """
+        on_path, done = set(), set()
+        for seed in seeds:
+            if seed in done:
+                continue
+            on_path.add(seed)
+            stack = [(seed, iter(self._successors(seed)))]
+            while stack:
+                task, successors = stack[-1]
+                for successor in successors:
+                    if successor in on_path:
+                        return True
+                    if successor not in done:
+                        on_path.add(successor)
+                        stack.append((successor, iter(self._successors(successor))))
+                        break
+                else:
+                    on_path.discard(task)
+                    done.add(task)
+                    stack.pop()
+        return False
+
+    def _begin_edit(self, machines):
+        self._undo = [{machine: list(self.sequences[machine]) for machine in machines}, [], self.total_finish]
+
+    def commit(self):
+        """
+        Keeps the last edit.
+        """
+        self._undo = None
+
+    def rollback(self):
+        """
+        Undoes the last edit and the times it changed.
+        """
+        sequences, saved, total_finish = self._undo
+        for machine, sequence in sequences.items():
+            self.sequences[machine] = sequence
+            self._reindex(machine)
+        for task, begin, end in saved:
+            self.start[task] = begin
+            self.finish[task] = end
+        self.total_finish = total_finish
+        self._undo = None
+
+    def move(self, task, machine):
+        """
+        Moves a task to another machine, where it is inserted by its ready time, and propagates the change.
+
+        Returns:
+        - bool: False if the move creates a cycle, in which case it has been rolled back already.
+        """
+        self._begin_edit((self.machine_of[task], machine))
+        if not self.propagate(self._relocate(task, machine)):
+            self.rollback()
+            return False
+        return True
+
+    def _relocate(self, task, machine, at=None):
+        """
+        Moves a task to another machine without retiming anything. It is inserted before the tasks starting at or after
+        ``at``, which defaults to its ready time.
+
+        Returns:
+        - list of int: The tasks whose machine order changed, to be propagated.
+        """
+        source = self.machine_of[task]
+        position = self._position[task]
+        sequence = self.sequences[source]
+        del sequence[position]
+        self._reindex(source, position)
+        seeds = [task] + sequence[position:position + 1]
+        target = self.sequences[machine]
+        # Machine sequences are ordered by start time
+        at = self.ready_time(task) if at is None else at
+        insert_at = bisect.bisect_left(target, at, key=self.start.__getitem__)
+        target.insert(insert_at, task)
+        self._reindex(machine, insert_at)
+        return seeds + target[insert_at + 1:insert_at + 2]
+
+    def swap_with_previous(self, task):
+        """
+        Swaps a task with the previous task of its machine and propagates the change.
+
+        Returns:
+        - bool: False if the task has no previous task or the swap creates a cycle (in which case it has been rolled back).
+        """
+        position = self._position[task]
+        if position == 0:
+            return False
+        machine = self.machine_of[task]
+        self._begin_edit((machine,))
+        sequence = self.sequences[machine]
+        sequence[position - 1], sequence[position] = task, sequence[position - 1]
+        self._reindex(machine, position - 1)
+        if not self.propagate([task, sequence[position]]):
+            self.rollback()
+            return False
+        return True
+
+    def machine_bound_tasks(self):
+        """
+        Walks back a critical chain of the schedule, from the last task to finish through the predecessor or previous
+        machine task each task waited for, and returns the tasks of the chain that waited for their machine. When there
+        are none the makespan is the length of a path of the DAG, so no edit can improve it.
+        """
+        if not self.finish:
+            return []
+        finish = self.finish
+        task = max(range(len(finish)), key=finish.__getitem__)
+        bound = []
+        while self.start[task] > 0:
+            previous = self._machine_previous(task)
+            waited_for = max(self._pred_indices[self._pred_offsets[task]:self._pred_offsets[task + 1]],
+                             key=finish.__getitem__, default=None)
+            if waited_for is None or (previous is not None and finish[previous] > finish[waited_for]):
+                bound.append(task)
+                waited_for = previous
+            task = waited_for
+        return bound
+
+
+def improve_schedule(graph, schedule, deadline_ms=1000, seed=0):
+    """
+    Improves a schedule by local search until a deadline and returns the best schedule found (the anytime result).
+
+    Every step picks a task of the critical chain of the current schedule that waited for its machine, then either swaps
+    it with the previous task of the machine or moves one of the two to another machine. Only the tasks downstream of
+    the edit are retimed, and the edit is kept if it lowers the makespan, or keeps it and lowers the sum of the finish
+    times. The search stops early once the critical chain only follows dependencies.
+
+    Args:
+    - graph (networkx.DiGraph or compiled_dag.CompiledDAG): The DAG of tasks.
+    - schedule (list): A valid schedule in the list of lists format, e.g. the output of heft.
+    - deadline_ms (float, optional): Time budget in milliseconds. Defaults to 1000.
+    - seed (int, optional): Seed of the move selection. Defaults to 0.
+    Returns:
+    - list: The improved schedule, in the list of lists format.
+    """
+    deadline = timeit.default_timer() + deadline_ms / 1000
+    dag = graph if isinstance(graph, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(graph)
+    state = ScheduleState.from_schedule(dag, schedule)
+    num_machines = len(state.sequences)
+    rng = random.Random(seed)
+    best = (state.makespan, state.total_finish)
+    bound = state.machine_bound_tasks()
+    while bound and timeit.default_timer() < deadline:
+        task = rng.choice(bound)
+        move = rng.randrange(3) if num_machines > 1 else 0
+        if move == 0:
+            applied = state.swap_with_previous(task)
+        else:
+            if move == 2:
+                task = state._machine_previous(task)
+            machine = rng.randrange(num_machines - 1)
+            applied = state.move(task, machine if machine < state.machine_of[task] else machine + 1)
+        if not applied:
+            continue
+        candidate = (state.makespan, state.total_finish)
+        if candidate < best:
+            best = candidate
+            state.commit()
+            bound = state.machine_bound_tasks()
+        else:
+            state.rollback()
+    return state.to_schedule()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="local_search")
+    parser.add_argument("file", help="Path to the file containing the DAG")
+    parser.add_argument("schedule", help="Path to the schedule to improve (.json, .ndjson or .npz)")
+    parser.add_argument("--deadline_ms", type=float, default=1000, help="Time budget in milliseconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the move selection")
+    parser.add_argument("--output", default="schedule.json", help="Where to write the improved schedule (.json, .ndjson or .npz)")
+    args = parser.parse_args()
+
+    dag = data_loader.load_dag_streaming(args.file)
+    schedule = columnar_schedule.load_schedule(args.schedule).to_legacy()
+    before = max([job["end_time"] for machine in schedule for job in machine], default=0)
+    improved = improve_schedule(dag, schedule, deadline_ms=args.deadline_ms, seed=args.seed)
+    after = max([job["end_time"] for machine in improved for job in machine], default=0)
+    print(f"Makespan: {before} -> {after} ({(before - after) / before if before else 0:.2%} shorter)")
+    columnar_schedule.save_schedule(improved, args.output)
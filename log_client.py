@@ -0,0 +1,136 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import timeit
+import urllib.error
+import urllib.request
+
+
+class BufferedLogClient:
+    """
+    Ships log records of a worker to the ``/log`` endpoint of ``start_logger.py`` in batches, from a background thread.
+
+    :meth:`log` only appends the record to a bounded queue and never waits: when the queue is full (the server is slow
+    or unreachable) the record is dropped and counted in ``dropped``. The sender thread posts a batch as soon as it
+    holds ``batch_size`` records or ``flush_interval`` seconds after its first record, and drops the batch if the
+    server does not accept it.
+
+    Args:
+    - url (str): The URL of the ``/log`` endpoint.
+    - machine (int or str): The machine reported with every record.
+    - batch_size (int, optional): Largest number of records of a batch. Defaults to 200.
+    - flush_interval (float, optional): Longest time in seconds a record waits before being sent. Defaults to 1.
+    - max_queued (int, optional): Number of records waiting to be sent above which new ones are dropped. Defaults to 10000.
+    - timeout (float, optional): Timeout of a request in seconds. Defaults to 5.
+
+    Attributes:
+    - sent (int): Records accepted by the server.
+    - dropped (int): Records dropped, on a full queue or a failed request.
+    """
+
+    def __init__(self, url, machine, batch_size=200, flush_interval=1.0, max_queued=10000, timeout=5.0):
+        self.url = url
+        self.machine = machine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.sent = 0
+        self.dropped = 0
+        # Guards the counters, updated by the callers of log and by the sender thread
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="log-client", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_url_file(cls, machine, path="./azure_batch/ngrok_url.txt", **kwargs):
+        """
+        Builds a client for the server whose public URL ``start_logger.py`` wrote to ``path``.
+        """
+        with open(path) as url_file:
+            return cls(url_file.read().strip().rstrip("/") + "/log", machine, **kwargs)
+
+    def log(self, message, **fields):
+        """
+        Queues a record with the machine, the message, the time and any other JSON-serialisable ``fields``.
+
+        Returns:
+        - bool: Whether the record was queued (False if it was dropped).
+        """
+        record = {"machine": self.machine, "message": message, "time": time.time(), **fields}
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = timeit.default_timer() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - timeit.default_timer()
+            if remaining <= 0 or (self._closed.is_set() and self._queue.empty()):
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        request = urllib.request.Request(self.url, data=json.dumps(batch).encode(), method="POST",
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except (urllib.error.URLError, OSError, ValueError):
+            # The server queues a batch whole or not at all, so a refused batch is entirely dropped
+            with self._lock:
+                self.dropped += len(batch)
+            return
+        with self._lock:
+            self.sent += len(batch)
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def close(self, timeout=None):
+        """
+        Sends the records still queued and stops the sender thread, waiting for it at most ``timeout`` seconds.
+        """
+        self._closed.set()
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="log_client", description="Sends test records to a start_logger.py server.")
+    parser.add_argument("url", help="URL of the /log endpoint, e.g. http://localhost:5020/log")
+    parser.add_argument("--machine", default=0, help="Machine reported with the records")
+    parser.add_argument("--count", type=int, default=10000, help="Number of records")
+    parser.add_argument("--batch_size", type=int, default=200, help="Largest number of records of a batch")
+    args = parser.parse_args()
+
+    with BufferedLogClient(args.url, args.machine, batch_size=args.batch_size) as client:
+        start_time = timeit.default_timer()
+        for i in range(args.count):
+            client.log(f"Record {i}")
+        elapsed = timeit.default_timer() - start_time
+    print(f"{args.count} records logged in {elapsed:.3f}s ({elapsed / max(args.count, 1) * 1e6:.2f} us each), "
+          f"{client.sent} sent and {client.dropped} dropped")
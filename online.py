@@ -0,0 +1,280 @@
+import argparse
+import heapq
+import timeit
+
+import numpy as np
+
+import algorithm
+import compiled_dag
+import data_loader
+import local_search
+
+
+class OnlineScheduler(local_search.ScheduleState):
+    """
+    A schedule kept up to date while it runs.
+
+    The initial plan (HEFT by default) is repaired event by event instead of being recomputed: a job finishing early or
+    late only retimes the jobs that were waiting on it, a new job is appended to the machine that can start it first,
+    and only the jobs that have not started are replanned when a machine is lost. Finished jobs keep their actual times and no pending
+    job is planned before the latest event.
+
+    Attributes:
+    - now (float): Time of the latest event.
+    - finished (list of bool): Whether each job has finished, by compact id.
+    - lost_machines (set of int): The machines that have been lost.
+    """
+
+    def __init__(self, graph, num_machines: int, schedule=None):
+        dag = graph if isinstance(graph, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(graph)
+        if schedule is None:
+            schedule = algorithm.heft_compiled(dag, num_machines)
+        sequences = [[dag.index_of(job["job_index"]) for job in sorted(machine_schedule, key=lambda job: job["start_time"])]
+                     for machine_schedule in schedule]
+        self.now = 0.0
+        self.finished = [False] * dag.num_nodes
+        self.lost_machines = set()
+        self._added_successors = {}
+        super().__init__(dag, sequences)
+        self._index = {node: task for task, node in enumerate(self.node_ids)}
+        self._unfinished_predecessors = np.diff(dag.pred_offsets).tolist()
+        self._ready = {task for task, count in enumerate(self._unfinished_predecessors) if count == 0}
+        self._ranks = compiled_dag.upward_ranks(dag).tolist()
+        # Position of the first unfinished job of each machine, advanced lazily
+        self._first_unfinished = [0] * len(self.sequences)
+
+    def _dependents(self, task):
+        dependents = super()._dependents(task)
+        added = self._added_successors.get(task)
+        return dependents + added if added else dependents
+
+    def _retime(self, task):
+        if self.finished[task]:
+            self.finish[task] = self.start[task] + self.durations[task]
+            return
+        super()._retime(task)
+        if self.start[task] < self.now:
+            self.start[task] = self.now
+            self.finish[task] = self.now + self.durations[task]
+
+    def _task(self, job_id):
+        try:
+            return self._index[job_id]
+        except KeyError:
+            raise ValueError(f"Unknown job {job_id}.") from None
+
+    def _first_unfinished_position(self, machine):
+        sequence = self.sequences[machine]
+        position = self._first_unfinished[machine]
+        while position < len(sequence) and self.finished[sequence[position]]:
+            position += 1
+        self._first_unfinished[machine] = position
+        return position
+
+    def _running(self, machine, position):
+        """
+        Whether the job at ``position`` of ``machine``, its first unfinished one, is running: all its predecessors have
+        finished and its planned start has passed.
+        """
+        task = self.sequences[machine][position]
+        return task in self._ready and self.start[task] < self.now
+
+    def _stale_jobs(self):
+        """
+        Returns the unfinished jobs, running ones aside, still planned before the latest event. Only the jobs of each
+        machine from its first unfinished one up to the first planned after ``now`` are looked at.
+        """
+        stale = []
+        for machine, sequence in enumerate(self.sequences):
+            if machine in self.lost_machines:
+                continue
+            first = self._first_unfinished_position(machine)
+            for position in range(first, len(sequence)):
+                task = sequence[position]
+                if self.start[task] >= self.now:
+                    break
+                if not self.finished[task] and not (position == first and self._running(machine, position)):
+                    stale.append(task)
+        return stale
+
+    def _retimed_jobs(self):
+        return [self.node_ids[task] for task in self.retimed]
+
+    def ready_jobs(self):
+        """
+        Returns the jobs that have not finished and whose predecessors have all finished.
+        """
+        return [self.node_ids[task] for task in self._ready]
+
+    def is_ready(self, job_id):
+        """
+        Whether a job has not finished and all its predecessors have.
+        """
+        return self._task(job_id) in self._ready
+
+    def free_times(self):
+        """
+        Returns the time at which each machine runs out of planned jobs (None for the lost machines).
+        """
+        free_times = []
+        for machine, sequence in enumerate(self.sequences):
+            if machine in self.lost_machines:
+                free_times.append(None)
+            else:
+                free_times.append(max(self.finish[sequence[-1]], self.now) if sequence else self.now)
+        return free_times
+
+    def _repair(self, seeds):
+        """
+        Propagates a change from ``seeds``, raising ValueError if the propagation stopped on a cycle rather than going on
+        with downstream times that were never updated.
+        """
+        if not self.propagate(seeds):
+            raise ValueError("The machine order of the schedule contradicts the dependencies of the DAG.")
+
+    def job_finished(self, job_id, actual_end: float):
+        """
+        Records the actual end of a job and retimes the jobs that depend on it, directly or through its machine.
+
+        Returns:
+        - list: The jobs whose planned times changed.
+        """
+        task = self._task(job_id)
+        if self.finished[task]:
+            raise ValueError(f"Job {job_id} has already finished.")
+        self.now = max(self.now, actual_end)
+        self.finished[task] = True
+        self.start[task] = min(self.start[task], actual_end)
+        self.durations[task] = actual_end - self.start[task]
+        self._ready.discard(task)
+        for dependent in self._dependents(task):
+            self._unfinished_predecessors[dependent] -= 1
+            if self._unfinished_predecessors[dependent] == 0:
+                self._ready.add(dependent)
+        # Jobs planned before the event that cannot have started yet move to it, with everything downstream of them
+        self._repair([task] + self._stale_jobs())
+        return self._retimed_jobs()
+
+    def job_added(self, job_id, duration: float, dependencies=()):
+        """
+        Adds a job depending on already known jobs, at the end of the machine that can start it first.
+
+        Returns:
+        - list: The jobs whose planned times changed (the new one).
+        """
+        if job_id in self._index:
+            raise ValueError(f"Job {job_id} already exists.")
+        predecessors = [self._task(dependency) for dependency in dependencies]
+        task = len(self.node_ids)
+        self._index[job_id] = task
+        self.node_ids.append(job_id)
+        self.durations.append(float(duration))
+        self.start.append(0.0)
+        self.finish.append(0.0)
+        self.finished.append(False)
+        # The ranks of the other jobs are not updated, the new job is only ranked by its own duration
+        self._ranks.append(float(duration))
+        self._pred_indices.extend(predecessors)
+        self._pred_offsets.append(len(self._pred_indices))
+        self._succ_offsets.append(self._succ_offsets[-1])
+        for predecessor in predecessors:
+            self._added_successors.setdefault(predecessor, []).append(task)
+        self._unfinished_predecessors.append(sum(not self.finished[predecessor] for predecessor in predecessors))
+        if self._unfinished_predecessors[task] == 0:
+            self._ready.add(task)
+
+        free_times = self.free_times()
+        machine = min((machine for machine, free_time in enumerate(free_times) if free_time is not None),
+                      key=free_times.__getitem__)
+        self.machine_of.append(machine)
+        self._position.append(len(self.sequences[machine]))
+        self.sequences[machine].append(task)
+        self._repair([task])
+        return self._retimed_jobs()
+
+    def machine_lost(self, machine: int):
+        """
+        Replans the jobs that have not started yet on the machines left, the running job of the lost machine included.
+        A job is running when it is the first unfinished job of its machine, all its predecessors have finished and its
+        planned start has passed. Finished and running jobs stay where they are; the others are list scheduled by upward rank as in HEFT, each
+        one in the earliest slot of the machines left.
+
+        Returns:
+        - list: The jobs whose planned times changed.
+        """
+        if machine in self.lost_machines:
+            raise ValueError(f"Machine {machine} is already lost.")
+        if len(self.lost_machines) + 1 == len(self.sequences):
+            raise ValueError("Cannot lose the last machine.")
+        self.lost_machines.add(machine)
+        pending = []
+        for other, sequence in enumerate(self.sequences):
+            kept = self._first_unfinished_position(other)
+            if other not in self.lost_machines and kept < len(sequence) and self._running(other, kept):
+                kept += 1
+            pending += sequence[kept:]
+            del sequence[kept:]
+
+        saved = {task: (self.start[task], self.finish[task]) for task in pending}
+        pending_set = set(pending)
+        waiting = {task: 0 for task in pending}
+        for task in pending:
+            for dependent in self._dependents(task):
+                if dependent in pending_set:
+                    waiting[dependent] += 1
+        ready = [(-self._ranks[task], task) for task in pending if waiting[task] == 0]
+        heapq.heapify(ready)
+        timelines = algorithm.MachineTimelines(len(self.sequences))
+        for other, free_time in enumerate(self.free_times()):
+            timelines.reserve(other, 0.0, float("inf") if free_time is None else free_time)
+        while ready:
+            _, task = heapq.heappop(ready)
+            other, start = algorithm.select_machine(timelines, max(self.ready_time(task), self.now), self.durations[task])
+            self.start[task] = start
+            self.finish[task] = start + self.durations[task]
+            timelines.reserve(other, start, self.finish[task])
+            self.sequences[other].append(task)
+            for dependent in self._dependents(task):
+                if dependent in pending_set:
+                    waiting[dependent] -= 1
+                    if waiting[dependent] == 0:
+                        heapq.heappush(ready, (-self._ranks[dependent], dependent))
+        for other, sequence in enumerate(self.sequences):
+            # Jobs inserted in idle gaps were appended out of order
+            sequence.sort(key=self.start.__getitem__)
+            self._reindex(other)
+            self._first_unfinished[other] = 0
+        self.total_finish = sum(self.finish)
+        self.retimed = [task for task, times in saved.items() if times != (self.start[task], self.finish[task])]
+        return self._retimed_jobs()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="online")
+    parser.add_argument("num_machines", type=int, help="Number of machines")
+    parser.add_argument("file", help="Path to the file containing the DAG")
+    parser.add_argument("--noise", type=float, default=0.2, help="Standard deviation of the log of actual over estimated durations")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the simulated durations")
+    args = parser.parse_args()
+
+    # Replays the schedule with noisy durations, reporting every job end as it happens
+    dag = data_loader.load_dag_streaming(args.file)
+    scheduler = OnlineScheduler(dag, args.num_machines)
+    planned = scheduler.makespan
+    actual = (dag.durations * np.random.default_rng(args.seed).lognormal(0, args.noise, dag.num_nodes)).tolist()
+    next_position = [0] * args.num_machines
+    latencies = []
+    while True:
+        running = [scheduler.sequences[machine][position] for machine, position in enumerate(next_position)
+                   if position < len(scheduler.sequences[machine])]
+        running = [task for task in running if scheduler.is_ready(scheduler.node_ids[task])]
+        if not running:
+            break
+        task = min(running, key=lambda task: scheduler.start[task] + actual[task])
+        next_position[scheduler.machine_of[task]] += 1
+        start_time = timeit.default_timer()
+        scheduler.job_finished(scheduler.node_ids[task], scheduler.start[task] + actual[task])
+        latencies.append(timeit.default_timer() - start_time)
+    latencies.sort()
+    print(f"Planned makespan: {planned:.1f} - actual makespan: {scheduler.makespan:.1f}")
+    print(f"{len(latencies)} events - median {latencies[len(latencies) // 2] * 1000:.3f}ms - max {latencies[-1] * 1000:.3f}ms")
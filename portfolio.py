@@ -0,0 +1,144 @@
+import argparse
+import multiprocessing
+import multiprocessing.connection
+import os
+import timeit
+
+import numpy as np
+
+import algorithm
+import columnar_schedule
+import compiled_dag
+import data_loader
+import verification
+
+DEFAULT_RULES = ["upward_rank", "critical_path_first", "lpt", "random:1", "random:2", "random:3"]
+
+
+def rule_priority(dag: compiled_dag.CompiledDAG, rule: str):
+    """
+    Returns the (priority, tie_breaker) vectors of a priority rule, for algorithm.list_schedule_compiled.
+
+    Rules:
+    - "upward_rank": HEFT's upward rank.
+    - "critical_path_first": upward rank, the tasks of the critical path always going first.
+    - "lpt": longest processing time first.
+    - "random:<seed>": upward rank rounded to 1% of the critical path length, ties being broken by a random
+      permutation drawn from ``seed``.
+    """
+    levels = compiled_dag.topological_levels(dag)
+    ranks = compiled_dag.upward_ranks(dag, levels)
+    positions = compiled_dag.topological_positions(levels, dag.num_nodes)
+    if rule == "upward_rank":
+        return ranks, positions
+    if rule == "critical_path_first":
+        priority = ranks.copy()
+        priority[compiled_dag.critical_path(dag, ranks)] += ranks.max() if dag.num_nodes else 0
+        return priority, positions
+    if rule == "lpt":
+        return dag.durations, positions
+    if rule.startswith("random:"):
+        rng = np.random.default_rng(int(rule.split(":", 1)[1]))
+        resolution = max(float(ranks.max()) / 100, np.finfo(np.float64).tiny) if dag.num_nodes else 1.0
+        return np.floor(ranks / resolution), rng.permutation(dag.num_nodes)
+    raise ValueError(f"Unknown priority rule {rule}.")
+
+
+def _run_rule(descriptor, rule, num_machines, connection):
+    # Runs in its own process, so that it can be killed when the budget runs out
+    _, dag = compiled_dag.attach_shared_memory(descriptor)
+    start_time = timeit.default_timer()
+    priority, tie_breaker = rule_priority(dag, rule)
+    # Columns are much cheaper than per-job dicts to send back to the parent process
+    schedule = algorithm.list_schedule_compiled(dag, num_machines, priority, tie_breaker=tie_breaker, columnar=True)
+    violations = verification.verify_schedule(dag, schedule)
+    connection.send({"rule": rule, "schedule": schedule, "makespan": schedule.makespan,
+                     "valid": not violations, "elapsed": timeit.default_timer() - start_time})
+    connection.close()
+
+
+def run_portfolio(dag: compiled_dag.CompiledDAG, num_machines: int, rules=DEFAULT_RULES, budget=None, workers=None):
+    """
+    Races several priority rules on worker processes and keeps the best verified schedule.
+
+    The DAG is published once in shared memory and every rule runs in its own process attached to it, at most
+    ``workers`` at a time. The processes of the rules that have not finished when the wall-clock budget runs out are
+    killed, and the shared memory is only released once every process has exited.
+
+    Args:
+    - dag (compiled_dag.CompiledDAG): The compiled DAG of tasks.
+    - num_machines (int): The number of machines.
+    - rules (list of str, optional): The priority rules to race (see rule_priority). Defaults to DEFAULT_RULES.
+    - budget (float, optional): Wall-clock budget in seconds. Defaults to no limit.
+    - workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+    Returns:
+    - dict: 'rule', 'schedule' and 'makespan' of the best valid schedule (None if no rule finished in time), and 'runs',
+      the rule, makespan, validity and elapsed time of every finished rule, in the order of ``rules``.
+    """
+    context = multiprocessing.get_context()
+    workers = max(1, workers or os.cpu_count() or 1)
+    deadline = None if budget is None else timeit.default_timer() + budget
+    block, descriptor = compiled_dag.to_shared_memory(dag)
+    results = {}
+    running = {}
+    next_rule = 0
+    try:
+        while next_rule < len(rules) or running:
+            while next_rule < len(rules) and len(running) < workers:
+                reader, writer = context.Pipe(duplex=False)
+                process = context.Process(target=_run_rule, args=(descriptor, rules[next_rule], num_machines, writer),
+                                          daemon=True)
+                process.start()
+                # Only the child keeps the writing end, so a child dying before sending its result closes the pipe
+                writer.close()
+                running[reader] = (next_rule, process)
+                next_rule += 1
+            remaining = None if deadline is None else deadline - timeit.default_timer()
+            if remaining is not None and remaining <= 0:
+                break
+            for reader in multiprocessing.connection.wait(list(running), timeout=remaining):
+                position, process = running.pop(reader)
+                try:
+                    results[position] = reader.recv()
+                except EOFError:
+                    pass
+                reader.close()
+                process.join()
+    finally:
+        for _, process in running.values():
+            process.kill()
+        for reader, (_, process) in running.items():
+            process.join()
+            reader.close()
+        block.close()
+        block.unlink()
+    runs = [results[position] for position in sorted(results)]
+    valid_runs = [run for run in runs if run["valid"]]
+    best = min(valid_runs, key=lambda run: run["makespan"], default=None)
+    return {
+        "rule": best["rule"] if best else None,
+        "schedule": best["schedule"].to_legacy() if best else None,
+        "makespan": best["makespan"] if best else None,
+        "runs": [{key: run[key] for key in ("rule", "makespan", "valid", "elapsed")} for run in runs],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="portfolio")
+    parser.add_argument("num_machines", type=int, help="Number of machines")
+    parser.add_argument("file", help="Path to the file containing the DAG")
+    parser.add_argument("--rules", nargs="+", default=DEFAULT_RULES, help="Priority rules to race")
+    parser.add_argument("--budget", type=float, help="Wall-clock budget in seconds")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--output", default="schedule.json", help="Where to write the best schedule (.json, .ndjson or .npz)")
+    args = parser.parse_args()
+
+    result = run_portfolio(data_loader.load_dag_streaming(args.file), args.num_machines, rules=args.rules,
+                           budget=args.budget, workers=args.workers)
+    for run in sorted(result["runs"], key=lambda run: run["makespan"]):
+        print(f"{run['rule']:<22} makespan={run['makespan']:.1f} valid={run['valid']} ({run['elapsed']:.3f}s)")
+    if result["schedule"] is None:
+        print("No rule finished within the budget.")
+    else:
+        print("Best rule:", result["rule"])
+        columnar_schedule.save_schedule(result["schedule"], args.output)
@@ -1,40 +1,90 @@
-import subprocess
-# from threading import Thread
-from flask import Flask, request
+import atexit
 import json
-import ngrok
-from configs import *
+import queue
+import threading
+from flask import Flask, request
 
 app = Flask(__name__)
 log_file_path = "server_log.json"
 
+# Records waiting for the writer thread; past that, requests are refused and clients drop their batches
+MAX_QUEUED = 100000
+FLUSH_INTERVAL = 1.0
+
+_records = queue.Queue(maxsize=MAX_QUEUED)
+_writer = None
+_writer_lock = threading.Lock()
+# Serialises the requests queuing records, so that a batch is queued whole or not at all
+_queue_lock = threading.Lock()
+_stop = threading.Event()
+
+
+def _write_records():
+    # The only owner of the log file: one handle, kept open and flushed once the queue runs dry
+    with open(log_file_path, 'a', buffering=1024 * 1024) as log_file:
+        while not (_stop.is_set() and _records.empty()):
+            try:
+                data = _records.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                log_file.flush()
+                continue
+            print(f"[MACHINE {data.get('machine')} ] ==> {data.get('message')}")
+            log_file.write(json.dumps(data) + '\n')
+            if _records.empty():
+                log_file.flush()
+
+
+def _stop_writer():
+    _stop.set()
+    if _writer is not None:
+        _writer.join()
+
+
+def _ensure_writer():
+    # Started on the first request rather than on import, so that it runs in the process serving the requests
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_records, name="log-writer", daemon=True)
+                _writer.start()
+                atexit.register(_stop_writer)
+
+
 @app.route('/log', methods=['POST'])
 def log_data():
-    data = request.json
-    print(f"[MACHINE {data['machine']} ] ==> {data['message']}")
-    with open(log_file_path, 'a') as log_file:
-        json.dump(data, log_file)
-        log_file.write('\n')
+    """
+    Accepts one record or a list of records (see log_client.BufferedLogClient), each a JSON object with at least
+    'machine' and 'message', and queues them for the writer thread. A batch is queued whole or, with a 503 answer when
+    the queue has no room for all of it, not at all.
+    """
+    data = request.get_json(silent=True)
+    records = data if isinstance(data, list) else [data]
+    if not all(isinstance(record, dict) for record in records):
+        return 'Expected a JSON object or a list of JSON objects', 400
+    _ensure_writer()
+    with _queue_lock:
+        # The writer only takes records out, so the room checked here cannot shrink before they are queued
+        if _records.qsize() + len(records) > MAX_QUEUED:
+            return f'Log queue full, {len(records)} records dropped', 503
+        for record in records:
+            _records.put_nowait(record)
     return 'Logged', 200
 
 def start_ngrok(port=5020):
+    import ngrok
+    from configs import NGROK_AUTHTOKEN
+
     listener = ngrok.forward(port, authtoken=NGROK_AUTHTOKEN)
     print(f"Ngrok tunnel established at: {listener.url()}")
     with open('./azure_batch/ngrok_url.txt', 'w') as url_file:
         url_file.write(listener.url())
-            
-            
-
-# def start_ngrok_async(port=5020):
-#     ngrok_thread = Thread(target=start_ngrok, args=(port,))
-#     ngrok_thread.start()
 
 PORT = 5020
 
-# with app.app_context():
-#     start_ngrok_async(PORT)
-    
 
 if __name__ == "__main__":
+    # For a production server, run the app with one process, e.g. `waitress-serve --port 5020 start_logger:app` or
+    # `gunicorn -w 1 --threads 8 -b :5020 start_logger:app`, so that a single writer owns the file
     start_ngrok(port=PORT)
-    app.run(debug=True, use_reloader=False, port=PORT)
\ No newline at end of file
+    app.run(threaded=True, use_reloader=False, port=PORT)
@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import timeit
+from concurrent.futures import ProcessPoolExecutor
+
+import algorithm
+import applicated_criteria
+import dag_cache
+
+# DAG shared read-only by the worker processes, mapped from the .gdag cache by _init_worker
+_shared_dag = None
+
+
+def _init_worker(gdag_path):
+    global _shared_dag
+    _shared_dag = dag_cache.load_gdag(gdag_path)
+
+
+def _schedule_with(num_machines):
+    schedule = algorithm.heft_compiled(_shared_dag, num_machines)
+    metrics = applicated_criteria.schedule_metrics(_shared_dag, schedule, num_machines)
+    utilisation = metrics.pop("utilisation")
+    metrics["num_machines"] = num_machines
+    metrics["mean_utilisation"] = sum(utilisation) / len(utilisation)
+    return metrics
+
+
+def find_knee(rows, critical_path_length, tolerance):
+    """
+    Returns the smallest machine count whose makespan is within ``tolerance`` (relative) of the critical path length,
+    the lower bound no machine count can beat, or None if no count in the sweep gets there.
+    """
+    bound = critical_path_length * (1 + tolerance)
+    fitting = [row["num_machines"] for row in rows if row["makespan"] <= bound]
+    return min(fitting, default=None)
+
+
+def sweep_machine_counts(json_path, machine_counts, tolerance=0.05, workers=None):
+    """
+    Schedules the same DAG with HEFT on every machine count of ``machine_counts`` in a process pool.
+
+    The DAG is compiled once into its .gdag cache and every worker maps that file, so all of them share one read-only
+    copy of the graph.
+
+    Args:
+    - json_path (str): The DAG JSON file.
+    - machine_counts (list of int): The machine counts to try.
+    - tolerance (float, optional): Relative distance to the critical path length accepted for the knee. Defaults to 0.05.
+    - workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+    Returns:
+    - dict: 'rows' (makespan, SLR, speedup, efficiency and mean utilisation per machine count), 'critical_path_length',
+      'tolerance', 'knee' (see find_knee) and 'elapsed' (seconds).
+    """
+    start_time = timeit.default_timer()
+    gdag_path = dag_cache.cache_path_for(json_path)
+    dag = dag_cache.load_dag_cached(json_path, gdag_path)
+    critical_path_length = applicated_criteria.critical_path(dag).total_seconds()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(gdag_path,)) as executor:
+        rows = list(executor.map(_schedule_with, machine_counts))
+    return {
+        "rows": rows,
+        "critical_path_length": critical_path_length,
+        "tolerance": tolerance,
+        "knee": find_knee(rows, critical_path_length, tolerance),
+        "elapsed": timeit.default_timer() - start_time,
+    }
+
+
+def autoscale_formula(num_nodes: int):
+    """
+    Returns an Azure Batch autoscale formula keeping ``num_nodes`` dedicated nodes while tasks are pending, and none
+    otherwise. Meant for the rule_scale_pool argument of greedguler_batch.create_pool.
+    """
+    return (
+        "$pending = max(0, $PendingTasks.GetSample(1));\n"
+        f"$TargetDedicatedNodes = $pending > 0 ? {int(num_nodes)} : 0;\n"
+        "$NodeDeallocationOption = taskcompletion;"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="sweep")
+    parser.add_argument("file", help="Path to the file containing the DAG")
+    parser.add_argument("--min", type=int, default=1, dest="min_machines", help="Smallest machine count")
+    parser.add_argument("--max", type=int, default=32, dest="max_machines", help="Largest machine count")
+    parser.add_argument("--step", type=int, default=1, help="Step between machine counts")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Accepted relative distance to the critical path length")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--output", help="Optional path of a JSON report")
+    args = parser.parse_args()
+
+    result = sweep_machine_counts(args.file, list(range(args.min_machines, args.max_machines + 1, args.step)),
+                                  tolerance=args.tolerance, workers=args.workers)
+    print(f"{'machines':>8} {'makespan':>14} {'slr':>8} {'speedup':>8} {'efficiency':>10}")
+    for row in result["rows"]:
+        print(f"{row['num_machines']:>8} {row['makespan']:>14.1f} {row['slr']:>8.3f} {row['speedup']:>8.2f} {row['efficiency']:>10.3f}")
+    print("Critical path length:", result["critical_path_length"])
+    print(f"Smallest machine count within {args.tolerance:.0%} of the critical path:", result["knee"])
+    print("Sweep took:", result["elapsed"])
+    if args.output:
+        with open(args.output, "w") as file_handle:
+            json.dump(result, file_handle, indent=2)
@@ -0,0 +1,52 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_orchestration
+
+
+def _wait(batch_client, task_ids, **kwargs):
+    return asyncio.run(batch_orchestration.wait_for_tasks(batch_client, "job", task_ids, initial_interval=0.01,
+                                                          max_interval=0.05, on_change=lambda message: None, **kwargs))
+
+
+def test_wait_for_tasks_until_all_completed():
+    batch_client = batch_orchestration.LocalBatchClient({"a": 0.05, "b": 0.15})
+    assert _wait(batch_client, ["a", "b"]) == {"a": "completed", "b": "completed"}
+
+
+def test_wait_for_tasks_stops_on_failure():
+    batch_client = batch_orchestration.LocalBatchClient({"a": 0.05, "b": 10.0}, failures={"a"})
+    states = _wait(batch_client, ["a", "b"])
+    assert states["a"] == "failed" and states["b"] != "completed"
+
+
+def test_wait_for_tasks_times_out():
+    batch_client = batch_orchestration.LocalBatchClient({"a": 10.0})
+    with pytest.raises(TimeoutError):
+        _wait(batch_client, ["a"], timeout=0.1)
+
+
+def test_download_blobs_skips_unchanged(tmp_path):
+    container, destination = tmp_path / "container", tmp_path / "results"
+    (container / "job" / "task").mkdir(parents=True)
+    for i in range(5):
+        (container / "job" / "task" / f"out{i}.txt").write_bytes(os.urandom(1000 + i))
+    container_client = batch_orchestration.LocalContainerClient(str(container), chunk_size=256)
+
+    def download():
+        return asyncio.run(batch_orchestration.download_blobs(container_client, str(destination), max_concurrency=2,
+                                                              on_download=lambda message: None))
+
+    downloaded, skipped = download()
+    assert len(downloaded) == 5 and skipped == []
+    for i in range(5):
+        name = f"job/task/out{i}.txt"
+        assert (destination / name).read_bytes() == (container / name).read_bytes()
+    (container / "job" / "task" / "out0.txt").write_bytes(b"changed")
+    downloaded, skipped = download()
+    assert downloaded == ["job/task/out0.txt"] and len(skipped) == 4
@@ -0,0 +1,25 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+
+def _record(wall_time, makespan, num_machines=8):
+    return {"input": "MediumComplex", "scheduler": "heft", "num_machines": num_machines, "wall_time": wall_time,
+            "peak_memory_mb": 10.0, "makespan": makespan}
+
+
+def test_compare_reports_regressions_only():
+    previous = {"results": [_record(1.0, 100.0), _record(1.0, 100.0, num_machines=3)]}
+    current = {"results": [_record(1.05, 120.0), _record(2.0, 100.0, num_machines=3), _record(9.0, 9.0, num_machines=32)]}
+    regressions = benchmark.compare(previous, current, tolerance=0.10)
+    assert [(regression["num_machines"], regression["metric"]) for regression in regressions] == [(8, "makespan"),
+                                                                                                  (3, "wall_time")]
+
+
+def test_iter_inputs_is_seeded():
+    first = [(name, sorted(graph.edges)) for name, graph, _ in benchmark.iter_inputs([], [(200, 2)], seed=1)]
+    second = [(name, sorted(graph.edges)) for name, graph, _ in benchmark.iter_inputs([], [(200, 2)], seed=1)]
+    assert first == second
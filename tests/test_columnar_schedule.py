@@ -0,0 +1,41 @@
+import io
+import json
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import columnar_schedule
+
+
+def _schedule(job_ids=(3, 1, 2, 0)):
+    return columnar_schedule.ColumnarSchedule(list(job_ids), [1, 0, 1, 0], [5.0, 0.0, 0.0, 2.5], [6.0, 2.5, 5.0, 3.25],
+                                              num_machines=3)
+
+
+def test_write_json_matches_json_dump():
+    for schedule in (_schedule(), _schedule(["c", "a", "b", "d"])):
+        output = io.StringIO()
+        schedule.write_json(output)
+        assert output.getvalue() == json.dumps(schedule.to_legacy())
+
+
+@pytest.mark.parametrize("extension", [".json", ".ndjson", ".npz"])
+def test_save_load_round_trip(tmp_path, extension):
+    schedule = _schedule()
+    path = str(tmp_path / f"schedule{extension}")
+    columnar_schedule.save_schedule(schedule, path)
+    assert columnar_schedule.load_schedule(path).to_legacy() == schedule.to_legacy()
+
+
+@pytest.mark.parametrize("extension", [".json", ".ndjson"])
+@pytest.mark.parametrize("bad_time", [math.inf, math.nan])
+def test_json_formats_reject_non_finite_times(tmp_path, extension, bad_time):
+    schedule = columnar_schedule.ColumnarSchedule([0, 1], [0, 0], [0.0, 1.0], [1.0, bad_time])
+    with pytest.raises(ValueError):
+        columnar_schedule.save_schedule(schedule, str(tmp_path / f"schedule{extension}"))
+    with pytest.raises(ValueError):
+        columnar_schedule.dump_json(schedule.to_legacy(), io.StringIO())
@@ -0,0 +1,56 @@
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import dag_generators
+
+
+def test_upward_ranks_are_longest_paths():
+    dag = dag_generators.erdos_renyi(300, 0.02, seed=0)
+    graph = compiled_dag.to_networkx(dag)
+    durations = dag.durations.tolist()
+    expected = [0.0] * dag.num_nodes
+    for task in reversed(list(nx.topological_sort(graph))):
+        expected[task] = durations[task] + max([expected[successor] for successor in graph.successors(task)], default=0.0)
+    np.testing.assert_allclose(compiled_dag.upward_ranks(dag), expected)
+
+
+def test_topological_levels_follow_edges():
+    dag = dag_generators.layered(1000, 20, seed=0)
+    positions = compiled_dag.topological_positions(compiled_dag.topological_levels(dag), dag.num_nodes)
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    assert (positions[sources] < positions[dag.succ_indices]).all()
+
+
+def test_cycle_is_rejected():
+    dag = compiled_dag.from_edges(["A", "B"], [1.0, 1.0], [0, 1], [1, 0])
+    with pytest.raises(ValueError):
+        compiled_dag.topological_levels(dag)
+
+
+def test_compile_dag_round_trip():
+    dag = dag_generators.layered(200, 10, seed=0)
+    recompiled = compiled_dag.compile_dag(compiled_dag.to_networkx(dag))
+    assert recompiled.node_ids.tolist() == dag.node_ids.tolist()
+    assert recompiled.durations.tolist() == dag.durations.tolist()
+    assert recompiled.succ_indices.tolist() == dag.succ_indices.tolist()
+
+
+def test_shared_memory_round_trip():
+    dag = dag_generators.layered(200, 10, seed=0)
+    block, descriptor = compiled_dag.to_shared_memory(dag)
+    try:
+        attached_block, attached = compiled_dag.attach_shared_memory(descriptor)
+        for field in ("node_ids", "durations", "succ_offsets", "succ_indices", "pred_offsets", "pred_indices"):
+            np.testing.assert_array_equal(getattr(attached, field), getattr(dag, field))
+        del attached
+        attached_block.close()
+    finally:
+        block.close()
+        block.unlink()
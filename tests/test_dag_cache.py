@@ -0,0 +1,58 @@
+import os
+import stat
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import dag_cache
+import dag_generators
+
+_FIELDS = ("node_ids", "durations", "succ_offsets", "succ_indices", "pred_offsets", "pred_indices", "edge_sizes",
+           "edge_latencies")
+
+
+def _assert_same_dag(loaded, dag):
+    for field in _FIELDS:
+        expected = getattr(dag, field)
+        if expected is None:
+            assert getattr(loaded, field) is None
+        else:
+            np.testing.assert_array_equal(getattr(loaded, field), expected)
+
+
+def test_round_trip(tmp_path):
+    dag = dag_generators.layered(1000, 20, seed=0)
+    path = str(tmp_path / "dag.gdag")
+    dag_cache.write_gdag(dag, path)
+    _assert_same_dag(dag_cache.load_gdag(path), dag)
+
+
+def test_round_trip_with_edge_data(tmp_path):
+    dag = compiled_dag.from_edges([10, 20, 30], [1.0, 2.0, 3.0], [0, 0, 1], [1, 2, 2], sizes=[5.0, 6.0, 7.0],
+                                  latencies=[0.5, 0.25, 0.125])
+    path = str(tmp_path / "dag.gdag")
+    dag_cache.write_gdag(dag, path)
+    _assert_same_dag(dag_cache.load_gdag(path), dag)
+
+
+@pytest.mark.skipif(not hasattr(os, "fchmod"), reason="Permission bits are only set where os.fchmod exists")
+def test_written_file_follows_umask(tmp_path):
+    path = str(tmp_path / "dag.gdag")
+    dag_cache.write_gdag(dag_generators.layered(10, 2, seed=0), path)
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o666 & ~umask
+
+
+def test_source_freshness(tmp_path):
+    source = tmp_path / "dag.json"
+    source.write_text("{}")
+    path = str(tmp_path / "dag.gdag")
+    dag_cache.write_gdag(dag_generators.layered(10, 2, seed=0), path, source_path=str(source))
+    assert dag_cache.is_fresh(path, str(source))
+    source.write_text("{ }")
+    assert not dag_cache.is_fresh(path, str(source))
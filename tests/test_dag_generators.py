@@ -0,0 +1,59 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import dag_generators
+
+
+def _edges(dag):
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    return list(zip(sources.tolist(), dag.succ_indices.tolist()))
+
+
+def _generated():
+    reference = dag_generators.layered(500, 10, seed=1)
+    return {
+        "layered": dag_generators.layered(1000, 20, seed=0),
+        "fork_join": dag_generators.fork_join(3, 4, depth=2, seed=0),
+        "fan_out_in": dag_generators.fan_out_in(3, 3, seed=0),
+        "erdos_renyi": dag_generators.erdos_renyi(300, 0.05, seed=0),
+        "workflow": dag_generators.workflow_like(1000, reference, seed=0),
+    }
+
+
+@pytest.mark.parametrize("name", dag_generators.GENERATORS)
+def test_generated_graphs_are_simple_dags(name):
+    dag = _generated()[name]
+    edges = _edges(dag)
+    # Every generator draws edges from lower to higher ids, without duplicates
+    assert all(source < target for source, target in edges)
+    assert len(set(edges)) == len(edges)
+    assert sum(len(level) for level in compiled_dag.topological_levels(dag)) == dag.num_nodes
+
+
+def test_same_seed_same_graph():
+    first, second = dag_generators.layered(1000, 20, seed=3), dag_generators.layered(1000, 20, seed=3)
+    assert _edges(first) == _edges(second)
+    assert first.durations.tolist() == second.durations.tolist()
+
+
+def test_fork_join_shape():
+    dag = dag_generators.fork_join(3, 4, depth=2)
+    assert dag.num_nodes == 3 * (4 * 2 + 1) + 1
+    assert len(_edges(dag)) == 3 * 4 * 3
+
+
+def test_fork_join_rejects_empty_stages():
+    with pytest.raises(ValueError):
+        dag_generators.fork_join(3, 4, depth=0)
+    with pytest.raises(ValueError):
+        dag_generators.fork_join(3, 0)
+
+
+def test_workflow_like_empty():
+    assert dag_generators.workflow_like(0, dag_generators.layered(100, 5, seed=0)).num_nodes == 0
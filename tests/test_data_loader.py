@@ -0,0 +1,27 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_loader
+
+
+def test_parse_durations_matches_duration_seconds():
+    rng = random.Random(0)
+    texts = [f"{rng.randrange(100):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}" for _ in range(200)]
+    texts += [f"{rng.randrange(10)}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(10 ** 7):07d}"
+              for _ in range(200)]
+    texts += ["00:02:00", "01:50:19.3177493", "0:0:1.5", "12:34:56."]
+    rng.shuffle(texts)
+    assert data_loader.parse_durations(texts).tolist() == [data_loader._duration_seconds(text) for text in texts]
+
+
+def test_parse_durations_rejects_days_like_duration_seconds():
+    texts = ["1.02:00:00", "1.03:00:00"]
+    with pytest.raises(ValueError):
+        data_loader._duration_seconds(texts[0])
+    with pytest.raises(ValueError):
+        data_loader.parse_durations(texts)
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import dag_generators
+import distributed
+import verification
+
+
+def test_weakly_connected_components_match_networkx():
+    dag = dag_generators.erdos_renyi(2000, 0.0005, seed=0)
+    components = distributed.weakly_connected_components(dag)
+    expected = nx.weakly_connected_components(compiled_dag.to_networkx(dag))
+    assert sorted(map(sorted, expected)) == sorted(sorted(np.flatnonzero(components == component).tolist())
+                                                   for component in range(components.max() + 1))
+
+
+@pytest.mark.parametrize("method, dag", [
+    ("components", dag_generators.erdos_renyi(2000, 0.0005, seed=0)),
+    ("levels", dag_generators.layered(2000, 40, seed=0)),
+])
+def test_run_distributed_gives_a_valid_schedule(tmp_path, method, dag):
+    result = distributed.run_distributed(dag, 8, 4, method=method, directory=str(tmp_path), workers=2)
+    assert result["method"] == method
+    assert result["schedule"].num_jobs == dag.num_nodes
+    assert verification.verify_schedule(dag, result["schedule"]) == []
+
+
+def test_components_are_never_split():
+    dag = dag_generators.erdos_renyi(2000, 0.0005, seed=1)
+    method, parts = distributed.partition_dag(dag, 4, "components")
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    assert method == "components"
+    assert (parts[sources] == parts[dag.succ_indices]).all()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import local_search
+
+
+def test_propagate_revisits_are_not_a_cycle():
+    # X depends on 20 tasks of zero duration on their own machines, and is retimed again after each of them
+    num_preds = 20
+    dag = compiled_dag.from_edges(["X"] + [f"P{i}" for i in range(num_preds)], [0.0] * (num_preds + 1),
+                                  list(range(1, num_preds + 1)), [0] * num_preds)
+    state = local_search.ScheduleState(dag, [[task] for task in range(num_preds + 1)])
+    for task in range(1, num_preds + 1):
+        state.durations[task] = 1.0
+    assert state.propagate(range(1, num_preds + 1))
+    assert state.start[0] == 1.0
+
+
+def test_swap_creating_a_cycle_is_rolled_back():
+    dag = compiled_dag.from_edges(["A", "B"], [1.0, 2.0], [0], [1])
+    state = local_search.ScheduleState(dag, [[0, 1]])
+    assert not state.swap_with_previous(1)
+    assert state.sequences == [[0, 1]]
+    assert (state.start, state.finish) == ([0.0, 1.0], [1.0, 3.0])
@@ -0,0 +1,83 @@
+import json
+import os
+import queue
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_client
+
+
+class _Server(ThreadingHTTPServer):
+    def __init__(self, status):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.status = status
+        self.records = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        batch = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.server.status == 200:
+            self.server.records.extend(batch)
+        self.send_response(self.server.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(request):
+    server = _Server(request.param)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("server", [200], indirect=True)
+def test_records_are_sent_in_batches(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}/log"
+    with log_client.BufferedLogClient(url, 3, batch_size=50, flush_interval=0.05) as client:
+        for i in range(120):
+            assert client.log(f"Record {i}", step=i)
+    assert (client.sent, client.dropped) == (120, 0)
+    assert [record["step"] for record in server.records] == list(range(120))
+    assert all(record["machine"] == 3 for record in server.records)
+
+
+@pytest.mark.parametrize("server", [503], indirect=True)
+def test_refused_batches_are_dropped_whole(server):
+    url = f"http://127.0.0.1:{server.server_address[1]}/log"
+    with log_client.BufferedLogClient(url, 0, batch_size=50, flush_interval=0.05) as client:
+        for i in range(120):
+            client.log(f"Record {i}")
+    assert (client.sent, client.dropped) == (0, 120)
+
+
+def test_full_queue_drops_records(monkeypatch):
+    # A sender that never takes anything out, as when the server hangs
+    monkeypatch.setattr(log_client.BufferedLogClient, "_run", lambda self: None)
+    client = log_client.BufferedLogClient("http://127.0.0.1:9/log", 0, max_queued=2)
+    assert [client.log(f"Record {i}") for i in range(5)] == [True, True, False, False, False]
+    assert client.dropped == 3
+
+
+def test_logger_queues_a_batch_whole_or_not_at_all(monkeypatch):
+    start_logger = pytest.importorskip("start_logger")
+    monkeypatch.setattr(start_logger, "MAX_QUEUED", 5)
+    monkeypatch.setattr(start_logger, "_records", queue.Queue(maxsize=5))
+    monkeypatch.setattr(start_logger, "_ensure_writer", lambda: None)
+    app = start_logger.app.test_client()
+    assert app.post("/log", json=[{"machine": 0, "message": str(i)} for i in range(3)]).status_code == 200
+    assert app.post("/log", json=[{"machine": 0, "message": str(i)} for i in range(3)]).status_code == 503
+    assert start_logger._records.qsize() == 3
+    assert app.post("/log", json={"machine": 0, "message": "one"}).status_code == 200
+    assert app.post("/log", json=["not a record"]).status_code == 400
+    assert start_logger._records.qsize() == 4
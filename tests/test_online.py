@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import compiled_dag
+import online
+
+
+def _job(job_id, start_time, end_time):
+    return {'start_time': start_time, 'end_time': end_time, 'duration': end_time - start_time, 'job_index': job_id}
+
+
+def test_machine_lost_after_unrelated_job_finished():
+    # R runs 0-10 on m0, D depends on R and is planned 10-15 on m1, A runs 0-20 on m2
+    dag = compiled_dag.from_edges(["R", "D", "A"], [10.0, 5.0, 20.0], [0], [1])
+    scheduler = online.OnlineScheduler(dag, 3, [[_job("R", 0, 10)], [_job("D", 10, 15)], [_job("A", 0, 20)]])
+    r, d = dag.index_of("R"), dag.index_of("D")
+
+    scheduler.job_finished("A", 20.0)
+    # D cannot have started before R finishes, so it is no longer planned before the event
+    assert scheduler.start[d] >= 20.0
+
+    scheduler.machine_lost(0)
+    assert scheduler.machine_of[r] != 0
+    assert scheduler.start[r] >= 20.0
+    assert scheduler.start[d] >= scheduler.finish[r]
+
+
+def test_stopped_propagation_raises(monkeypatch):
+    dag = compiled_dag.from_edges(["R", "D"], [10.0, 5.0], [0], [1])
+    scheduler = online.OnlineScheduler(dag, 2, [[_job("R", 0, 10)], [_job("D", 10, 15)]])
+    monkeypatch.setattr(online.OnlineScheduler, "propagate", lambda self, seeds: False)
+    with pytest.raises(ValueError):
+        scheduler.job_finished("R", 12.0)
+    with pytest.raises(ValueError):
+        scheduler.job_added("N", 1.0, ["D"])
+
+
+def test_is_ready():
+    dag = compiled_dag.from_edges(["R", "D"], [10.0, 5.0], [0], [1])
+    scheduler = online.OnlineScheduler(dag, 2, [[_job("R", 0, 10)], [_job("D", 10, 15)]])
+    assert scheduler.is_ready("R") and not scheduler.is_ready("D")
+    scheduler.job_finished("R", 10.0)
+    assert scheduler.is_ready("D") and not scheduler.is_ready("R")
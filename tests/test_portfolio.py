@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dag_generators
+import portfolio
+import verification
+
+# Rules that take several seconds each on this DAG, raced under a much shorter budget
+_SLOW_PORTFOLIO = """
+import timeit
+import dag_generators
+import portfolio
+
+dag = dag_generators.layered(200000, 100, seed=0)
+start_time = timeit.default_timer()
+result = portfolio.run_portfolio(dag, 8, budget=0.5, workers=2)
+print(timeit.default_timer() - start_time, len(result["runs"]), flush=True)
+"""
+
+
+def test_budget_kills_unfinished_rules():
+    process = subprocess.Popen([sys.executable, "-c", _SLOW_PORTFOLIO], cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    returned_at = timeit.default_timer()
+    process.wait(timeout=60)
+    exited_after = timeit.default_timer() - returned_at
+    elapsed, num_runs = line.split()
+    assert float(elapsed) < 1.5
+    assert int(num_runs) == 0
+    # No abandoned worker left for the interpreter to join at exit
+    assert exited_after < 1.5
+    assert process.returncode == 0
+
+
+def test_best_schedule_is_valid():
+    dag = dag_generators.layered(2000, 20, seed=0)
+    rules = ["upward_rank", "lpt", "random:1"]
+    result = portfolio.run_portfolio(dag, 4, rules=rules, workers=2)
+    assert [run["rule"] for run in result["runs"]] == rules
+    assert result["makespan"] == min(run["makespan"] for run in result["runs"])
+    assert verification.verify_schedule(dag, result["schedule"]) == []
@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sweep
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+
+def test_find_knee():
+    rows = [{"num_machines": 2, "makespan": 30.0}, {"num_machines": 4, "makespan": 10.4}, {"num_machines": 8, "makespan": 10.0}]
+    assert sweep.find_knee(rows, 10.0, 0.05) == 4
+    assert sweep.find_knee(rows, 5.0, 0.05) is None
+
+
+def test_sweep_machine_counts(tmp_path):
+    json_path = str(tmp_path / "smallComplex.json")
+    shutil.copy(os.path.join(DATA, "smallComplex.json"), json_path)
+    result = sweep.sweep_machine_counts(json_path, [1, 2, 4], workers=2)
+    makespans = [row["makespan"] for row in result["rows"]]
+    assert [row["num_machines"] for row in result["rows"]] == [1, 2, 4]
+    assert makespans == sorted(makespans, reverse=True)
+    assert all(makespan >= result["critical_path_length"] - 1e-6 for makespan in makespans)
+    assert os.path.exists(str(tmp_path / "smallComplex.gdag"))
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import algorithm
+import columnar_schedule
+import compiled_dag
+import dag_generators
+import verification
+
+
+def _job(job_id, start_time, end_time):
+    return {'start_time': start_time, 'end_time': end_time, 'duration': end_time - start_time, 'job_index': job_id}
+
+
+def test_heft_schedule_is_valid():
+    dag = dag_generators.layered(2000, 40, seed=0)
+    schedule = algorithm.heft_compiled(dag, 8)
+    assert verification.verify_schedule(dag, schedule) == []
+    assert verification.verify_schedule(dag, columnar_schedule.as_columnar(schedule)) == []
+
+
+def test_overlaps_with_any_earlier_job():
+    # L covers both B and C, which do not overlap each other
+    dag = compiled_dag.from_edges(["L", "B", "C"], [10.0, 1.0, 1.0], [], [])
+    schedule = [[_job("L", 0, 10), _job("B", 2, 3), _job("C", 4, 5)]]
+    for checked in (schedule, columnar_schedule.as_columnar(schedule)):
+        overlaps = [violation['jobs'] for violation in verification.verify_schedule(dag, checked)
+                    if violation['type'] == 'overlap']
+        assert overlaps == [("L", "B"), ("L", "C")]
+
+
+def test_dependency_and_missing_jobs():
+    dag = compiled_dag.from_edges(["A", "B", "C"], [2.0, 1.0, 1.0], [0], [1])
+    violations = verification.verify_schedule(dag, [[_job("A", 0, 2)], [_job("B", 1, 2)]])
+    assert sorted(violation['type'] for violation in violations) == ['dependency', 'missing']
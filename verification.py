@@ -1,5 +1,9 @@
 from algorithm import *
 from data_loader import *
+import columnar_schedule
+import compiled_dag
+import numpy as np
+import os
 
 
 def read_json(filepath):
@@ -45,34 +49,127 @@ def verification_dependencies(graph, schedule):
     Returns:
         bool: True if all dependencies are satisfied, False otherwise
     '''
-    for machine_schedule in schedule:
-        for job_details in machine_schedule:
-            job_index = job_details['job_index']
-            dependencies = list(graph.predecessors(job_index))
-            for dependency in dependencies:
-                for previous_machine_schedule in schedule:
-                    for previous_job_details in previous_machine_schedule:
-                        if previous_job_details['job_index'] == dependency:
-                            dependency_end_time = previous_job_details['end_time']
-                            job_start_time = job_details['start_time']
-                            if dependency_end_time > job_start_time:
-                                print(
-                                    f"Error: Dependency of job {job_index} not satisfied.")
-                                return False
+    for violation in verify_schedule(graph, schedule):
+        if violation['type'] == 'dependency':
+            print(
+                f"Error: Dependency of job {violation['edge'][1]} not satisfied.")
+            return False
     print("All dependencies are satisfied.")
     return True
 
 
-if __name__ == "__main__":
-    filepath = 'data/smallRandom.json'
-    schedule_data = read_json(filepath)
-    graph = load_dag_from_json(filepath)
-    schedule = allocate_jobs_to_machines_mod(graph, num_machines=8)
+def verify_schedule(graph, schedule):
+    '''
+    Verify a schedule in O(V+E) and report every violation found
 
-    verifcation_overlap_machine(schedule)
-    verification_dependencies(schedule_data, schedule)
+    An index job -> (machine, start, end) is built once from the schedule, then every edge of the graph
+    and every pair of consecutive jobs of each machine is checked against it.
 
+    Args:
+        graph (networkx.DiGraph or compiled_dag.CompiledDAG): Directed acyclic graph representing job dependencies
+        schedule (list, columnar_schedule.ColumnarSchedule or str): List of schedules for each machine, each one ordered by
+            start time, the same schedule in columns, which is checked without building any per-job dict, or the path of a
+            schedule file in any format of columnar_schedule.load_schedule
 
-    verifcation_overlap_machine(schedule)
-    verification_dependencies(schedule_data, schedule)
+    Returns:
+        list: The violations, empty if the schedule is valid. Each one is a dict whose 'type' is
+        - 'dependency': 'edge' (predecessor, job) starts before its predecessor ends, 'slack' (negative) is the start of the job
+          minus the end of the predecessor and 'machine' the machines (predecessor, job).
+        - 'overlap': 'jobs' (previous, next) overlap on 'machine', previous being the job listed before next that ends the
+          latest, and 'slack' (negative) the start of next minus the end of previous. Every job overlapping an earlier one
+          is reported.
+        - 'order': 'jobs' (previous, next) of 'machine' are not listed by start time, so overlaps there may be missed.
+        - 'duplicate': 'job' is scheduled more than once, 'machine' being the machine of its last occurrence.
+        - 'unknown': 'job' on 'machine' is not a node of the graph.
+        - 'missing': 'job' is a node of the graph that is not scheduled.
+    '''
+    dag = graph if isinstance(graph, compiled_dag.CompiledDAG) else compiled_dag.compile_dag(graph)
+    if isinstance(schedule, (str, os.PathLike)):
+        schedule = columnar_schedule.load_schedule(schedule)
+    violations = []
+    job_indices, machine_indices, start_times, end_times = [], [], [], []
+    index_of = dag.index_of
+    if isinstance(schedule, columnar_schedule.ColumnarSchedule):
+        job_ids = schedule.job_ids.tolist()
+        # Columns are ordered by start time within each machine, so a job overlaps an earlier one exactly when it starts
+        # before the latest end of the jobs before it on its machine
+        latest_end = np.empty_like(schedule.end_times)
+        holder = np.empty(len(job_ids), dtype=np.int64)
+        offsets = schedule.machine_offsets.tolist()
+        for begin, end in zip(offsets[:-1], offsets[1:]):
+            ends = schedule.end_times[begin:end]
+            latest_end[begin:end] = np.maximum.accumulate(ends)
+            holder[begin:end] = begin + np.maximum.accumulate(np.where(ends == latest_end[begin:end], np.arange(end - begin), 0))
+        consecutive = schedule.machines[1:] == schedule.machines[:-1]
+        gaps = schedule.start_times[1:] - latest_end[:-1]
+        for i in np.flatnonzero(consecutive & (gaps < 0)).tolist():
+            violations.append({'type': 'overlap', 'jobs': (job_ids[holder[i]], job_ids[i + 1]), 'machine': int(schedule.machines[i]),
+                               'slack': float(gaps[i])})
+        known = np.ones(len(job_ids), dtype=bool)
+        for i, job_id in enumerate(job_ids):
+            try:
+                job_indices.append(index_of(job_id))
+            except KeyError:
+                violations.append({'type': 'unknown', 'job': job_id, 'machine': int(schedule.machines[i])})
+                known[i] = False
+        machine_indices = schedule.machines[known]
+        start_times = schedule.start_times[known]
+        end_times = schedule.end_times[known]
+    else:
+        for machine, machine_schedule in enumerate(schedule):
+            previous = None
+            # The job listed so far on this machine that ends the latest
+            latest = None
+            for job in machine_schedule:
+                if previous is not None:
+                    if job['start_time'] < previous['start_time']:
+                        violations.append({'type': 'order', 'jobs': (previous['job_index'], job['job_index']), 'machine': machine})
+                    elif latest['end_time'] > job['start_time']:
+                        violations.append({'type': 'overlap', 'jobs': (latest['job_index'], job['job_index']), 'machine': machine,
+                                           'slack': job['start_time'] - latest['end_time']})
+                previous = job
+                if latest is None or job['end_time'] >= latest['end_time']:
+                    latest = job
+                try:
+                    job_indices.append(index_of(job['job_index']))
+                except KeyError:
+                    violations.append({'type': 'unknown', 'job': job['job_index'], 'machine': machine})
+                    continue
+                machine_indices.append(machine)
+                start_times.append(job['start_time'])
+                end_times.append(job['end_time'])
+
+    node_ids = dag.node_ids.tolist()
+    job_indices = np.asarray(job_indices, dtype=np.int64)
+    start = np.full(dag.num_nodes, np.nan)
+    end = np.full(dag.num_nodes, np.nan)
+    machine_of = np.full(dag.num_nodes, -1, dtype=np.int64)
+    # Later entries win, the earlier ones are reported as duplicates
+    start[job_indices] = start_times
+    end[job_indices] = end_times
+    machine_of[job_indices] = machine_indices
+    counts = np.bincount(job_indices, minlength=dag.num_nodes)
+    for job in np.flatnonzero(counts > 1).tolist():
+        violations.append({'type': 'duplicate', 'job': node_ids[job], 'machine': int(machine_of[job])})
+    for job in np.flatnonzero(counts == 0).tolist():
+        violations.append({'type': 'missing', 'job': node_ids[job]})
+
+    sources = np.repeat(np.arange(dag.num_nodes), np.diff(dag.succ_offsets))
+    targets = dag.succ_indices
+    slack = start[targets] - end[sources]
+    # Unscheduled jobs give NaN slacks and are already reported as missing
+    for edge in np.flatnonzero(slack < 0).tolist():
+        u, v = int(sources[edge]), int(targets[edge])
+        violations.append({'type': 'dependency', 'edge': (node_ids[u], node_ids[v]),
+                           'slack': float(slack[edge]), 'machine': (int(machine_of[u]), int(machine_of[v]))})
+    return violations
+
+
+if __name__ == "__main__":
+    filepath = 'data/smallRandom.json'
+    graph = load_dag_from_json(filepath)
+    schedule = heft(graph, num_machines=8)
 
+    print(verifcation_overlap_machine(schedule))
+    print(verification_dependencies(graph, schedule))
+    print(verify_schedule(graph, schedule))